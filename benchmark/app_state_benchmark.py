@@ -0,0 +1,43 @@
+"""
+Time extraction of related artists and profile playlists from www.deezer.com pages:
+regex over the decoded page as it was before against the bytes scan of DeezerParser.parse_app_state
+
+    python -m benchmark.app_state_benchmark [count items] [repeat]
+"""
+import json
+import re
+import sys
+import timeit
+
+from benchmark.fixtures import related_artists_page, profile_page
+from deezer_api.deezer_objects import DeezerParser
+
+
+def parse_html(content):
+    return json.loads(re.search('<script>window.__DZR_APP_STATE__ =(.+?)</script>', content.decode("utf-8")).group(1))
+
+
+def run(count_items, repeat):
+    pages = (
+        ('related', related_artists_page(27, count_items), ('RELATED_ARTISTS', 'data')),
+        ('profile', profile_page(1, count_items), ('TAB', 'playlists', 'data')),
+    )
+    print('{} items, best of {}'.format(count_items, repeat))
+    for name, content, keys in pages:
+        def regex():
+            value = parse_html(content)
+            for key in keys:
+                value = value[key]
+            return value
+
+        def scan():
+            return DeezerParser.parse_app_state(content, *keys)
+
+        assert regex() == scan()
+        for method in (regex, scan):
+            best = min(timeit.repeat(method, number=10, repeat=repeat)) / 10
+            print('{:8} {:6} {:7} KB {:7.3f} ms'.format(name, method.__name__, len(content) // 1024, best * 1000))
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 500, int(sys.argv[2]) if len(sys.argv) > 2 else 20)
@@ -0,0 +1,204 @@
+"""
+Local stand-in for api.deezer.com, www.deezer.com, connect.deezer.com and Deezer CDN hosts. Answers from recorded
+fixtures when they exist and from generated ones otherwise, with configurable latency and throttled requests.
+
+    with FakeDeezer(playlists=100, latency=0.02, throttle=0.01) as deezer:
+        client = DeezerApi(token='benchmark', access=Access.MANAGE, transport=DeezerTransport(hosts=deezer.hosts))
+"""
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit, parse_qs
+
+from benchmark import fixtures
+from benchmark.stub_server import StubHandler, StubServer
+
+QuotaError = {'error': {'type': 'Exception', 'message': 'Quota limit exceeded', 'code': 4}}
+NotFoundError = {'error': {'type': 'DataException', 'message': 'no data', 'code': 800}}
+
+
+class FakeDeezerHandler(StubHandler):
+
+    def do_GET(self):
+        self.server.deezer.respond(self, 'GET')
+
+    def do_POST(self):
+        self.server.deezer.respond(self, 'POST')
+
+    def do_DELETE(self):
+        self.server.deezer.respond(self, 'DELETE')
+
+
+class FakeDeezer(StubServer):
+    """
+    Fake Deezer server running in a background thread
+    """
+    Hosts = ('api.deezer.com', 'www.deezer.com', 'connect.deezer.com', 'cdns-preview-d.dzcdn.net',
+             'e-cdns-images.dzcdn.net')
+    PageSize = 25
+
+    def __init__(self, user_id=1, playlists=100, tracks=50, related=20, search_total=300, preview_size=64 * 1024,
+                 latency=0.0, jitter=0.0, throttle=0.0, retry_after=1, seed=0, recordings=None):
+        """
+        :param user_id: id of the authorized user
+        :param playlists: count of the user playlists
+        :param tracks: count of tracks in every playlist
+        :param related: count of related artists of every artist
+        :param search_total: count of results of every search
+        :param preview_size: size of previews and covers in bytes
+        :param latency: seconds before every response
+        :param jitter: max random seconds added to latency
+        :param throttle: part of requests answered with 429 and Deezer quota error
+        :param retry_after: Retry-After header of throttled responses
+        :param seed: seed of latency jitter and throttled requests
+        :param recordings: folder of recorded responses, path /artist/27 is answered by artist/27.json or .html
+        """
+        super().__init__(FakeDeezerHandler)
+        self.server.deezer = self
+        self.user_id = user_id
+        self.playlists = playlists
+        self.tracks = tracks
+        self.related = related
+        self.search_total = search_total
+        self.preview_size = preview_size
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle = throttle
+        self.retry_after = retry_after
+        self.recordings = recordings
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = Counter()
+        self.throttled = 0
+        self.created = 0
+        self.routes = [
+            ('GET', r'/oauth/access_token\.php', self.token),
+            ('GET', r'/user/me', self.me),
+            ('GET', r'/user/(\d+)/playlists', self.user_playlists),
+            ('POST', r'/user/(\d+)/playlists', self.create_playlist),
+            ('GET', r'/user/(\d+)', lambda query, user_id: _json(fixtures.user(int(user_id)))),
+            ('GET', r'/playlist/(\d+)', self.playlist),
+            ('DELETE', r'/playlist/(\d+)', lambda query, playlist_id: _json(True)),
+            ('POST', r'/playlist/(\d+)/tracks', lambda query, playlist_id: _json(True)),
+            ('DELETE', r'/playlist/(\d+)/tracks', lambda query, playlist_id: _json(True)),
+            ('GET', r'/artist/(\d+)/top', self.artist_top),
+            ('GET', r'/artist/(\d+)', lambda query, artist_id: _json(fixtures.artist(int(artist_id)))),
+            ('GET', r'/track/(\d+)', lambda query, track_id: _json(fixtures.track(int(track_id)))),
+            ('GET', r'/album/(\d+)', lambda query, album_id: _json(fixtures.album(int(album_id), int(album_id)))),
+            ('GET', r'/search(?:/(\w+))?', self.search),
+            ('GET', r'/\w+/artist/(\d+)/related_artist', self.related_artists),
+            ('GET', r'/\w+/profile/(\d+)/playlists', self.profile),
+            ('GET', r'/(?:stream|images)/.+', self.media),
+        ]
+
+    @property
+    def hosts(self):
+        """
+        :return: hosts parameter of DeezerTransport sending Deezer requests to this server
+        """
+        return {host: self.url for host in self.Hosts}
+
+    def respond(self, handler, method):
+        parts = urlsplit(handler.path)
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+        with self.lock:
+            throttled = self.throttle and self.random.random() < self.throttle
+            route = self.__route(method, parts.path)
+            self.requests[route[0] if route else 'unknown'] += 1
+            self.throttled += 1 if throttled else 0
+        if delay:
+            time.sleep(delay)
+        answer = _json(QuotaError, 429) if throttled else self.__recorded(parts.path)
+        if answer is None:
+            answer = _json(NotFoundError) if route is None else route[1](query, *route[2])
+        status, content_type, body = answer
+        handler.send_response(status)
+        handler.send_header('Content-Type', content_type)
+        handler.send_header('Content-Length', str(len(body)))
+        if throttled:
+            handler.send_header('Retry-After', str(self.retry_after))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def __route(self, method, path):
+        for route_method, pattern, answer in self.routes:
+            match = re.fullmatch(pattern, path)
+            if route_method == method and match is not None:
+                return '{} {}'.format(method, pattern), answer, match.groups()
+        return None
+
+    def __recorded(self, path):
+        if self.recordings is None:
+            return None
+        for extension, content_type in (('.json', 'application/json'), ('.html', 'text/html; charset=utf-8')):
+            file_path = os.path.join(self.recordings, *path.strip('/').split('/')) + extension
+            if os.path.isfile(file_path):
+                with open(file_path, 'rb') as file:
+                    return 200, content_type, file.read()
+        return None
+
+    def token(self, query):
+        return 200, 'text/html; charset=utf-8', b'access_token=benchmark&expires=3600'
+
+    def me(self, query):
+        return _json(fixtures.user(self.user_id))
+
+    def user_playlists(self, query, user_id):
+        index, limit = int(query.get('index', 0)), int(query.get('limit', self.PageSize))
+        data = [fixtures.playlist_summary(i, self.tracks)
+                for i in range(index + 1, min(index + limit, self.playlists) + 1)]
+        return _json(self.__page(data, index + limit, self.playlists,
+                                 'https://api.deezer.com/user/{}/playlists?limit={}&index={}', user_id, limit))
+
+    def create_playlist(self, query, user_id):
+        with self.lock:
+            self.created += 1
+            return _json({'id': self.playlists + self.created})
+
+    def playlist(self, query, playlist_id):
+        playlist_id = int(playlist_id)
+        count_tracks = self.tracks if playlist_id <= self.playlists else 0
+        return _json(fixtures.playlist(playlist_id, count_tracks, (playlist_id - 1) * self.tracks + 1))
+
+    def artist_top(self, query, artist_id):
+        artist_id, limit = int(artist_id), int(query.get('limit', 10))
+        return _json({'data': [fixtures.track(artist_id * 1000 + i, artist_id) for i in range(min(limit, 100))],
+                      'total': min(limit, 100)})
+
+    def search(self, query, method):
+        index = int(query.get('index', 0))
+        item = {'artist': fixtures.artist, 'album': lambda i: fixtures.album(i, i % 500), 'user': fixtures.user,
+                'playlist': lambda i: fixtures.playlist(i, 0)}.get(method, fixtures.track)
+        data = [item(i) for i in range(index + 1, min(index + self.PageSize, self.search_total) + 1)]
+        return _json(self.__page(data, index + self.PageSize, self.search_total,
+                                 'https://api.deezer.com/search{}?q={}&index={}',
+                                 '' if method is None else '/' + method, query.get('q', '')))
+
+    def related_artists(self, query, artist_id):
+        return 200, 'text/html; charset=utf-8', fixtures.related_artists_page(int(artist_id), self.related)
+
+    def profile(self, query, user_id):
+        return 200, 'text/html; charset=utf-8', fixtures.profile_page(int(user_id), self.playlists)
+
+    def media(self, query):
+        return 200, 'application/octet-stream', b'\0' * self.preview_size
+
+    @staticmethod
+    def __page(data, next_index, total, next_url, *parameters):
+        page = {'data': data, 'total': total}
+        if next_index < total:
+            page['next'] = next_url.format(*parameters + (next_index,))
+        return page
+
+    def stats(self):
+        with self.lock:
+            return {'requests': dict(self.requests), 'throttled': self.throttled}
+
+
+def _json(data, status=200):
+    return status, 'application/json', json.dumps(data).encode('utf-8')
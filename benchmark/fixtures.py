@@ -0,0 +1,130 @@
+"""
+Synthetic Deezer payloads shaped like api.deezer.com responses and www.deezer.com pages
+"""
+import json
+
+Images = 'https://e-cdns-images.dzcdn.net/images'
+
+
+def artist(artist_id):
+    return {
+        'id': artist_id,
+        'name': 'Artist {}'.format(artist_id),
+        'link': 'https://www.deezer.com/artist/{}'.format(artist_id),
+        'picture': 'https://api.deezer.com/artist/{}/image'.format(artist_id),
+        'picture_small': '{}/artist/{}/56x56-000000-80-0-0.jpg'.format(Images, artist_id),
+        'picture_medium': '{}/artist/{}/250x250-000000-80-0-0.jpg'.format(Images, artist_id),
+        'tracklist': 'https://api.deezer.com/artist/{}/top?limit=50'.format(artist_id),
+        'type': 'artist',
+    }
+
+
+def album(album_id, artist_id):
+    return {
+        'id': album_id,
+        'title': 'Album {}'.format(album_id),
+        'cover': 'https://api.deezer.com/album/{}/image'.format(album_id),
+        'cover_small': '{}/cover/{}/56x56-000000-80-0-0.jpg'.format(Images, album_id),
+        'cover_medium': '{}/cover/{}/250x250-000000-80-0-0.jpg'.format(Images, album_id),
+        'cover_big': '{}/cover/{}/500x500-000000-80-0-0.jpg'.format(Images, album_id),
+        'release_date': '20{:02d}-01-01'.format(album_id % 20),
+        'tracklist': 'https://api.deezer.com/album/{}/tracks'.format(album_id),
+        'artist': artist(artist_id),
+        'type': 'album',
+    }
+
+
+def track(track_id, artist_id=None, album_id=None):
+    artist_id = track_id % 500 if artist_id is None else artist_id
+    album_id = track_id % 2000 if album_id is None else album_id
+    return {
+        'id': track_id,
+        'readable': True,
+        'title': 'Track {}'.format(track_id),
+        'title_short': 'Track {}'.format(track_id),
+        'isrc': 'FRZ{:09d}'.format(track_id),
+        'link': 'https://www.deezer.com/track/{}'.format(track_id),
+        'duration': 120 + track_id % 240,
+        'rank': (track_id * 7919) % 1000000,
+        'explicit_lyrics': track_id % 7 == 0,
+        'preview': 'https://cdns-preview-d.dzcdn.net/stream/c-{}-3.mp3'.format(track_id),
+        'time_add': 1590000000 + track_id,
+        'artist': artist(artist_id),
+        'album': album(album_id, artist_id),
+        'type': 'track',
+    }
+
+
+def playlist(playlist_id, count_tracks, first_track_id=1):
+    return {
+        'id': playlist_id,
+        'title': 'Playlist {}'.format(playlist_id),
+        'duration': count_tracks * 200,
+        'public': True,
+        'nb_tracks': count_tracks,
+        'checksum': '{:032x}'.format(playlist_id * 31 + count_tracks),
+        'tracks': {'data': [track(i) for i in range(first_track_id, first_track_id + count_tracks)]},
+        'type': 'playlist',
+    }
+
+
+def app_state_page(state, count_scripts=40):
+    """
+    Html page of www.deezer.com with window.__DZR_APP_STATE__ between other inline scripts and markup
+    """
+    noise = ''.join('<script>window.__DZR_CHUNK_{0}__ = {{"id": {0}, "path": "/static/js/{0}.js"}}</script>\n'
+                    '<div class="row row-{0}"><a href="/ru/track/{0}">Track {0}</a></div>\n'.format(i)
+                    for i in range(count_scripts))
+    return ('<!DOCTYPE html><html><head><title>Deezer</title></head><body>\n{0}'
+            '<script>window.__DZR_APP_STATE__ = {1}</script>\n{0}</body></html>').format(noise, json.dumps(state))
+
+
+def user_data(user_id):
+    return {'USER_ID': user_id, 'BLOG_NAME': 'User {}'.format(user_id), 'USER_PICTURE': '{:032x}'.format(user_id),
+            'COUNTRY': 'RU', 'SETTING': {'site': {'push_notifications': True, 'lang': 'ru'}}}
+
+
+def related_artists_page(artist_id, count_artists):
+    related = [{'ART_ID': i, 'ART_NAME': 'Artist {}'.format(i), 'ART_PICTURE': '{:032x}'.format(i), 'NB_FAN': i * 97,
+                'LOCALES': [], '__TYPE__': 'artist'} for i in range(artist_id + 1, artist_id + 1 + count_artists)]
+    return app_state_page({
+        'DATA': {'ART_ID': artist_id, 'ART_NAME': 'Artist {}'.format(artist_id), 'NB_FAN': artist_id * 97},
+        'TOP': {'data': [track(i) for i in range(artist_id, artist_id + 10)], 'total': 10},
+        'RELATED_ARTISTS': {'data': related, 'total': count_artists},
+        'CURRENT_USER': user_data(1),
+    }).encode('utf-8')
+
+
+def profile_page(user_id, count_playlists):
+    playlists = [{'PLAYLIST_ID': i, 'TITLE': 'Playlist {}'.format(i), 'NB_SONG': i % 100, 'PARENT_USER_ID': user_id,
+                  'PLAYLIST_PICTURE': '{:032x}'.format(i), 'CHECKSUM': '{:032x}'.format(i * 31),
+                  '__TYPE__': 'playlist'} for i in range(1, count_playlists + 1)]
+    return app_state_page({
+        'DATA': user_data(user_id),
+        'TAB': {
+            'loved': {'data': [track(i) for i in range(1, 51)], 'total': 50},
+            'playlists': {'data': playlists, 'total': count_playlists},
+            'albums': {'data': [album(i, i) for i in range(1, 51)], 'total': 50},
+            'artists': {'data': [artist(i) for i in range(1, 51)], 'total': 50},
+        },
+        'CURRENT_USER': user_data(1),
+    }).encode('utf-8')
+
+
+def user(user_id):
+    return {
+        'id': user_id,
+        'name': 'User {}'.format(user_id),
+        'picture': 'https://api.deezer.com/user/{}/image'.format(user_id),
+        'country': 'RU',
+        'tracklist': 'https://api.deezer.com/user/{}/flow'.format(user_id),
+        'type': 'user',
+    }
+
+
+def playlist_summary(playlist_id, count_tracks):
+    data = playlist(playlist_id, 0)
+    del data['tracks']
+    data.update(nb_tracks=count_tracks, duration=count_tracks * 200,
+                checksum='{:032x}'.format(playlist_id * 31 + count_tracks))
+    return data
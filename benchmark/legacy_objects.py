@@ -0,0 +1,29 @@
+"""
+Dict based model objects as they were before __slots__, loaded from the baseline commit of the repository and kept
+as a baseline for memory_benchmark and parse_benchmark. Requires a git checkout.
+Like the baseline, PlayList also fills the global index of tracks by artist.
+"""
+import os
+import subprocess
+import types
+
+Baseline = '0b335e7'
+
+
+def _load():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        source = subprocess.check_output(['git', 'show', '{}:deezer_api/deezer_objects.py'.format(Baseline)],
+                                         cwd=root, stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.CalledProcessError):
+        raise SystemExit('Baseline model objects are read from commit {} of a git checkout'.format(Baseline))
+    module = types.ModuleType('legacy_objects')
+    exec(compile(source, '{}:deezer_api/deezer_objects.py'.format(Baseline), 'exec'), module.__dict__)
+    return module
+
+
+_baseline = _load()
+Artist = _baseline.Artist
+Album = _baseline.Album
+Track = _baseline.Track
+PlayList = _baseline.PlayList
@@ -0,0 +1,49 @@
+"""
+Compare memory held by dict based and slotted model objects for a synthetic playlist. Slotted tracks build nested
+artist and album lazily, so they are measured before and after reading them.
+
+    python -m benchmark.memory_benchmark [count tracks]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+from benchmark import legacy_objects
+from benchmark.fixtures import playlist
+from deezer_api import deezer_objects
+
+
+def measure(playlist_class, data, read_nested):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = playlist_class(data)
+    if read_nested:
+        for track in result.tracks:
+            track.artist, track.album
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, peak, elapsed
+
+
+def run(count_tracks):
+    data = playlist(1, count_tracks)
+    print('{} tracks'.format(count_tracks))
+    sizes = {}
+    variants = (('dict', legacy_objects.PlayList, True), ('slots', deezer_objects.PlayList, True),
+                ('lazy', deezer_objects.PlayList, False))
+    for name, playlist_class, read_nested in variants:
+        result, size, peak, elapsed = measure(playlist_class, data, read_nested)
+        sizes[name] = size
+        print('{:6} held {:8.1f} MB, peak {:8.1f} MB, {:6.2f} s, {:5} bytes/track'.format(
+            name, size / 2 ** 20, peak / 2 ** 20, elapsed, size // count_tracks))
+        del result
+    for name in ('slots', 'lazy'):
+        print('{:6} saved {:.1f}%'.format(name, 100.0 * (sizes['dict'] - sizes[name]) / sizes['dict']))
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,32 @@
+"""
+Time parsing of a playlist response when only track ids are read and when nested objects are read too
+
+    python -m benchmark.parse_benchmark [count tracks] [repeat]
+"""
+import sys
+import timeit
+
+from benchmark import legacy_objects
+from benchmark.fixtures import playlist
+from deezer_api import deezer_objects
+
+
+def read_ids(playlist_class, data):
+    return [track.id for track in playlist_class(data).tracks]
+
+
+def read_nested(playlist_class, data):
+    return [(track.id, track.artist.name, track.album.cover_medium) for track in playlist_class(data).tracks]
+
+
+def run(count_tracks, repeat):
+    data = playlist(1, count_tracks)
+    print('{} tracks, best of {}'.format(count_tracks, repeat))
+    for reader in (read_ids, read_nested):
+        for name, playlist_class in (('eager', legacy_objects.PlayList), ('lazy', deezer_objects.PlayList)):
+            best = min(timeit.repeat(lambda: reader(playlist_class, data), number=1, repeat=repeat))
+            print('{:11} {:5} {:7.2f} ms'.format(reader.__name__, name, best * 1000))
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000, int(sys.argv[2]) if len(sys.argv) > 2 else 20)
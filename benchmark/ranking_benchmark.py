@@ -0,0 +1,38 @@
+"""
+Time selection of recommended tracks from a candidate pool, in plain python and with numpy when it is installed
+
+    python -m benchmark.ranking_benchmark [count candidates] [count tracks] [repeat]
+"""
+import sys
+import timeit
+
+from benchmark.fixtures import track
+from deezer_api import Track, TrackFilter
+from deezer_api.deezer_ranking import CandidatePool, numpy
+
+
+def pool_of(count_candidates, vectorized):
+    pool = CandidatePool({'recency': 0.5}, TrackFilter(max_duration=300, explicit=False), vectorized)
+    for artist_id in range(0, 500, 7):
+        pool.add_artist(artist_id, affinity=artist_id % 5 + 1)
+    by_artist = {}
+    for track_id in range(count_candidates):
+        data = track(track_id)
+        data['release_date'] = data['album']['release_date']
+        by_artist.setdefault(track_id % 500, []).append(Track(data))
+    for artist_id, tracks in by_artist.items():
+        pool.add_tracks(artist_id, tracks, distance=artist_id % 3)
+    return pool
+
+
+def run(count_candidates, count_tracks, repeat):
+    print('{} candidates, top {}, best of {}'.format(count_candidates, count_tracks, repeat))
+    for vectorized in (False, True) if numpy is not None else (False,):
+        pool = pool_of(count_candidates, vectorized)
+        best = min(timeit.repeat(lambda: pool.top(count_tracks), number=1, repeat=repeat))
+        print('{:6} {:8.2f} ms'.format('numpy' if vectorized else 'python', best * 1000))
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000, int(sys.argv[2]) if len(sys.argv) > 2 else 50,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 5)
@@ -0,0 +1,265 @@
+"""
+Scripted client scenarios against the local fake Deezer server. Every scenario runs in its own process and reports
+wall time, requests per route, throttled requests, p50/p99 request latency and peak RSS. Reports are saved to
+compare a change of deezer_api with a baseline.
+
+    python -m benchmark.suite --save baseline.json
+    python -m benchmark.suite generate_tracks search --latency 0.02 --throttle 0.01 --baseline baseline.json
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+from benchmark import fixtures
+from benchmark.fake_deezer import FakeDeezer
+from deezer_api import DeezerApi, Access, PlaylistStore
+from deezer_api.deezer_limiter import DeezerRateLimiter
+from deezer_api.deezer_media import MediaCache
+from deezer_api.deezer_objects import Track
+from deezer_api.deezer_player import Downloader
+from deezer_api.deezer_scheduler import BatchScheduler
+from deezer_api.deezer_transport import DeezerTransport
+
+try:
+    from deezer_api.deezer_async import AsyncDeezerApi, AsyncDeezerTransport
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class RecordingTransport(DeezerTransport):
+    """
+    DeezerTransport recording seconds of every request, rate limiter wait included
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.latencies = []
+        self.lock = threading.Lock()
+
+    def request(self, method, url, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().request(method, url, **kwargs)
+        finally:
+            with self.lock:
+                self.latencies.append(time.perf_counter() - start)
+
+
+if aiohttp is not None:
+    class AsyncRecordingTransport(AsyncDeezerTransport):
+
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            self.latencies = []
+
+        async def request(self, method, url, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await super().request(method, url, **kwargs)
+            finally:
+                self.latencies.append(time.perf_counter() - start)
+
+
+def generate_tracks(transport, options):
+    client = DeezerApi(token='benchmark', access=Access.MANAGE, transport=transport)
+    return len(client.generate_tracks(options.count))
+
+
+def sync_playlists(transport, options):
+    store = PlaylistStore()
+    client = DeezerApi(token='benchmark', access=Access.MANAGE, transport=transport, playlist_store=store)
+    client.get_my_playlist()
+    return len(client.get_my_playlist())
+
+
+def search(transport, options):
+    client = DeezerApi(transport=transport)
+    return len(client.search_query('eminem', 'track', limit=options.search))
+
+
+def related_artists(transport, options):
+    client = DeezerApi(transport=transport)
+    return sum(len(client.get_related_artists(artist_id)) for artist_id in range(1, options.count + 1))
+
+
+def add_tracks(transport, options):
+    client = DeezerApi(token='benchmark', access=Access.MANAGE, transport=transport)
+    client.add_tracks_to_playlist(1, list(range(1, options.count * 20 + 1)))
+    return options.count * 20
+
+
+def download(transport, options):
+    media = MediaCache(tempfile.mkdtemp())
+    try:
+        tracks = [Track(fixtures.track(i)) for i in range(1, options.count + 1)]
+        return len(Downloader(transport, media=media).download(tracks))
+    finally:
+        media.close()
+
+
+def batch_generate(transport, options):
+    scheduler = BatchScheduler(transport=transport, max_jobs=options.users, max_requests=16)
+    for user in range(options.users):
+        scheduler.submit(user, 'benchmark', count_tracks=options.count)
+    jobs = scheduler.run()
+    failed = [job for job in jobs if job.error is not None]
+    if failed:
+        raise failed[0].error
+    return sum(len(job.tracks) for job in jobs)
+
+
+def async_generate_tracks(transport, options):
+    async def run():
+        async with AsyncDeezerApi(token='benchmark', access=Access.MANAGE, transport=transport) as client:
+            return len(await client.generate_tracks(options.count))
+
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(run())
+    finally:
+        loop.run_until_complete(transport.close())
+        loop.close()
+
+
+Scenarios = {
+    'generate_tracks': (generate_tracks, 'generate_tracks(count) for a user with playlists'),
+    'sync_playlists': (sync_playlists, 'get_my_playlist twice with PlaylistStore'),
+    'search': (search, 'search_query of tracks up to search limit'),
+    'related_artists': (related_artists, 'get_related_artists of count artists'),
+    'add_tracks': (add_tracks, 'add_tracks_to_playlist of count * 20 tracks'),
+    'download': (download, 'Downloader.download of count previews and covers'),
+    'batch_generate': (batch_generate, 'BatchScheduler jobs of users, count tracks each'),
+    'async_generate_tracks': (async_generate_tracks, 'AsyncDeezerApi.generate_tracks(count)'),
+}
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(round(q / 100.0 * len(values))) - 1))]
+
+
+def run_scenario(name, options):
+    """
+    Run scenario in the current process
+    :return: report dict
+    """
+    if name.startswith('async_') and aiohttp is None:
+        return {'scenario': name, 'error': 'aiohttp is not installed'}
+    limiter = DeezerRateLimiter() if options.quota else DeezerRateLimiter(default=None)
+    with FakeDeezer(playlists=options.playlists, tracks=options.tracks, related=options.related,
+                    latency=options.latency, jitter=options.jitter, throttle=options.throttle, seed=options.seed,
+                    recordings=options.recordings) as deezer:
+        transport_class = AsyncRecordingTransport if name.startswith('async_') else RecordingTransport
+        transport = transport_class(limiter=limiter, hosts=deezer.hosts)
+        error, result = None, None
+        start = time.perf_counter()
+        try:
+            result = Scenarios[name][0](transport, options)
+        except Exception as e:
+            error = '{}: {}'.format(type(e).__name__, e)
+        wall = time.perf_counter() - start
+        if not name.startswith('async_'):
+            transport.close()
+        server = deezer.stats()
+    return {
+        'scenario': name,
+        'result': result,
+        'error': error,
+        'wall': wall,
+        'requests': len(transport.latencies),
+        'routes': server['requests'],
+        'throttled': server['throttled'],
+        'p50': percentile(transport.latencies, 50),
+        'p99': percentile(transport.latencies, 99),
+        'peak_rss': _peak_rss(),
+    }
+
+
+def _run_child(name, options, queue):
+    queue.put(run_scenario(name, options))
+
+
+def run_isolated(name, options):
+    """
+    Run scenario in a new process, so its peak RSS is not mixed with other scenarios
+    """
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_run_child, args=(name, options, queue))
+    process.start()
+    report = queue.get()
+    process.join()
+    return report
+
+
+def _peak_rss():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def print_report(report, baseline=None):
+    if report.get('error', None) is not None and 'wall' not in report:
+        print('{:22} skipped: {}'.format(report['scenario'], report['error']))
+        return
+    line = '{:22} {:8.3f}s {:6} requests {:4} throttled  p50 {:7.2f} ms  p99 {:7.2f} ms  rss {:7.1f} MB'.format(
+        report['scenario'], report['wall'], report['requests'], report['throttled'], report['p50'] * 1000,
+        report['p99'] * 1000, report['peak_rss'] / 2 ** 20)
+    if baseline is not None and baseline.get('wall', None):
+        line += '  wall {:.2f}x p99 {:.2f}x rss {:.2f}x'.format(
+            report['wall'] / baseline['wall'], report['p99'] / (baseline['p99'] or 1e-9),
+            report['peak_rss'] / float(baseline['peak_rss'] or 1))
+    print(line)
+    if report['error'] is not None:
+        print('{:22} failed: {}'.format('', report['error']))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark deezer_api against a local fake Deezer server')
+    parser.add_argument('scenarios', nargs='*', help='scenarios to run, all by default: {}'.format(
+        ', '.join(Scenarios)))
+    parser.add_argument('--count', type=int, default=50, help='count of tracks or artists of a scenario')
+    parser.add_argument('--playlists', type=int, default=100, help='count of the user playlists')
+    parser.add_argument('--tracks', type=int, default=50, help='count of tracks in every playlist')
+    parser.add_argument('--related', type=int, default=20, help='count of related artists of every artist')
+    parser.add_argument('--users', type=int, default=10, help='count of users of batch scenario')
+    parser.add_argument('--search', type=int, default=300, help='limit of search results')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds before every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='max random seconds added to latency')
+    parser.add_argument('--throttle', type=float, default=0.0, help='part of requests answered with 429')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--recordings', help='folder of recorded responses replayed instead of generated ones')
+    parser.add_argument('--quota', action='store_true', help='keep Deezer quota of 50 requests per 5 seconds')
+    parser.add_argument('--in-process', action='store_true', help='run scenarios in this process')
+    parser.add_argument('--save', help='write reports to json file')
+    parser.add_argument('--baseline', help='json file of reports to compare with')
+    options = parser.parse_args(argv)
+    unknown = set(options.scenarios) - set(Scenarios)
+    if unknown:
+        parser.error('unknown scenarios: {}'.format(', '.join(sorted(unknown))))
+
+    baseline = {}
+    if options.baseline:
+        with open(options.baseline) as file:
+            baseline = {report['scenario']: report for report in json.load(file)}
+    reports = []
+    for name in options.scenarios or list(Scenarios):
+        report = run_scenario(name, options) if options.in_process else run_isolated(name, options)
+        print_report(report, baseline.get(name, None))
+        reports.append(report)
+    if options.save:
+        with open(options.save, 'w') as file:
+            json.dump(reports, file, indent=2)
+    return reports
+
+
+if __name__ == '__main__':
+    main()
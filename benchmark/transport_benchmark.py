@@ -0,0 +1,37 @@
+"""
+Compare module level requests.get with pooled DeezerTransport against a local stub server
+
+    python -m benchmark.transport_benchmark [count]
+"""
+import sys
+import time
+
+import requests
+
+from benchmark.stub_server import StubServer
+from deezer_api.deezer_limiter import DeezerRateLimiter
+from deezer_api.deezer_transport import DeezerTransport
+
+
+def run(count):
+    with StubServer() as server:
+        url = server.url + '/artist/{}'
+
+        start = time.perf_counter()
+        for i in range(count):
+            requests.get(url.format(i)).json()
+        plain = time.perf_counter() - start
+
+        with DeezerTransport(limiter=DeezerRateLimiter(default=None)) as transport:
+            start = time.perf_counter()
+            for i in range(count):
+                transport.get(url.format(i)).json()
+            pooled = time.perf_counter() - start
+
+    print('requests:  {} calls in {:.3f}s ({:.2f} ms/call)'.format(count, plain, plain * 1000 / count))
+    print('transport: {} calls in {:.3f}s ({:.2f} ms/call)'.format(count, pooled, pooled * 1000 / count))
+    print('speedup:   {:.2f}x'.format(plain / pooled))
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
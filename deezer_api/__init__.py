@@ -1,3 +1,12 @@
 from deezer_api.deezer_api import DeezerApi, Access
-from deezer_api.deezer_objects import PlayList, Album, Artist, Search, Track, User, DeezerError
+from deezer_api.deezer_async import AsyncDeezerApi
+from deezer_api.deezer_objects import PlayList, Album, Artist, Search, Track, User, KnownTracks, DeezerError, \
+    DeezerBatchError
+from deezer_api.deezer_graph import ArtistGraph
+from deezer_api.deezer_job import JobStore
+from deezer_api.deezer_metrics import DeezerMetrics
 from deezer_api.deezer_player import DeezerPlayer
+from deezer_api.deezer_ranking import TrackFilter
+from deezer_api.deezer_retry import RetryPolicy
+from deezer_api.deezer_scheduler import BatchScheduler, AsyncBatchScheduler, Lane
+from deezer_api.deezer_sync import PlaylistStore
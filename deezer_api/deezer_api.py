@@ -1,10 +1,21 @@
 import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 
-import requests
 import tqdm
 
 from deezer_api.deezer_auth import DeezerOAuth, DeezerTokenAuth, DeezerTokenAppAuth
+from deezer_api.deezer_cache import MemoryCache
+from deezer_api.deezer_flight import SingleFlight
+from deezer_api.deezer_graph import ArtistGraph
+from deezer_api.deezer_job import GenerationJob
+from deezer_api.deezer_metrics import MeteredTransport
 from deezer_api.deezer_objects import *
+from deezer_api.deezer_pagination import DeezerPaginator
+from deezer_api.deezer_ranking import CandidatePool
+from deezer_api.deezer_retry import RetryPolicy, RetryTransport
+from deezer_api.deezer_stream import JsonStream
+from deezer_api.deezer_transport import DeezerTransport
 
 
 class Access:
@@ -16,25 +27,72 @@ class Access:
 class DeezerApi:
 
     def __init__(self, app_id=None, secret=None, code=None, redirect_url=None, token=None, expired=3600,
-                 access=Access.BASIC):
+                 access=Access.BASIC, transport=None, max_workers=8, cache=None, flight=None, known_tracks=None,
+                 graph=None, playlist_store=None, metrics=None, retry=None):
         self.__access = access
+        self.__own_transport = transport is None
+        self.transport = self._create_transport() if transport is None else transport
+        self.cache = MemoryCache() if cache is None else cache
+        self.flight = self._create_flight() if flight is None else flight
+        self.known_tracks = KnownTracks() if known_tracks is None else known_tracks
+        self.graph = ArtistGraph() if graph is None else graph
+        self.playlist_store = playlist_store
+        self.metrics = metrics
+        self.retry = RetryPolicy() if retry is None else retry
+        clients_parameters = {'cache': self.cache, 'flight': self.flight, 'known_tracks': self.known_tracks,
+                              'metrics': self.metrics, 'retry': self.retry}
 
         if access == Access.BASIC:
-            self.__client = DeezerBasicAccess()
+            self.__client = self._client_class(access)(self.transport, **clients_parameters)
 
         elif access == Access.MANAGE or access == Access.DELETE:
+            auth_transport = self._auth_transport()
             if token is not None:
                 oauth = DeezerTokenAuth(token, access, expired)
             elif code is not None:
-                oauth = DeezerTokenAppAuth(app_id, secret, code, access, expired)
+                oauth = DeezerTokenAppAuth(app_id, secret, code, access, expired, auth_transport)
             else:
-                oauth = DeezerOAuth(app_id, secret, access, redirect_url)
+                oauth = DeezerOAuth(app_id, secret, access, redirect_url, auth_transport)
 
-            self.__client = DeezerManageAccess(oauth) if access == Access.MANAGE else DeezerDeleteAccess(oauth)
+            self.__client = self._client_class(access)(oauth, self.transport, max_workers=max_workers,
+                                                       graph=self.graph, playlist_store=self.playlist_store,
+                                                       **clients_parameters)
         else:
             raise DeezerError(DeezerErrorMessage.UnsupportedAccess
                               .format(access, Access.BASIC, Access.MANAGE, Access.DELETE))
 
+    @staticmethod
+    def _create_transport():
+        return DeezerTransport()
+
+    @staticmethod
+    def _create_flight():
+        return SingleFlight()
+
+    def _auth_transport(self):
+        return self.transport
+
+    @staticmethod
+    def _client_class(access):
+        if access == Access.BASIC:
+            return DeezerBasicAccess
+        return DeezerManageAccess if access == Access.MANAGE else DeezerDeleteAccess
+
+    @staticmethod
+    def _job_class():
+        return GenerationJob
+
+    @property
+    def _owns_transport(self):
+        return self.__own_transport
+
+    def close(self):
+        """
+        Release pooled connections, when transport was created by this client
+        """
+        if self.__own_transport:
+            self.transport.close()
+
     def get_artist(self, artist_id):
         """
         Get artist definition by id
@@ -92,14 +150,33 @@ class DeezerApi:
         """
         return self.__client.get_user(user_id)
 
-    def search_query(self, query_parameter, method=""):
+    def search_query(self, query_parameter, method="", limit=None):
         """
         Searching by query parameter and method
         :param query_parameter: query string [eminem]
         :param method: method name [empty/artist/user/playlist/track/album]
+        :param limit: count results, next pages are loaded until limit is reached. Only first page when empty
         :return: method object if method not empty or Search object
         """
-        return self.__client.search_query(query_parameter, method)
+        return self.__client.search_query(query_parameter, method, limit)
+
+    def iter_search(self, query_parameter, method="", limit=None):
+        """
+        Searching by query parameter and method, results are parsed while response is downloaded
+        :param query_parameter: query string [eminem]
+        :param method: method name [empty/artist/user/playlist/track/album]
+        :param limit: count results, next pages are loaded until limit is reached. Only first page when empty
+        :return: generator of method objects if method not empty or Search objects
+        """
+        return self.__client.iter_search(query_parameter, method, limit)
+
+    def iter_playlist_tracks(self, playlist_id):
+        """
+        Get playlist tracks by playlist id, tracks are parsed while response is downloaded
+        :param playlist_id: id
+        :return: generator of Track objects
+        """
+        return self.__client.iter_playlist_tracks(playlist_id)
 
     def get_user_me(self):
         """
@@ -112,7 +189,7 @@ class DeezerApi:
 
     def get_my_playlist(self):
         """
-        Get my playlist [access > Basic]
+        Get my playlist [access > Basic]. With playlist_store only playlists with changed checksum are downloaded
         :return: list Playlist object
         """
         if self.__access == Access.BASIC:
@@ -137,32 +214,64 @@ class DeezerApi:
         """
         if self.__access == Access.BASIC:
             raise DeezerError(DeezerErrorMessage.PermissionDenied.format(self.__access, 'add track in playlist'))
-        self.__client.add_track_to_playlist(playlist_id, track_id)
+        return self.__client.add_track_to_playlist(playlist_id, track_id)
+
+    def add_tracks_to_playlist(self, playlist_id, track_ids):
+        """
+        Add tracks to playlist by chunks sent concurrently [access > Basic]
+        :param playlist_id: playlist id
+        :param track_ids: list of track id
+        :raise DeezerBatchError: with failed chunks, others are added
+        """
+        if self.__access == Access.BASIC:
+            raise DeezerError(DeezerErrorMessage.PermissionDenied.format(self.__access, 'add track in playlist'))
+        return self.__client.add_tracks_to_playlist(playlist_id, track_ids)
 
-    def generate_tracks(self, count_tracks):
+    def generate_tracks(self, count_tracks, track_filter=None, weights=None):
         """
         Generate recommended tracks by your preferences in Deezer [access > Basic]
         :param count_tracks: count recommendations
+        :param track_filter: TrackFilter object: duration range, explicit lyrics, release years
+        :param weights: weights of score parts: rank, affinity, distance, recency, bpm, gain
         :return: list Track object
         """
         if self.__access == Access.BASIC:
             raise DeezerError(DeezerErrorMessage.PermissionDenied
                               .format(self.__access, 'generate tracks by yours preferences'))
-        return self.__client.generate_tracks(count_tracks)
+        return self.__client.generate_tracks(count_tracks, track_filter, weights)
 
-    def create_recommendation_playlist(self, title='Deezer Recommendation', count_tracks=50):
+    def create_recommendation_playlist(self, title='Deezer Recommendation', count_tracks=50, track_filter=None,
+                                       weights=None):
         """
         Create recommendation playlist
         :param title: name of playlist
         :param count_tracks: count tracks
+        :param track_filter: TrackFilter object: duration range, explicit lyrics, release years
+        :param weights: weights of score parts: rank, affinity, distance, recency, bpm, gain
         :return: tracks
         """
-        tracks = self.generate_tracks(count_tracks)
+        tracks = self.generate_tracks(count_tracks, track_filter, weights)
         recommendation_playlist = self.create_playlist(title)
-        for track in tracks:
-            self.add_track_to_playlist(recommendation_playlist.id, track.id)
+        self.add_tracks_to_playlist(recommendation_playlist.id, [track.id for track in tracks])
         return tracks
 
+    def generation_job(self, job_id, store, title='Deezer Recommendation', count_tracks=50, track_filter=None,
+                       weights=None):
+        """
+        Resumable create_recommendation_playlist [access > Basic]. Output of every stage is saved in store,
+        the job run again with the same id continues from the last completed stage
+        :param job_id: id of the job in store
+        :param store: JobStore object
+        :param title: name of playlist
+        :param count_tracks: count tracks
+        :param track_filter: TrackFilter object: duration range, explicit lyrics, release years
+        :param weights: weights of score parts: rank, affinity, distance, recency, bpm, gain
+        :return: GenerationJob object, run() returns tracks
+        """
+        if self.__access == Access.BASIC:
+            raise DeezerError(DeezerErrorMessage.PermissionDenied.format(self.__access, 'create playlist'))
+        return self._job_class()(self.__client, job_id, store, title, count_tracks, track_filter, weights)
+
     def get_favourites_artists_by_playlist_id(self, user_playlist, count_tracks=50):
         """
         Get your favourites artist in playlist [access > Basic]
@@ -182,7 +291,7 @@ class DeezerApi:
         """
         if self.__access != Access.DELETE:
             raise DeezerError(DeezerErrorMessage.PermissionDenied.format(self.__access, 'delete playlist'))
-        self.__client.delete_playlist(playlist_id)
+        return self.__client.delete_playlist(playlist_id)
 
     def delete_track(self, playlist_id, track_id):
         """
@@ -192,173 +301,407 @@ class DeezerApi:
         """
         if self.__access != Access.DELETE:
             raise DeezerError(DeezerErrorMessage.PermissionDenied.format(self.__access, 'delete track'))
-        self.__client.delete_track(playlist_id, track_id)
+        return self.__client.delete_track(playlist_id, track_id)
+
+    def delete_tracks(self, playlist_id, track_ids):
+        """
+        Delete tracks in playlist by chunks sent concurrently [access > Manage]
+        :param playlist_id: playlist id
+        :param track_ids: list of track id
+        :raise DeezerBatchError: with failed chunks, others are deleted
+        """
+        if self.__access != Access.DELETE:
+            raise DeezerError(DeezerErrorMessage.PermissionDenied.format(self.__access, 'delete track'))
+        return self.__client.delete_tracks(playlist_id, track_ids)
 
 
 class DeezerBasicAccess:
+    ChunkSize = 64 * 1024
+
+    def __init__(self, transport=None, cache=None, flight=None, known_tracks=None, metrics=None, retry=None):
+        transport = DeezerTransport() if transport is None else transport
+        if retry is not None:
+            transport = RetryTransport(transport, retry, metrics)
+        self.transport = transport if metrics is None else MeteredTransport(transport, metrics)
+        self.cache = cache
+        self.flight = SingleFlight() if flight is None else flight
+        self.known_tracks = KnownTracks() if known_tracks is None else known_tracks
+        self.metrics = metrics
+
+    def _load(self, entity, entity_id, load):
+        key = '{}:{}'.format(entity, entity_id)
+        data = self.cache.get(entity, key) if self.cache is not None else None
+        if self.metrics is not None and self.cache is not None:
+            self.metrics.cache_used(entity, data is not None)
+        if data is None:
+            data = self.flight.do(key, lambda: self.__store(entity, key, load()))
+        return data
+
+    def _parse(self, name, parse, *args):
+        if self.metrics is None:
+            return parse(*args)
+        start = time.perf_counter()
+        try:
+            return parse(*args)
+        finally:
+            self.metrics.parsed(name, time.perf_counter() - start)
 
-    @staticmethod
-    def get_artist(artist_id):
+    def __store(self, entity, key, data):
+        if self.cache is not None and not (isinstance(data, dict) and 'error' in data):
+            self.cache.set(entity, key, data)
+        return data
+
+    def _load_json(self, entity, entity_id, url):
+        return self._load(entity, entity_id, lambda: self._parse(entity, self.transport.get(url).json))
+
+    def _load_page(self, url):
+        response = self.transport.get(url)
         try:
-            response = requests.get(DeezerUrl.ArtistUrl.format(artist_id))
-            return Artist(response.json())
+            data = response.json() if response.status_code == 200 else {}
+        except ValueError:
+            data = {}
+        if not isinstance(data, dict) or not data or data.get('error', None) is not None:
+            raise DeezerError(DeezerErrorMessage.PageNotLoaded.format(url))
+        return data
+
+    def get_artist(self, artist_id):
+        try:
+            return Artist(self._load_json('artist', artist_id, DeezerUrl.ArtistUrl.format(artist_id)))
         except Exception:
             raise DeezerError(DeezerErrorMessage.ArtistNotFound.format(artist_id))
 
-    @staticmethod
-    def get_track(track_id):
+    def get_track(self, track_id):
         try:
-            response = requests.get(DeezerUrl.TrackUrl.format(track_id))
-            return Track(response.json())
+            return Track(self._load_json('track', track_id, DeezerUrl.TrackUrl.format(track_id)))
         except Exception:
             raise DeezerError(DeezerErrorMessage.TrackNotFound.format(track_id))
 
-    @staticmethod
-    def get_album(album_id):
+    def get_album(self, album_id):
         try:
-            response = requests.get(DeezerUrl.AlbumUrl.format(album_id))
-            return Album(response.json())
+            return Album(self._load_json('album', album_id, DeezerUrl.AlbumUrl.format(album_id)))
         except Exception:
             raise DeezerError(DeezerErrorMessage.AlbumNotFound.format(album_id))
 
-    @staticmethod
-    def get_artist_tracks(artist_id, limit):
-        response = requests.get(DeezerUrl.TopArtist.format(artist_id, limit))
-        if response.status_code != 200 or response.json().get('error', None) is not None:
-            raise DeezerError(DeezerErrorMessage.ArtistNotFound.format(response.reason))
-        response_data = response.json()['data']
+    def get_artist_tracks(self, artist_id, limit):
+        response_data = self._load('artist_top', '{}:{}'.format(artist_id, limit),
+                                   lambda: self.__load_artist_tracks(artist_id, limit))
+        return self._parse('artist_top', self.__artist_tracks, artist_id, response_data)
+
+    def __artist_tracks(self, artist_id, response_data):
         result = []
         for track_element in response_data:
             soundtrack = Track(track_element)
-            if playlist.get(artist_id) is None or \
-                    soundtrack.id not in playlist.get(artist_id):
+            if not self.known_tracks.contains(artist_id, soundtrack.id):
                 result.append(soundtrack)
         return result
 
-    @staticmethod
-    def get_playlist(playlist_id):
+    def __load_artist_tracks(self, artist_id, limit):
         try:
-            response = requests.get(DeezerUrl.PlayListUrl.format(playlist_id))
-            return PlayList(response.json())
+            return list(DeezerPaginator(self._load_page, DeezerUrl.TopArtist.format(artist_id, limit), limit))
+        except DeezerError:
+            raise DeezerError(DeezerErrorMessage.ArtistNotFound.format(artist_id))
+
+    def get_playlist(self, playlist_id):
+        try:
+            return self._parse('playlist', PlayList,
+                               self._load('playlist', playlist_id, lambda: self._load_playlist(playlist_id)),
+                               self.known_tracks)
         except Exception:
             raise DeezerError(DeezerErrorMessage.PlaylistNotFound.format(playlist_id))
 
+    def _load_playlist(self, playlist_id, access_token=None):
+        """
+        :param access_token: token of the owner, required for private playlists
+        """
+        data = self.transport.get(self._playlist_url(playlist_id, access_token)).json()
+        tracks = data.get('tracks', {}).get('data', None)
+        if tracks is not None and len(tracks) < (data.get('nb_tracks', None) or 0):
+            url = data['tracks'].get('next', None) or self._playlist_tracks_url(playlist_id, access_token,
+                                                                                len(tracks))
+            tracks.extend(DeezerPaginator(self._load_page, url, data['nb_tracks'] - len(tracks)))
+        return data
+
     @staticmethod
-    def get_related_artists(artist_id):
-        response = requests.get(DeezerUrl.RelatedArtistUrl.format(artist_id))
-        if response.status_code != 200:
-            raise DeezerError(DeezerErrorMessage.ArtistNotFound.format(response.reason))
-        playlist_data = DeezerParser.parse_html(response)['RELATED_ARTISTS']['data']
+    def _playlist_url(playlist_id, access_token=None):
+        if access_token is None:
+            return DeezerUrl.PlayListUrl.format(playlist_id)
+        return DeezerUrl.RestrictedPlayListUrl.format(playlist_id, access_token)
+
+    @staticmethod
+    def _playlist_tracks_url(playlist_id, access_token, index):
+        if access_token is None:
+            return DeezerUrl.PlayListTracksUrl.format(playlist_id, index)
+        return DeezerUrl.RestrictedPlayListTracksUrl.format(playlist_id, access_token, index)
+
+    def get_related_artists(self, artist_id):
+        playlist_data = self._load('related_artists', artist_id, lambda: self.__load_related_artists(artist_id))
         result = []
         for p in playlist_data:
             result.append(Artist(p))
         return result
 
-    @staticmethod
-    def get_user(user_id):
+    def __load_related_artists(self, artist_id):
+        response = self.transport.get(DeezerUrl.RelatedArtistUrl.format(artist_id))
+        if response.status_code != 200:
+            raise DeezerError(DeezerErrorMessage.ArtistNotFound.format(response.reason))
+        return self._parse('related_artists', DeezerParser.parse_app_state, response.content, 'RELATED_ARTISTS',
+                           'data')
+
+    def get_user(self, user_id):
         try:
-            response = requests.get(DeezerUrl.UserUrl.format(user_id))
-            return User(response.json())
+            return User(self._load_json('user', user_id, DeezerUrl.UserUrl.format(user_id)))
         except Exception:
             raise DeezerError(DeezerErrorMessage.UserNotFound.format(user_id))
 
-    @staticmethod
-    def search_query(query_parameter, method):
+    def search_query(self, query_parameter, method, limit=None):
+        return list(self.iter_search(query_parameter, method, limit))
+
+    def iter_search(self, query_parameter, method, limit=None):
         method_type = method if method == '' else '/{}'.format(method)
-        response = requests.get(DeezerUrl.SearchUrl.format(method_type, query_parameter))
-        if response.status_code != 200 or response.json().get('error', None) is not None:
-            raise DeezerError(DeezerErrorMessage.SearchNotFound.format(query_parameter, method))
-        searches = []
-        for search in response.json().get('data', []):
-            searches.append(DeezerParser.parse_searches(search, method))
-        return searches
+        response = self.transport.get(DeezerUrl.SearchUrl.format(method_type, query_parameter), stream=True)
+        count = 0
+        try:
+            if response.status_code != 200:
+                raise DeezerError(DeezerErrorMessage.SearchNotFound.format(query_parameter, method))
+            stream = JsonStream(response.iter_content(self.ChunkSize), ('data',))
+            for search in stream:
+                if limit is not None and count >= limit:
+                    return
+                yield DeezerParser.parse_searches(search, method)
+                count += 1
+            if stream.meta.get('error', None) is not None:
+                raise DeezerError(DeezerErrorMessage.SearchNotFound.format(query_parameter, method))
+        finally:
+            response.close()
+
+        next_url = stream.meta.get('next', None)
+        if limit is not None and count < limit and next_url:
+            for search in DeezerPaginator(self._load_page, next_url, limit - count):
+                yield DeezerParser.parse_searches(search, method)
+
+    def iter_playlist_tracks(self, playlist_id):
+        response = self.transport.get(DeezerUrl.PlayListUrl.format(playlist_id), stream=True)
+        count = 0
+        try:
+            if response.status_code != 200:
+                raise DeezerError(DeezerErrorMessage.PlaylistNotFound.format(playlist_id))
+            stream = JsonStream(response.iter_content(self.ChunkSize), ('tracks', 'data'))
+            for track in DeezerParser.iter_tracks(stream, self.known_tracks):
+                yield track
+                count += 1
+            if stream.meta.get('error', None) is not None:
+                raise DeezerError(DeezerErrorMessage.PlaylistNotFound.format(playlist_id))
+        finally:
+            response.close()
+
+        nb_tracks = stream.meta.get('nb_tracks', None) or 0
+        if count < nb_tracks:
+            url = stream.meta['tracks'].get('next', None) or DeezerUrl.PlayListTracksUrl.format(playlist_id, count)
+            pages = DeezerPaginator(self._load_page, url, nb_tracks - count)
+            yield from DeezerParser.iter_tracks(pages, self.known_tracks)
 
 
 class DeezerManageAccess(DeezerBasicAccess):
+    MaxUrlLength = 2000
 
-    def __init__(self, oauth):
+    def __init__(self, oauth, transport=None, max_workers=8, cache=None, flight=None, known_tracks=None,
+                 graph=None, playlist_store=None, metrics=None, retry=None):
+        super().__init__(transport, cache, flight, known_tracks, metrics, retry)
         self.oauth = oauth
+        self.max_workers = max_workers
+        self.graph = ArtistGraph() if graph is None else graph
+        self.playlist_store = playlist_store
         self.user_id = self.get_user_me().id
 
     def get_user_me(self):
-        response = requests.get(DeezerUrl.RestrictedUserUrl.format(self.oauth.get_access_token()))
-        if response.status_code != 200 or response.json().get('error', None) is not None:
+        response = self.transport.get(DeezerUrl.RestrictedUserUrl.format(self.oauth.get_access_token()))
+        data = response.json() if response.status_code == 200 else {}
+        if not data or data.get('error', None) is not None:
             raise Exception(DeezerErrorMessage.SearchNotFoundAuth)
-        return User(response.json())
+        return User(data)
 
     def get_my_playlist(self):
-        response = requests.get(DeezerUrl.ProfilePlaylistUrl.format(self.user_id))
+        if self.playlist_store is not None:
+            return self.sync_my_playlist()
+        response = self.transport.get(DeezerUrl.ProfilePlaylistUrl.format(self.user_id))
         if response.status_code != 200:
             raise DeezerError(DeezerErrorMessage.PlaylistNotFoundAuth)
-        playlist_data = DeezerParser.parse_html(response)['TAB']['playlists']['data']
-        result = []
-        playlist_range = len(playlist_data)
-        for i in tqdm.tqdm(range(playlist_range), desc='Processing user playlist'):
-            playlist_id = playlist_data[i].get('PLAYLIST_ID', None)
-            result.append(self.get_playlist(playlist_id))
-            time.sleep(0.1)
-        return result
+        playlist_data = self._parse('profile', DeezerParser.parse_app_state, response.content, 'TAB', 'playlists',
+                                    'data')
+        return self.get_playlists([p.get('PLAYLIST_ID', None) for p in playlist_data])
+
+    def get_playlists(self, playlist_ids):
+        return self._map_playlists(self.get_playlist, playlist_ids)
+
+    def sync_my_playlist(self):
+        summaries = self.get_playlist_summaries()
+        changed = self.playlist_store.changed(self.user_id, summaries)
+        self.playlist_store.update(self.user_id, summaries, self._map_playlists(self._fetch_playlist, changed))
+        return [PlayList(data, self.known_tracks) for data in self.playlist_store.playlists(self.user_id)]
+
+    def get_own_playlist_data(self, playlist_id):
+        """
+        Playlist of the user with the access token, private playlists included
+        :return: playlist data as returned by Deezer, tracks of all pages included
+        """
+        return self._load_playlist(playlist_id, self.oauth.get_access_token())
+
+    def get_playlist_summaries(self):
+        """
+        :return: all playlists of the user without tracks [{'id': .., 'title': .., 'checksum': ..}], private included
+        """
+        url = DeezerUrl.RestrictedUserPlayListsUrl.format(self.user_id, self.oauth.get_access_token())
+        try:
+            return list(DeezerPaginator(self._load_page, url))
+        except DeezerError:
+            raise DeezerError(DeezerErrorMessage.PlaylistNotFoundAuth)
+
+    def _fetch_playlist(self, playlist_id):
+        data = self.get_own_playlist_data(playlist_id)
+        if data.get('id', None) is None:
+            raise DeezerError(DeezerErrorMessage.PlaylistNotFound.format(playlist_id))
+        return data
+
+    def _map_playlists(self, load, playlist_ids):
+        with tqdm.tqdm(total=len(playlist_ids), desc='Processing user playlist') as progress, \
+                ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = []
+            for playlist_id in playlist_ids:
+                future = executor.submit(load, playlist_id)
+                future.add_done_callback(lambda f: progress.update())
+                futures.append(future)
+            return [future.result() for future in futures]
 
     def create_playlist(self, title):
         try:
-            response = requests.post(
+            response = self.transport.post(
                 DeezerUrl.RestrictedAddPlayListUrl.format(self.user_id, self.oauth.get_access_token(), title))
             playlist_id = response.json()['id']
-            return self.get_playlist(playlist_id)
+            return PlayList(self.get_own_playlist_data(playlist_id), self.known_tracks)
         except Exception:
             raise DeezerError(DeezerErrorMessage.PlaylistNotCreated.format(title))
 
     def add_track_to_playlist(self, playlist_id, track_id):
         try:
-            requests.post(DeezerUrl.RestrictedTrackUrl.format(playlist_id, self.oauth.get_access_token(), track_id))
+            self.transport.post(
+                DeezerUrl.RestrictedTrackUrl.format(playlist_id, self.oauth.get_access_token(), track_id))
         except Exception:
             raise DeezerError(DeezerErrorMessage.TrackNotAddedToPlaylist.format(track_id, playlist_id))
 
-    def generate_tracks(self, count_tracks):
+    def add_tracks_to_playlist(self, playlist_id, track_ids):
+        self._send_chunks(self.transport.post, playlist_id, track_ids, DeezerErrorMessage.TracksNotAddedToPlaylist)
+
+    def _send_chunks(self, send, playlist_id, track_ids, message):
+        url = DeezerUrl.RestrictedTrackUrl.format(playlist_id, self.oauth.get_access_token(), '')
+        chunks = self._track_chunks(url, track_ids)
+        if not chunks:
+            return
+
+        def send_chunk(chunk):
+            try:
+                return self._chunk_error(send(url + ','.join(map(str, chunk))))
+            except Exception as e:
+                return str(e) or type(e).__name__
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as executor:
+            self._raise_failed(playlist_id, chunks, list(executor.map(send_chunk, chunks)), message)
+
+    @staticmethod
+    def _track_chunks(url, track_ids):
+        chunks = []
+        length = DeezerManageAccess.MaxUrlLength
+        for track_id in track_ids:
+            size = len(str(track_id)) + 1
+            if length + size > DeezerManageAccess.MaxUrlLength:
+                chunks.append([])
+                length = len(url)
+            chunks[-1].append(track_id)
+            length += size
+        return chunks
+
+    @staticmethod
+    def _chunk_error(response):
+        if response.status_code != 200:
+            return response.reason
+        data = response.json()
+        if isinstance(data, dict) and data.get('error', None) is not None:
+            return data['error'].get('message', None) or str(data['error'])
+        return None
+
+    @staticmethod
+    def _raise_failed(playlist_id, chunks, errors, message):
+        failed = [(chunk, error) for chunk, error in zip(chunks, errors) if error is not None]
+        if failed:
+            raise DeezerBatchError(message.format(','.join(str(i) for chunk, _ in failed for i in chunk), playlist_id,
+                                                  '; '.join(sorted(set(error for _, error in failed)))), failed)
+
+    def generate_tracks(self, count_tracks, track_filter=None, weights=None):
+        pool = CandidatePool(weights, track_filter)
         user_playlist = self.get_my_playlist()
-        user_artists = self.get_favourites_artists_by_playlist_id(user_playlist, count_tracks)
-        count_artist = len(user_artists) if len(user_artists) <= count_tracks else count_tracks
-        all_tracks = {}
-        for i in tqdm.tqdm(range(count_artist), desc='Generating playlist'):
-            all_tracks[user_artists[i].name] = self.get_artist_tracks(user_artists[i].id, count_tracks)
-            time.sleep(0.01)
-        return self.__get_tracks(all_tracks, count_tracks)
+        user_artists, distances = self._expand_artists(user_playlist, count_tracks)
+        pool.add_playlists(user_playlist)
+        for artist in tqdm.tqdm(user_artists, desc='Generating playlist'):
+            artist_id = int(artist.id)
+            pool.add_tracks(artist_id, self.get_artist_tracks(artist_id, count_tracks), distances[artist_id])
+        return pool.top(count_tracks)
 
     def get_favourites_artists_by_playlist_id(self, user_playlist, count_tracks):
-        artist = []
-        for playList in user_playlist:
-            for soundtrack in playList.tracks:
-                artist.append(soundtrack.artist)
-                artist.extend(self.get_related_artists(soundtrack.artist.id))
-                if len(artist) > count_tracks:
-                    break
-        return list(dict.fromkeys(artist))
+        return self._expand_artists(user_playlist, count_tracks)[0]
+
+    def _expand_artists(self, user_playlist, count_artists):
+        seeds, artists = self._seed_artists(user_playlist)
+        return self.expand_seeds(seeds, artists, count_artists)
+
+    def expand_seeds(self, seeds, artists, count_artists):
+        """
+        Expand the most common seed artists over the related artists graph
+        :param seeds: Counter artist id -> count of tracks of the user
+        :param artists: dict artist id -> Artist object, filled with loaded related artists
+        :param count_artists: count of seed artists to expand and of returned artists
+        :return: ranked list of Artist objects and dict artist id -> distance from seeds
+        """
+        def load_related(artist_id):
+            related = self.get_related_artists(artist_id)
+            for artist in related:
+                artists.setdefault(int(artist.id), artist)
+            return [artist.id for artist in related]
+
+        distances = self.graph.expand([artist_id for artist_id, _ in seeds.most_common(count_artists)], load_related,
+                                      max_workers=self.max_workers)
+        return self._ranked_artists(self.graph, seeds, artists, distances, count_artists), distances
 
     @staticmethod
-    def __get_tracks(track_list, count_tracks):
-        result = []
-        index = 0
-        while len(result) != count_tracks:
-            for soundtrack in track_list:
-                result.append(track_list.get(soundtrack)[index])
-                if len(result) == count_tracks:
-                    break
-
-            if len(result) < count_tracks:
-                index += 1
-        return result
+    def _seed_artists(user_playlist):
+        seeds, artists = Counter(), {}
+        for playlist in user_playlist:
+            for soundtrack in playlist.tracks:
+                artist = soundtrack.artist
+                if getattr(artist, 'id', None) is not None:
+                    seeds[int(artist.id)] += 1
+                    artists.setdefault(int(artist.id), artist)
+        return seeds, artists
+
+    @staticmethod
+    def _ranked_artists(graph, seeds, artists, distances, count_artists):
+        ranks = graph.rank(seeds, distances)
+        ranked = sorted(distances, key=lambda artist_id: (-ranks[artist_id], distances[artist_id]))[:count_artists]
+        return [artists.get(artist_id, None) or Artist({'id': artist_id}) for artist_id in ranked]
 
 
 class DeezerDeleteAccess(DeezerManageAccess):
 
     def delete_playlist(self, playlist_id):
         try:
-            requests.delete(DeezerUrl.RestrictedPlayListUrl.format(playlist_id, self.oauth.get_access_token()))
+            self.transport.delete(DeezerUrl.RestrictedPlayListUrl.format(playlist_id, self.oauth.get_access_token()))
         except Exception:
             raise DeezerError(DeezerErrorMessage.DeletePlaylist.format(playlist_id))
 
     def delete_track(self, playlist_id, track_id):
         try:
-            requests.delete(DeezerUrl.RestrictedTrackUrl.format(playlist_id, self.oauth.get_access_token(), track_id))
+            self.transport.delete(
+                DeezerUrl.RestrictedTrackUrl.format(playlist_id, self.oauth.get_access_token(), track_id))
         except Exception:
             raise DeezerError(DeezerErrorMessage.DeleteTrack.format(playlist_id, track_id))
+
+    def delete_tracks(self, playlist_id, track_ids):
+        self._send_chunks(self.transport.delete, playlist_id, track_ids, DeezerErrorMessage.DeleteTracks)
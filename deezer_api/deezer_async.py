@@ -0,0 +1,513 @@
+import asyncio
+import json
+import time
+
+import tqdm
+
+from deezer_api.deezer_api import DeezerApi, DeezerBasicAccess, DeezerManageAccess, Access
+from deezer_api.deezer_flight import AsyncSingleFlight
+from deezer_api.deezer_graph import ArtistGraph
+from deezer_api.deezer_job import AsyncGenerationJob
+from deezer_api.deezer_limiter import DeezerRateLimiter
+from deezer_api.deezer_metrics import AsyncMeteredTransport
+from deezer_api.deezer_objects import *
+from deezer_api.deezer_pagination import AsyncDeezerPaginator
+from deezer_api.deezer_ranking import CandidatePool
+from deezer_api.deezer_retry import AsyncRetryTransport
+from deezer_api.deezer_transport import DeezerTransport
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class DeezerResponse:
+    """
+    Fully read HTTP response with the part of requests.Response interface used by the clients
+    """
+
+    def __init__(self, status_code, reason, headers, content):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return json.loads(self.text)
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+
+class AsyncDeezerTransport:
+    """
+    Shared aiohttp transport with a keep-alive connection pool per Deezer host
+    """
+
+    def __init__(self, pool_size=10, connect_timeout=5, read_timeout=30, limiter=None, hosts=None):
+        if aiohttp is None:
+            raise DeezerError(DeezerErrorMessage.AsyncUnavailable)
+        self.pool_size = pool_size
+        self.limiter = DeezerRateLimiter.shared() if limiter is None else limiter
+        self.hosts = hosts
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        self.session = None
+
+    def _get_session(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=0, limit_per_host=self.pool_size)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self.session
+
+    async def request(self, method, url, **kwargs):
+        await self.limiter.acquire_async(url)
+        url = DeezerTransport.rewrite(url, self.hosts)
+        async with self._get_session().request(method, url, **kwargs) as response:
+            content = await response.read()
+            return DeezerResponse(response.status, response.reason, response.headers, content)
+
+    async def get(self, url, **kwargs):
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request('POST', url, **kwargs)
+
+    async def delete(self, url, **kwargs):
+        return await self.request('DELETE', url, **kwargs)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+
+class AsyncParsedItems:
+    """
+    Async iterator of parsed items of another async iterator: use with 'async for'
+    """
+
+    def __init__(self, items, parse):
+        self.items = items
+        self.parse = parse
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return self.parse(await self.items.__anext__())
+
+
+class AsyncDeezerApi(DeezerApi):
+    """
+    Asyncio version of DeezerApi: every request method returns a coroutine, iter_search and iter_playlist_tracks
+    return async iterators. Token generation for app auth stays synchronous and happens once per session.
+    """
+
+    @staticmethod
+    def _create_transport():
+        return AsyncDeezerTransport()
+
+    @staticmethod
+    def _create_flight():
+        return AsyncSingleFlight()
+
+    def _auth_transport(self):
+        return None
+
+    @staticmethod
+    def _client_class(access):
+        if access == Access.BASIC:
+            return AsyncDeezerBasicAccess
+        return AsyncDeezerManageAccess if access == Access.MANAGE else AsyncDeezerDeleteAccess
+
+    @staticmethod
+    def _job_class():
+        return AsyncGenerationJob
+
+    async def create_recommendation_playlist(self, title='Deezer Recommendation', count_tracks=50, track_filter=None,
+                                             weights=None):
+        """
+        Create recommendation playlist
+        :param title: name of playlist
+        :param count_tracks: count tracks
+        :param track_filter: TrackFilter object: duration range, explicit lyrics, release years
+        :param weights: weights of score parts: rank, affinity, distance, recency, bpm, gain
+        :return: tracks
+        """
+        tracks = await self.generate_tracks(count_tracks, track_filter, weights)
+        recommendation_playlist = await self.create_playlist(title)
+        await self.add_tracks_to_playlist(recommendation_playlist.id, [track.id for track in tracks])
+        return tracks
+
+    def iter_search(self, query_parameter, method="", limit=None):
+        """
+        Searching by query parameter and method. Every page is downloaded in full before its results are yielded,
+        the next page is loaded while results of the current one are consumed
+        :param query_parameter: query string [eminem]
+        :param method: method name [empty/artist/user/playlist/track/album]
+        :param limit: count results, next pages are loaded until limit is reached. Only first page when empty
+        :return: async iterator of method objects if method not empty or Search objects
+        """
+        return super().iter_search(query_parameter, method, limit)
+
+    def iter_playlist_tracks(self, playlist_id):
+        """
+        Get playlist tracks by playlist id. Every page is downloaded in full before its tracks are yielded,
+        the next page is loaded while tracks of the current one are consumed
+        :param playlist_id: id
+        :return: async iterator of Track objects
+        """
+        return super().iter_playlist_tracks(playlist_id)
+
+    async def close(self):
+        """
+        Release pooled connections, when transport was created by this client
+        """
+        if self._owns_transport:
+            await self.transport.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+
+class AsyncDeezerBasicAccess:
+
+    def __init__(self, transport=None, cache=None, flight=None, known_tracks=None, metrics=None, retry=None):
+        transport = AsyncDeezerTransport() if transport is None else transport
+        if retry is not None:
+            transport = AsyncRetryTransport(transport, retry, metrics)
+        self.transport = transport if metrics is None else AsyncMeteredTransport(transport, metrics)
+        self.cache = cache
+        self.flight = AsyncSingleFlight() if flight is None else flight
+        self.known_tracks = KnownTracks() if known_tracks is None else known_tracks
+        self.metrics = metrics
+
+    def _parse(self, name, parse, *args):
+        if self.metrics is None:
+            return parse(*args)
+        start = time.perf_counter()
+        try:
+            return parse(*args)
+        finally:
+            self.metrics.parsed(name, time.perf_counter() - start)
+
+    async def _load(self, entity, entity_id, load):
+        key = '{}:{}'.format(entity, entity_id)
+        data = self.cache.get(entity, key) if self.cache is not None else None
+        if self.metrics is not None and self.cache is not None:
+            self.metrics.cache_used(entity, data is not None)
+        if data is None:
+            async def load_and_store():
+                loaded = await load()
+                if self.cache is not None and not (isinstance(loaded, dict) and 'error' in loaded):
+                    self.cache.set(entity, key, loaded)
+                return loaded
+
+            data = await self.flight.do(key, load_and_store)
+        return data
+
+    async def _load_json(self, entity, entity_id, url):
+        async def load():
+            return self._parse(entity, (await self.transport.get(url)).json)
+
+        return await self._load(entity, entity_id, load)
+
+    async def get_artist(self, artist_id):
+        try:
+            return Artist(await self._load_json('artist', artist_id, DeezerUrl.ArtistUrl.format(artist_id)))
+        except Exception:
+            raise DeezerError(DeezerErrorMessage.ArtistNotFound.format(artist_id))
+
+    async def get_track(self, track_id):
+        try:
+            return Track(await self._load_json('track', track_id, DeezerUrl.TrackUrl.format(track_id)))
+        except Exception:
+            raise DeezerError(DeezerErrorMessage.TrackNotFound.format(track_id))
+
+    async def get_album(self, album_id):
+        try:
+            return Album(await self._load_json('album', album_id, DeezerUrl.AlbumUrl.format(album_id)))
+        except Exception:
+            raise DeezerError(DeezerErrorMessage.AlbumNotFound.format(album_id))
+
+    async def _load_page(self, url):
+        response = await self.transport.get(url)
+        try:
+            data = response.json() if response.status_code == 200 else {}
+        except ValueError:
+            data = {}
+        if not isinstance(data, dict) or not data or data.get('error', None) is not None:
+            raise DeezerError(DeezerErrorMessage.PageNotLoaded.format(url))
+        return data
+
+    async def get_artist_tracks(self, artist_id, limit):
+        async def load():
+            try:
+                return await AsyncDeezerPaginator(self._load_page, DeezerUrl.TopArtist.format(artist_id, limit),
+                                                  limit).collect()
+            except DeezerError:
+                raise DeezerError(DeezerErrorMessage.ArtistNotFound.format(artist_id))
+
+        return self._parse('artist_top', self.__artist_tracks, artist_id,
+                           await self._load('artist_top', '{}:{}'.format(artist_id, limit), load))
+
+    def __artist_tracks(self, artist_id, response_data):
+        result = []
+        for track_element in response_data:
+            soundtrack = Track(track_element)
+            if not self.known_tracks.contains(artist_id, soundtrack.id):
+                result.append(soundtrack)
+        return result
+
+    async def get_playlist(self, playlist_id):
+        try:
+            return self._parse('playlist', PlayList,
+                               await self._load('playlist', playlist_id, lambda: self._load_playlist(playlist_id)),
+                               self.known_tracks)
+        except Exception:
+            raise DeezerError(DeezerErrorMessage.PlaylistNotFound.format(playlist_id))
+
+    async def _load_playlist(self, playlist_id, access_token=None):
+        data = (await self.transport.get(DeezerBasicAccess._playlist_url(playlist_id, access_token))).json()
+        tracks = data.get('tracks', {}).get('data', None)
+        if tracks is not None and len(tracks) < (data.get('nb_tracks', None) or 0):
+            url = data['tracks'].get('next', None) or \
+                DeezerBasicAccess._playlist_tracks_url(playlist_id, access_token, len(tracks))
+            tracks.extend(await AsyncDeezerPaginator(self._load_page, url, data['nb_tracks'] - len(tracks)).collect())
+        return data
+
+    async def get_related_artists(self, artist_id):
+        async def load():
+            response = await self.transport.get(DeezerUrl.RelatedArtistUrl.format(artist_id))
+            if response.status_code != 200:
+                raise DeezerError(DeezerErrorMessage.ArtistNotFound.format(response.reason))
+            return self._parse('related_artists', DeezerParser.parse_app_state, response.content, 'RELATED_ARTISTS',
+                               'data')
+
+        return [Artist(p) for p in await self._load('related_artists', artist_id, load)]
+
+    async def get_user(self, user_id):
+        try:
+            return User(await self._load_json('user', user_id, DeezerUrl.UserUrl.format(user_id)))
+        except Exception:
+            raise DeezerError(DeezerErrorMessage.UserNotFound.format(user_id))
+
+    async def search_query(self, query_parameter, method, limit=None):
+        method_type = method if method == '' else '/{}'.format(method)
+        url = DeezerUrl.SearchUrl.format(method_type, query_parameter)
+        if limit is None:
+            response = await self.transport.get(url)
+            data = response.json() if response.status_code == 200 else {}
+            if not data or data.get('error', None) is not None:
+                raise DeezerError(DeezerErrorMessage.SearchNotFound.format(query_parameter, method))
+            return [DeezerParser.parse_searches(search, method) for search in data.get('data', [])]
+        try:
+            searches = await AsyncDeezerPaginator(self._load_page, url, limit).collect()
+        except DeezerError:
+            raise DeezerError(DeezerErrorMessage.SearchNotFound.format(query_parameter, method))
+        return [DeezerParser.parse_searches(search, method) for search in searches]
+
+    def iter_search(self, query_parameter, method, limit=None):
+        method_type = method if method == '' else '/{}'.format(method)
+        url = DeezerUrl.SearchUrl.format(method_type, query_parameter)
+
+        async def load_page(url):
+            try:
+                page = await self._load_page(url)
+            except DeezerError:
+                raise DeezerError(DeezerErrorMessage.SearchNotFound.format(query_parameter, method))
+            if limit is None:
+                page.pop('next', None)
+            return page
+
+        return AsyncParsedItems(AsyncDeezerPaginator(load_page, url, limit),
+                                lambda search: DeezerParser.parse_searches(search, method))
+
+    def iter_playlist_tracks(self, playlist_id):
+        url = DeezerUrl.PlayListUrl.format(playlist_id)
+
+        async def load_page(page_url):
+            try:
+                page = await self._load_page(page_url)
+            except DeezerError:
+                raise DeezerError(DeezerErrorMessage.PlaylistNotFound.format(playlist_id))
+            if page_url != url:
+                return page
+            tracks = page.get('tracks', {}).get('data', [])
+            next_url = page.get('tracks', {}).get('next', None)
+            if next_url is None and len(tracks) < (page.get('nb_tracks', None) or 0):
+                next_url = DeezerUrl.PlayListTracksUrl.format(playlist_id, len(tracks))
+            return {'data': tracks, 'next': next_url}
+
+        return AsyncParsedItems(AsyncDeezerPaginator(load_page, url),
+                                lambda track: DeezerParser.parse_tracks([track], self.known_tracks)[0])
+
+
+class AsyncDeezerManageAccess(AsyncDeezerBasicAccess):
+
+    def __init__(self, oauth, transport=None, max_workers=8, cache=None, flight=None, known_tracks=None,
+                 graph=None, playlist_store=None, metrics=None, retry=None):
+        super().__init__(transport, cache, flight, known_tracks, metrics, retry)
+        self.oauth = oauth
+        self.max_workers = max_workers
+        self.graph = ArtistGraph() if graph is None else graph
+        self.playlist_store = playlist_store
+        self.user_id = None
+
+    async def _get_user_id(self):
+        if self.user_id is None:
+            self.user_id = (await self.get_user_me()).id
+        return self.user_id
+
+    async def get_user_me(self):
+        response = await self.transport.get(DeezerUrl.RestrictedUserUrl.format(self.oauth.get_access_token()))
+        if response.status_code != 200 or response.json().get('error', None) is not None:
+            raise DeezerError(DeezerErrorMessage.SearchNotFoundAuth)
+        return User(response.json())
+
+    async def get_my_playlist(self):
+        if self.playlist_store is not None:
+            return await self.sync_my_playlist()
+        response = await self.transport.get(DeezerUrl.ProfilePlaylistUrl.format(await self._get_user_id()))
+        if response.status_code != 200:
+            raise DeezerError(DeezerErrorMessage.PlaylistNotFoundAuth)
+        playlist_data = self._parse('profile', DeezerParser.parse_app_state, response.content, 'TAB', 'playlists',
+                                    'data')
+        return await self.get_playlists([p.get('PLAYLIST_ID', None) for p in playlist_data])
+
+    async def get_playlists(self, playlist_ids):
+        return await self._map_playlists(self.get_playlist, playlist_ids)
+
+    async def sync_my_playlist(self):
+        user_id = await self._get_user_id()
+        summaries = await self.get_playlist_summaries()
+        changed = self.playlist_store.changed(user_id, summaries)
+        self.playlist_store.update(user_id, summaries, await self._map_playlists(self._fetch_playlist, changed))
+        return [PlayList(data, self.known_tracks) for data in self.playlist_store.playlists(user_id)]
+
+    async def get_own_playlist_data(self, playlist_id):
+        return await self._load_playlist(playlist_id, self.oauth.get_access_token())
+
+    async def get_playlist_summaries(self):
+        url = DeezerUrl.RestrictedUserPlayListsUrl.format(await self._get_user_id(), self.oauth.get_access_token())
+        try:
+            return await AsyncDeezerPaginator(self._load_page, url).collect()
+        except DeezerError:
+            raise DeezerError(DeezerErrorMessage.PlaylistNotFoundAuth)
+
+    async def _fetch_playlist(self, playlist_id):
+        data = await self.get_own_playlist_data(playlist_id)
+        if data.get('id', None) is None:
+            raise DeezerError(DeezerErrorMessage.PlaylistNotFound.format(playlist_id))
+        return data
+
+    async def _map_playlists(self, load, playlist_ids):
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def fetch(playlist_id):
+            async with semaphore:
+                result = await load(playlist_id)
+            progress.update()
+            return result
+
+        with tqdm.tqdm(total=len(playlist_ids), desc='Processing user playlist') as progress:
+            return await asyncio.gather(*[fetch(playlist_id) for playlist_id in playlist_ids])
+
+    async def create_playlist(self, title):
+        try:
+            response = await self.transport.post(DeezerUrl.RestrictedAddPlayListUrl.format(
+                await self._get_user_id(), self.oauth.get_access_token(), title))
+            return PlayList(await self.get_own_playlist_data(response.json()['id']), self.known_tracks)
+        except Exception:
+            raise DeezerError(DeezerErrorMessage.PlaylistNotCreated.format(title))
+
+    async def add_track_to_playlist(self, playlist_id, track_id):
+        try:
+            await self.transport.post(
+                DeezerUrl.RestrictedTrackUrl.format(playlist_id, self.oauth.get_access_token(), track_id))
+        except Exception:
+            raise DeezerError(DeezerErrorMessage.TrackNotAddedToPlaylist.format(track_id, playlist_id))
+
+    async def add_tracks_to_playlist(self, playlist_id, track_ids):
+        await self._send_chunks(self.transport.post, playlist_id, track_ids,
+                                DeezerErrorMessage.TracksNotAddedToPlaylist)
+
+    async def _send_chunks(self, send, playlist_id, track_ids, message):
+        url = DeezerUrl.RestrictedTrackUrl.format(playlist_id, self.oauth.get_access_token(), '')
+        chunks = DeezerManageAccess._track_chunks(url, track_ids)
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def send_chunk(chunk):
+            try:
+                async with semaphore:
+                    return DeezerManageAccess._chunk_error(await send(url + ','.join(map(str, chunk))))
+            except Exception as e:
+                return str(e) or type(e).__name__
+
+        errors = await asyncio.gather(*[send_chunk(chunk) for chunk in chunks])
+        DeezerManageAccess._raise_failed(playlist_id, chunks, errors, message)
+
+    async def generate_tracks(self, count_tracks, track_filter=None, weights=None):
+        pool = CandidatePool(weights, track_filter)
+        user_playlist = await self.get_my_playlist()
+        user_artists, distances = await self._expand_artists(user_playlist, count_tracks)
+        pool.add_playlists(user_playlist)
+        for artist in tqdm.tqdm(user_artists, desc='Generating playlist'):
+            artist_id = int(artist.id)
+            pool.add_tracks(artist_id, await self.get_artist_tracks(artist_id, count_tracks), distances[artist_id])
+        return pool.top(count_tracks)
+
+    async def get_favourites_artists_by_playlist_id(self, user_playlist, count_tracks):
+        return (await self._expand_artists(user_playlist, count_tracks))[0]
+
+    async def _expand_artists(self, user_playlist, count_artists):
+        seeds, artists = DeezerManageAccess._seed_artists(user_playlist)
+        return await self.expand_seeds(seeds, artists, count_artists)
+
+    async def expand_seeds(self, seeds, artists, count_artists):
+        async def load_related(artist_id):
+            related = await self.get_related_artists(artist_id)
+            for artist in related:
+                artists.setdefault(int(artist.id), artist)
+            return [artist.id for artist in related]
+
+        distances = await self.graph.expand_async([artist_id for artist_id, _ in seeds.most_common(count_artists)],
+                                                  load_related, max_workers=self.max_workers)
+        return DeezerManageAccess._ranked_artists(self.graph, seeds, artists, distances, count_artists), distances
+
+
+class AsyncDeezerDeleteAccess(AsyncDeezerManageAccess):
+
+    async def delete_playlist(self, playlist_id):
+        try:
+            await self.transport.delete(
+                DeezerUrl.RestrictedPlayListUrl.format(playlist_id, self.oauth.get_access_token()))
+        except Exception:
+            raise DeezerError(DeezerErrorMessage.DeletePlaylist.format(playlist_id))
+
+    async def delete_track(self, playlist_id, track_id):
+        try:
+            await self.transport.delete(
+                DeezerUrl.RestrictedTrackUrl.format(playlist_id, self.oauth.get_access_token(), track_id))
+        except Exception:
+            raise DeezerError(DeezerErrorMessage.DeleteTrack.format(playlist_id, track_id))
+
+    async def delete_tracks(self, playlist_id, track_ids):
+        await self._send_chunks(self.transport.delete, playlist_id, track_ids, DeezerErrorMessage.DeleteTracks)
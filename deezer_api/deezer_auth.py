@@ -1,9 +1,8 @@
 import datetime
 import webbrowser
 
-import requests
-
 from deezer_api.deezer_objects import DeezerUrl, DeezerError, DeezerErrorMessage
+from deezer_api.deezer_transport import DeezerTransport
 
 
 class DeezerBasicAuth:
@@ -34,7 +33,7 @@ class DeezerTokenAuth(DeezerBasicAuth):
 
 class DeezerTokenAppAuth(DeezerBasicAuth):
 
-    def __init__(self, app_id=None, secret=None, code=None, access=None, expired=3600):
+    def __init__(self, app_id=None, secret=None, code=None, access=None, expired=3600, transport=None):
         if app_id is None or secret is None or code is None:
             raise DeezerError(DeezerErrorMessage.WrongTokenAppAuthParameters.format(app_id, secret, code, access))
 
@@ -43,6 +42,7 @@ class DeezerTokenAppAuth(DeezerBasicAuth):
         self.secret = secret
         self.code = code
         self.token = None
+        self.transport = DeezerTransport() if transport is None else transport
 
     def get_access_token(self):
         if self.token is None:
@@ -53,7 +53,7 @@ class DeezerTokenAppAuth(DeezerBasicAuth):
 
     def generate_auth_token(self):
         try:
-            response = requests.get(DeezerUrl.TokenUrl.format(self.app_id, self.secret, self.code)).text
+            response = self.transport.get(DeezerUrl.TokenUrl.format(self.app_id, self.secret, self.code)).text
             if response == 'wrong code':
                 raise DeezerError(DeezerErrorMessage.Unauthorized)
             self.token = response.split("access_token=")[1].split("&expires=")[0]
@@ -67,11 +67,11 @@ class DeezerTokenAppAuth(DeezerBasicAuth):
 
 class DeezerOAuth(DeezerTokenAppAuth):
 
-    def __init__(self, app_id, secret, access, redirect_url):
+    def __init__(self, app_id, secret, access, redirect_url, transport=None):
         if app_id is None or secret is None or redirect_url is None:
             raise DeezerError(DeezerErrorMessage.WrongAuthParameters.format(app_id, secret, redirect_url, access))
 
-        super().__init__(app_id, secret, '')
+        super().__init__(app_id, secret, '', transport=transport)
 
         self.code = access
         self.redirect_url = redirect_url
@@ -0,0 +1,168 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class DeezerCache:
+    """
+    Base of response caches. Values are raw Deezer payloads (json compatible), keys are 'entity:id'.
+    """
+
+    Ttl = {
+        'artist': 24 * 3600,
+        'album': 24 * 3600,
+        'track': 24 * 3600,
+        'related_artists': 24 * 3600,
+        'artist_top': 3600,
+        'playlist': 600,
+        'user': 3600,
+    }
+
+    def __init__(self, ttl=None, default_ttl=600, max_entries=10000, max_bytes=64 * 1024 * 1024):
+        """
+        :param ttl: seconds to keep entity {entity: seconds}, 0 disables caching of entity
+        :param default_ttl: seconds to keep entities missing in ttl
+        :param max_entries: max count of entries before least recently used are evicted
+        :param max_bytes: max size of serialized entries before least recently used are evicted
+        """
+        self.ttl = dict(self.Ttl)
+        self.ttl.update(ttl or {})
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = {}
+        self.misses = {}
+        self.evictions = 0
+
+    def get(self, entity, key):
+        """
+        :return: cached payload or None
+        """
+        value = self._get(key, time.time())
+        counter = self.misses if value is None else self.hits
+        with self.lock:
+            counter[entity] = counter.get(entity, 0) + 1
+        return value
+
+    def set(self, entity, key, value):
+        ttl = self.ttl.get(entity, self.default_ttl)
+        if not ttl:
+            return
+        data = json.dumps(value)
+        if len(data) <= self.max_bytes:
+            self._set(key, data, value, time.time() + ttl)
+
+    def stats(self):
+        """
+        :return: hits, misses and evictions counters with current size
+        """
+        with self.lock:
+            return {
+                'hits': sum(self.hits.values()),
+                'misses': sum(self.misses.values()),
+                'evictions': self.evictions,
+                'entries': self._count(),
+                'bytes': self._size(),
+                'hits_by_entity': dict(self.hits),
+                'misses_by_entity': dict(self.misses),
+            }
+
+    def _get(self, key, now):
+        raise NotImplementedError
+
+    def _set(self, key, data, value, expires):
+        raise NotImplementedError
+
+    def _count(self):
+        raise NotImplementedError
+
+    def _size(self):
+        raise NotImplementedError
+
+
+class MemoryCache(DeezerCache):
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.entries = OrderedDict()
+        self.bytes = 0
+
+    def _get(self, key, now):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, size, value = entry
+            if expires < now:
+                self._remove(key)
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def _set(self, key, data, value, expires):
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (expires, len(data), value)
+            self.bytes += len(data)
+            while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        expires, size, value = self.entries.pop(key)
+        self.bytes -= size
+
+    def _count(self):
+        return len(self.entries)
+
+    def _size(self):
+        return self.bytes
+
+
+class SqliteCache(DeezerCache):
+    """
+    On-disk cache surviving process restarts
+    """
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, expires REAL, '
+                                    'accessed REAL, size INTEGER, value TEXT)')
+            self.connection.execute('CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)')
+
+    def _get(self, key, now):
+        with self.lock:
+            row = self.connection.execute('SELECT expires, value FROM cache WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            with self.connection:
+                if row[0] < now:
+                    self.connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+                    return None
+                self.connection.execute('UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+        return json.loads(row[1])
+
+    def _set(self, key, data, value, expires):
+        with self.lock, self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)',
+                                    (key, expires, time.time(), len(data), data))
+            self.connection.execute('DELETE FROM cache WHERE expires < ?', (time.time(),))
+            while self._count() > self.max_entries or self._size() > self.max_bytes:
+                self.connection.execute('DELETE FROM cache WHERE key = '
+                                        '(SELECT key FROM cache ORDER BY accessed, rowid LIMIT 1)')
+                self.evictions += 1
+
+    def _count(self):
+        return self.connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+    def _size(self):
+        return self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM cache').fetchone()[0]
+
+    def close(self):
+        self.connection.close()
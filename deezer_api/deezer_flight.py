@@ -0,0 +1,78 @@
+import asyncio
+import threading
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Concurrent calls with the same key share one execution and its result
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, function):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.event.set()
+
+    def stats(self):
+        """
+        :return: count of executed calls and calls served by an execution in flight
+        """
+        with self.lock:
+            return {'executed': self.executed, 'coalesced': self.coalesced, 'in_flight': len(self.calls)}
+
+
+class AsyncSingleFlight(SingleFlight):
+    """
+    Asyncio version of SingleFlight, every waiter awaits the task of the first caller
+    """
+
+    async def do(self, key, function):
+        with self.lock:
+            task = self.calls.get(key)
+            if task is None:
+                task = self.calls[key] = asyncio.ensure_future(function())
+                task.add_done_callback(lambda t: self.__done(key))
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def __done(self, key):
+        with self.lock:
+            self.calls.pop(key, None)
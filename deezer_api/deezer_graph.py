@@ -0,0 +1,223 @@
+import asyncio
+import os
+import struct
+import sys
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from deezer_api.deezer_objects import DeezerError, DeezerErrorMessage
+
+
+class ArtistGraph:
+    """
+    Related artists adjacency shared between users. Related artists of an artist are loaded once and kept
+    as int arrays, the graph is saved on disk in CSR layout: artist ids, offsets of their related artists, related
+    artist ids.
+
+        graph = ArtistGraph('artists.graph', depth=2)
+        distances = graph.expand(seeds, related)
+        ranks = graph.rank(seeds, distances)
+
+    A graph with path is saved after every expand which loaded new artists.
+    """
+    Magic = b'DZRG'
+    Header = struct.Struct('<4sqq')
+
+    def __init__(self, path=None, depth=1, max_artists=1000):
+        """
+        :param path: file of the graph, loaded when exists and saved after expand
+        :param depth: count of hops from seed artists in expand
+        :param max_artists: max count of artists reached by one expand
+        """
+        self.path = path
+        self.depth = depth
+        self.max_artists = max_artists
+        self.adjacency = {}
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.loaded = 0
+        self.added = 0
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        return len(self.adjacency)
+
+    def __contains__(self, artist_id):
+        return int(artist_id) in self.adjacency
+
+    def edges(self):
+        return sum(len(related) for related in self.adjacency.values())
+
+    def related(self, artist_id):
+        """
+        :return: ids of related artists, None when they were not loaded yet
+        """
+        related = self.adjacency.get(int(artist_id), None)
+        return None if related is None else related.tolist()
+
+    def add(self, artist_id, related_ids):
+        with self.lock:
+            self.adjacency[int(artist_id)] = array('q', (int(i) for i in related_ids))
+            self.added += 1
+
+    def expand(self, seeds, load_related, depth=None, max_workers=8):
+        """
+        Breadth first search from seed artists, related artists missed in the graph are loaded concurrently
+        :param seeds: ids of seed artists
+        :param load_related: function artist id -> list of related artist ids
+        :param depth: count of hops, graph depth by default
+        :param max_workers: max count of concurrent loads
+        :return: dict artist id -> distance from seeds
+        """
+        distances, level = self.__start(seeds)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for distance in range(1, (self.depth if depth is None else depth) + 1):
+                missed = [artist_id for artist_id in level if artist_id not in self.adjacency]
+                list(executor.map(lambda artist_id: self.__load(artist_id, load_related), missed))
+                level = self.__next_level(distances, level, distance)
+                if not level:
+                    break
+        self.__save_added()
+        return distances
+
+    async def expand_async(self, seeds, load_related, depth=None, max_workers=8):
+        """
+        expand() with coroutine function load_related
+        """
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def load(artist_id):
+            try:
+                async with semaphore:
+                    self.add(artist_id, await load_related(artist_id))
+            except DeezerError:
+                pass
+
+        distances, level = self.__start(seeds)
+        for distance in range(1, (self.depth if depth is None else depth) + 1):
+            missed = [artist_id for artist_id in level if artist_id not in self.adjacency]
+            await asyncio.gather(*[load(artist_id) for artist_id in missed])
+            level = self.__next_level(distances, level, distance)
+            if not level:
+                break
+        self.__save_added()
+        return distances
+
+    def __save_added(self):
+        if self.path is not None and self.added:
+            self.save()
+
+    def __load(self, artist_id, load_related):
+        try:
+            self.add(artist_id, load_related(artist_id))
+        except DeezerError:
+            pass
+
+    def __start(self, seeds):
+        distances = {}
+        for artist_id in seeds:
+            if len(distances) >= self.max_artists:
+                break
+            distances.setdefault(int(artist_id), 0)
+        return distances, list(distances)
+
+    def __next_level(self, distances, level, distance):
+        next_level = []
+        for artist_id in level:
+            for related_id in self.adjacency.get(artist_id, ()):
+                if len(distances) >= self.max_artists:
+                    return next_level
+                if related_id not in distances:
+                    distances[related_id] = distance
+                    next_level.append(related_id)
+        return next_level
+
+    def rank(self, seeds, artist_ids=None, damping=0.85, iterations=50, tolerance=1e-9):
+        """
+        Personalized PageRank: random walk over related artists restarting at seed artists
+        :param seeds: dict artist id -> weight of restart at the artist
+        :param artist_ids: artists of the walk, all artists of the graph by default
+        :param damping: probability to follow related artist instead of restart
+        :return: dict artist id -> rank, ranks sum to 1
+        """
+        seeds = {int(artist_id): weight for artist_id, weight in seeds.items()}
+        nodes = [int(artist_id) for artist_id in (self.adjacency if artist_ids is None else artist_ids)]
+        index = {artist_id: i for i, artist_id in enumerate(nodes)}
+        for artist_id in seeds:
+            if artist_id not in index:
+                index[artist_id] = len(nodes)
+                nodes.append(artist_id)
+        offsets, targets = array('q', [0]), array('q')
+        for artist_id in nodes:
+            targets.extend(index[i] for i in self.adjacency.get(artist_id, ()) if i in index)
+            offsets.append(len(targets))
+
+        total = float(sum(seeds.values())) or 1.0
+        restart = [0.0] * len(nodes)
+        for artist_id, weight in seeds.items():
+            restart[index[artist_id]] = weight / total
+        ranks = restart[:]
+        for _ in range(iterations):
+            next_ranks = [(1 - damping) * r for r in restart]
+            dangling = 0.0
+            for i, rank in enumerate(ranks):
+                start, end = offsets[i], offsets[i + 1]
+                if start == end:
+                    dangling += rank
+                    continue
+                share = damping * rank / (end - start)
+                for j in targets[start:end]:
+                    next_ranks[j] += share
+            if dangling:
+                next_ranks = [r + damping * dangling * s for r, s in zip(next_ranks, restart)]
+            change = sum(abs(a - b) for a, b in zip(next_ranks, ranks))
+            ranks = next_ranks
+            if change < tolerance:
+                break
+        return dict(zip(nodes, ranks))
+
+    def save(self, path=None):
+        """
+        Write the graph in CSR layout, the file is replaced atomically
+        """
+        path = self.path if path is None else path
+        # saves of threads sharing the graph are serialized, so an older snapshot does not replace a newer one
+        with self.save_lock:
+            with self.lock:
+                ids = array('q', self.adjacency)
+                offsets, targets = array('q', [0]), array('q')
+                for related in self.adjacency.values():
+                    targets.extend(related)
+                    offsets.append(len(targets))
+                self.added = 0
+            temporary = '{}.{}.tmp'.format(path, os.getpid())
+            with open(temporary, 'wb') as file:
+                file.write(self.Header.pack(self.Magic, len(ids), len(targets)))
+                for values in (ids, offsets, targets):
+                    _little_endian(values).tofile(file)
+            os.replace(temporary, path)
+
+    def load(self, path):
+        ids, offsets, targets = array('q'), array('q'), array('q')
+        with open(path, 'rb') as file:
+            try:
+                magic, count_ids, count_targets = self.Header.unpack(file.read(self.Header.size))
+                if magic != self.Magic:
+                    raise ValueError(magic)
+                for values, count in ((ids, count_ids), (offsets, count_ids + 1), (targets, count_targets)):
+                    values.fromfile(file, count)
+                    _little_endian(values)
+            except (EOFError, ValueError, struct.error):
+                raise DeezerError(DeezerErrorMessage.GraphNotLoaded.format(path))
+        with self.lock:
+            for i, artist_id in enumerate(ids):
+                self.adjacency[artist_id] = targets[offsets[i]:offsets[i + 1]]
+        self.loaded = len(ids)
+
+
+def _little_endian(values):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
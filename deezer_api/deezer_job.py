@@ -0,0 +1,331 @@
+import inspect
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+import tqdm
+
+from deezer_api.deezer_objects import Track, DeezerBatchError
+from deezer_api.deezer_ranking import CandidatePool
+
+
+class JobStore:
+    """
+    Checkpoints of generation jobs: output of every completed stage of a job is kept as json
+
+        store = JobStore('jobs.db')
+        client.generation_job('weekly', store, count_tracks=50).run()
+    """
+
+    def __init__(self, path=':memory:'):
+        """
+        :param path: sqlite database file, in memory by default
+        """
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.connection:
+            self.connection.execute('CREATE TABLE IF NOT EXISTS stages (job_id TEXT, stage TEXT, value TEXT, '
+                                    'updated REAL, PRIMARY KEY (job_id, stage))')
+
+    def load(self, job_id, stage):
+        """
+        :return: saved output of the stage, None when the stage was not completed
+        """
+        with self.lock:
+            row = self.connection.execute('SELECT value FROM stages WHERE job_id = ? AND stage = ?',
+                                          (job_id, stage)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def save(self, job_id, stage, value):
+        """
+        :return: saved value as it is loaded from the store
+        """
+        value = json.dumps(value)
+        with self.lock, self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO stages VALUES (?, ?, ?, ?)',
+                                    (job_id, stage, value, time.time()))
+        return json.loads(value)
+
+    def stages(self, job_id):
+        """
+        :return: names of saved stages of the job
+        """
+        with self.lock:
+            rows = self.connection.execute('SELECT stage FROM stages WHERE job_id = ? ORDER BY updated',
+                                           (job_id,)).fetchall()
+        return [row[0] for row in rows]
+
+    def jobs(self):
+        with self.lock:
+            return [row[0] for row in self.connection.execute('SELECT DISTINCT job_id FROM stages ORDER BY job_id')]
+
+    def delete(self, job_id):
+        with self.lock, self.connection:
+            self.connection.execute('DELETE FROM stages WHERE job_id = ?', (job_id,))
+
+    def close(self):
+        self.connection.close()
+
+
+class GenerationJob:
+    """
+    create_recommendation_playlist split into stages with output saved in JobStore: seed artists of the user
+    playlists, expanded artists, tracks of every artist, selected tracks, created playlist and inserted tracks.
+    A failed or interrupted job run again continues from the last saved stage. Creation of the playlist and track
+    inserts are checked against the user playlists, so they are not repeated.
+    """
+    Stages = ('seeds', 'artists', 'candidates', 'selection', 'playlist', 'inserted')
+
+    def __init__(self, client, job_id, store, title='Deezer Recommendation', count_tracks=50, track_filter=None,
+                 weights=None):
+        """
+        :param client: DeezerManageAccess object
+        :param job_id: id of the job in store
+        :param store: JobStore object
+        :param title: name of playlist
+        :param count_tracks: count tracks
+        :param track_filter: TrackFilter object: duration range, explicit lyrics, release years
+        :param weights: weights of score parts: rank, affinity, distance, recency, bpm, gain
+        """
+        self.client = client
+        self.job_id = job_id
+        self.store = store
+        self.title = title
+        self.count_tracks = count_tracks
+        self.track_filter = track_filter
+        self.weights = weights
+        self.progress = {'stage': None, 'done': 0, 'total': 0}
+
+    @property
+    def completed(self):
+        """
+        :return: names of completed stages
+        """
+        saved = set(self.store.stages(self.job_id))
+        return [stage for stage in self.Stages if stage in saved]
+
+    @property
+    def done(self):
+        return 'inserted' in self.completed
+
+    def run(self):
+        """
+        Run stages which were not completed yet
+        :return: list Track object added to the playlist
+        """
+        seeds = self._checkpoint('seeds', self._seeds)
+        self._restore_known_tracks(seeds)
+        artists = self._checkpoint('artists', lambda: self._artists(seeds))
+        self._checkpoint('candidates', lambda: self._candidates(artists))
+        selection = self._checkpoint('selection', lambda: self._selection(seeds, artists))
+        playlist_id = self._checkpoint('playlist', self._playlist)
+        self._checkpoint('inserted', lambda: self._insert(playlist_id, [track['id'] for track in selection]))
+        self._step('done', 1, 1)
+        return [Track(track) for track in selection]
+
+    def _checkpoint(self, stage, run):
+        value = self.store.load(self.job_id, stage)
+        if value is None:
+            self._step(stage, 0, 1)
+            value = self.store.save(self.job_id, stage, run())
+        return value
+
+    def _step(self, stage, done, total):
+        self.progress = {'stage': stage, 'done': done, 'total': total}
+
+    def _seeds(self):
+        return self._seed_data(self.client.get_my_playlist())
+
+    @staticmethod
+    def _seed_data(user_playlist):
+        seeds, known = Counter(), {}
+        for playlist in user_playlist:
+            for track in playlist.tracks:
+                artist_id = getattr(track.artist, 'id', None)
+                if artist_id is not None:
+                    seeds[int(artist_id)] += 1
+                    known.setdefault(str(artist_id), []).append(track.id)
+        return {'seeds': seeds.most_common(), 'known': known}
+
+    def _restore_known_tracks(self, seeds):
+        for artist_id, track_ids in seeds['known'].items():
+            for track_id in track_ids:
+                self.client.known_tracks.add(artist_id, track_id)
+
+    def _artists(self, seeds):
+        artists, distances = self.client.expand_seeds(Counter(dict(seeds['seeds'])), {}, self.count_tracks)
+        return {'artists': [int(artist.id) for artist in artists],
+                'distances': [[artist_id, distance] for artist_id, distance in distances.items()]}
+
+    def _candidates(self, artists):
+        missed = self._missed_artists(artists)
+        for artist_id in tqdm.tqdm(missed, desc='Generating playlist'):
+            tracks = self.client.get_artist_tracks(artist_id, self.count_tracks)
+            self._save_tracks(artist_id, tracks, len(missed))
+        return len(artists['artists'])
+
+    def _missed_artists(self, artists):
+        saved = set(self.store.stages(self.job_id))
+        return [artist_id for artist_id in artists['artists'] if 'tracks:{}'.format(artist_id) not in saved]
+
+    def _save_tracks(self, artist_id, tracks, total):
+        self.store.save(self.job_id, 'tracks:{}'.format(artist_id), [_track_data(track) for track in tracks])
+        self._step('candidates', self.progress['done'] + 1, total)
+
+    def _selection(self, seeds, artists):
+        pool = CandidatePool(self.weights, self.track_filter)
+        for artist_id, count in seeds['seeds']:
+            pool.add_artist(artist_id, 0, count)
+        distances = dict((artist_id, distance) for artist_id, distance in artists['distances'])
+        for artist_id in artists['artists']:
+            tracks = self.store.load(self.job_id, 'tracks:{}'.format(artist_id)) or []
+            pool.add_tracks(artist_id, [Track(track) for track in tracks], distances.get(artist_id, 1))
+        return [_track_data(track) for track in pool.top(self.count_tracks)]
+
+    def _playlist(self):
+        summaries = self.client.get_playlist_summaries()
+        creating = self.store.load(self.job_id, 'creating')
+        if creating is not None:
+            created = self._created_playlist(summaries, creating)
+            if created is not None:
+                return created
+        self.store.save(self.job_id, 'creating', self._titled(summaries))
+        return self.client.create_playlist(self.title).id
+
+    def _titled(self, summaries):
+        return [summary['id'] for summary in summaries if summary.get('title', None) == self.title]
+
+    def _created_playlist(self, summaries, existing):
+        created = [playlist_id for playlist_id in self._titled(summaries) if playlist_id not in existing]
+        return created[0] if created else None
+
+    def _insert(self, playlist_id, track_ids):
+        inserted = self._inserted_tracks()
+        if inserted is not None:
+            inserted |= self._remote_tracks(self.client.get_own_playlist_data(playlist_id))
+        remaining = self._remaining(track_ids, inserted)
+        try:
+            if remaining:
+                self.client.add_tracks_to_playlist(playlist_id, remaining)
+        except DeezerBatchError as e:
+            self._save_failed(inserted, remaining, e)
+            raise
+        return track_ids
+
+    def _inserted_tracks(self):
+        """
+        :return: ids of tracks inserted before the job was interrupted, None when inserts were not started
+        """
+        inserting = self.store.load(self.job_id, 'inserting')
+        return None if inserting is None else set(inserting)
+
+    @staticmethod
+    def _remote_tracks(data):
+        return {track.get('id', None) for track in data.get('tracks', {}).get('data', [])}
+
+    def _remaining(self, track_ids, inserted):
+        inserted = inserted or set()
+        remaining = [track_id for track_id in track_ids if track_id not in inserted]
+        self.store.save(self.job_id, 'inserting', sorted(inserted))
+        self._step('inserted', len(track_ids) - len(remaining), len(track_ids))
+        return remaining
+
+    def _save_failed(self, inserted, remaining, error):
+        failed = {track_id for chunk, _ in error.failed for track_id in chunk}
+        self.store.save(self.job_id, 'inserting', sorted((inserted or set()) | (set(remaining) - failed)))
+
+
+class AsyncGenerationJob(GenerationJob):
+    """
+    GenerationJob of AsyncDeezerManageAccess: run() returns a coroutine
+    """
+
+    async def run(self):
+        seeds = await self._checkpoint('seeds', self._seeds)
+        self._restore_known_tracks(seeds)
+        artists = await self._checkpoint('artists', lambda: self._artists(seeds))
+        await self._checkpoint('candidates', lambda: self._candidates(artists))
+        selection = await self._checkpoint('selection', lambda: self._selection(seeds, artists))
+        playlist_id = await self._checkpoint('playlist', self._playlist)
+        await self._checkpoint('inserted', lambda: self._insert(playlist_id, [track['id'] for track in selection]))
+        self._step('done', 1, 1)
+        return [Track(track) for track in selection]
+
+    async def _checkpoint(self, stage, run):
+        value = self.store.load(self.job_id, stage)
+        if value is None:
+            self._step(stage, 0, 1)
+            value = run()
+            if inspect.isawaitable(value):
+                value = await value
+            value = self.store.save(self.job_id, stage, value)
+        return value
+
+    async def _seeds(self):
+        return self._seed_data(await self.client.get_my_playlist())
+
+    async def _artists(self, seeds):
+        artists, distances = await self.client.expand_seeds(Counter(dict(seeds['seeds'])), {}, self.count_tracks)
+        return {'artists': [int(artist.id) for artist in artists],
+                'distances': [[artist_id, distance] for artist_id, distance in distances.items()]}
+
+    async def _candidates(self, artists):
+        missed = self._missed_artists(artists)
+        for artist_id in tqdm.tqdm(missed, desc='Generating playlist'):
+            tracks = await self.client.get_artist_tracks(artist_id, self.count_tracks)
+            self._save_tracks(artist_id, tracks, len(missed))
+        return len(artists['artists'])
+
+    async def _playlist(self):
+        summaries = await self.client.get_playlist_summaries()
+        creating = self.store.load(self.job_id, 'creating')
+        if creating is not None:
+            created = self._created_playlist(summaries, creating)
+            if created is not None:
+                return created
+        self.store.save(self.job_id, 'creating', self._titled(summaries))
+        return (await self.client.create_playlist(self.title)).id
+
+    async def _insert(self, playlist_id, track_ids):
+        inserted = self._inserted_tracks()
+        if inserted is not None:
+            inserted |= self._remote_tracks(await self.client.get_own_playlist_data(playlist_id))
+        remaining = self._remaining(track_ids, inserted)
+        try:
+            if remaining:
+                await self.client.add_tracks_to_playlist(playlist_id, remaining)
+        except DeezerBatchError as e:
+            self._save_failed(inserted, remaining, e)
+            raise
+        return track_ids
+
+
+ArtistKeys = {'number_album': 'nb_album', 'number_fun': 'nb_fan'}
+
+
+def _object_data(value, keys=None):
+    if value is None:
+        return None
+    keys = keys or {}
+    return {keys.get(name, name): getattr(value, name, None) for name in type(value).__slots__
+            if not name.startswith('_')}
+
+
+def _track_data(track):
+    """
+    :return: Deezer data of Track object, Track(data) builds it again
+    """
+    data = _object_data(track)
+    try:
+        data['artist'] = _object_data(track.artist, ArtistKeys)
+    except AttributeError:
+        pass
+    try:
+        album = track.album
+        data['album'] = _object_data(album)
+        data['album']['artist'] = _object_data(album.artist, ArtistKeys)
+    except AttributeError:
+        pass
+    return data
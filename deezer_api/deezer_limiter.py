@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    """
+    Token bucket shared by threads and coroutines. Every caller reserves a token under a short lock
+    and then sleeps outside of it, so waiting callers are served in arrival order.
+    """
+
+    def __init__(self, requests, period):
+        """
+        :param requests: requests allowed per period (bucket capacity)
+        :param period: period in seconds
+        """
+        self.capacity = float(requests)
+        self.rate = requests / float(period)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.acquired = 0
+        self.waited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def reserve(self):
+        """
+        Take a token
+        :return: seconds to wait before using it
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.acquired += 1
+            if wait > 0:
+                self.waited += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+            return wait
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'acquired': self.acquired,
+                'waited': self.waited,
+                'total_wait': self.total_wait,
+                'max_wait': self.max_wait,
+                'average_wait': self.total_wait / self.acquired if self.acquired else 0.0,
+            }
+
+
+class DeezerRateLimiter:
+    """
+    Token bucket per host. Deezer allows 50 requests per 5 seconds.
+    """
+
+    Quota = (50, 5)
+    __shared = None
+    __shared_lock = threading.Lock()
+
+    def __init__(self, limits=None, default=Quota):
+        """
+        :param limits: per host limits {host: (requests, period)}
+        :param default: limit for hosts missing in limits, None disables limiting for them
+        """
+        self.limits = dict(limits or {})
+        self.default = default
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        """
+        :return: limiter with the Deezer quota used by every transport created without a limiter,
+        so API calls and media downloads of one process share the quota
+        """
+        with cls.__shared_lock:
+            if cls.__shared is None:
+                cls.__shared = cls()
+            return cls.__shared
+
+    def bucket(self, url):
+        host = urlsplit(url).hostname
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            limit = self.limits.get(host, self.default)
+            if limit is None:
+                return None
+            with self.lock:
+                bucket = self.buckets.setdefault(host, TokenBucket(*limit))
+        return bucket
+
+    def acquire(self, url):
+        bucket = self.bucket(url)
+        if bucket is not None:
+            bucket.acquire()
+
+    async def acquire_async(self, url):
+        bucket = self.bucket(url)
+        if bucket is not None:
+            await bucket.acquire_async()
+
+    def stats(self):
+        """
+        Wait time statistics
+        :return: {host: {acquired, waited, total_wait, max_wait, average_wait}}
+        """
+        return {host: bucket.stats() for host, bucket in list(self.buckets.items())}
@@ -0,0 +1,175 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from deezer_api.deezer_flight import SingleFlight
+
+
+class MediaCache:
+    """
+    On-disk cache of previews and album covers. Previews are keyed by track id, covers by their url, so tracks of
+    one album share the cover. Files are written to a temporary file and renamed, sizes and sha1 digests are kept
+    in an index to check files before use, least recently used files are removed above max_bytes.
+
+        media = MediaCache(max_bytes=256 * 1024 * 1024)
+        path = media.fetch(MediaCache.preview_key(track), lambda: response.iter_content(65536))
+    """
+
+    def __init__(self, folder=None, max_bytes=512 * 1024 * 1024, verify=False):
+        """
+        :param folder: folder of cached files and their index, created on the first write, by default
+            deezer-playlist-generator/media in the user cache folder ($XDG_CACHE_HOME or ~/.cache)
+        :param max_bytes: max size of cached files before least recently used are removed
+        :param verify: check sha1 digest of a file on every get, by default only its size is checked
+        """
+        self.folder = self.default_folder() if folder is None else folder
+        self.max_bytes = max_bytes
+        self.verify = verify
+        self.lock = threading.Lock()
+        self.flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.corrupted = 0
+        self.connection = None
+
+    @staticmethod
+    def default_folder():
+        cache = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        return os.path.join(cache, 'deezer-playlist-generator', 'media')
+
+    @staticmethod
+    def preview_key(track):
+        return 'preview/{}.mp3'.format(track.id)
+
+    @staticmethod
+    def cover_key(url):
+        return 'cover/{}.png'.format(hashlib.sha1(url.encode('utf-8')).hexdigest())
+
+    def path(self, key):
+        return os.path.join(self.folder, *key.split('/'))
+
+    def get(self, key):
+        """
+        :return: path of the cached file, None when it is missed or damaged
+        """
+        with self.lock:
+            connection = self.__open(create=False)
+            row = None if connection is None else connection.execute(
+                'SELECT size, digest FROM media WHERE key = ?', (key,)).fetchone()
+        path = self.path(key)
+        if row is not None and self.__valid(path, row[0], row[1]):
+            with self.lock, self.connection:
+                self.connection.execute('UPDATE media SET accessed = ? WHERE key = ?', (time.time(), key))
+                self.hits += 1
+            return path
+        with self.lock:
+            self.misses += 1
+            if row is not None:
+                self.corrupted += 1
+                self.__remove(key)
+        return None
+
+    def put(self, key, chunks):
+        """
+        Write chunks of bytes to the file of key
+        :return: path of the file
+        """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = '{}.{}.{}.part'.format(path, os.getpid(), threading.get_ident())
+        digest, size = hashlib.sha1(), 0
+        try:
+            with open(temporary, 'wb') as file:
+                for chunk in chunks:
+                    file.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+            os.replace(temporary, path)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        with self.lock, self.__open(create=True):
+            self.connection.execute('INSERT OR REPLACE INTO media VALUES (?, ?, ?, ?)',
+                                    (key, size, digest.hexdigest(), time.time()))
+            self.__evict(key)
+        return path
+
+    def fetch(self, key, load):
+        """
+        Cached file of key, concurrent calls for one missed key write it once
+        :param load: function returning chunks of bytes of the file
+        :return: path of the file
+        """
+        path = self.get(key)
+        if path is None:
+            path = self.flight.do(key, lambda: self.get(key) or self.put(key, load()))
+        return path
+
+    def __open(self, create):
+        """
+        Connection to the index, opened on first use. The folder and the index are only created by a write.
+        :return: None when the index does not exist and create is False
+        """
+        if self.connection is None:
+            index = os.path.join(self.folder, 'index.db')
+            if not create and not os.path.exists(index):
+                return None
+            os.makedirs(self.folder, exist_ok=True)
+            self.connection = sqlite3.connect(index, check_same_thread=False)
+            with self.connection:
+                self.connection.execute('CREATE TABLE IF NOT EXISTS media (key TEXT PRIMARY KEY, size INTEGER, '
+                                        'digest TEXT, accessed REAL)')
+                self.connection.execute('CREATE INDEX IF NOT EXISTS media_accessed ON media (accessed)')
+        return self.connection
+
+    def __valid(self, path, size, digest):
+        try:
+            if os.path.getsize(path) != size:
+                return False
+        except OSError:
+            return False
+        if not self.verify:
+            return True
+        sha1 = hashlib.sha1()
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(64 * 1024), b''):
+                sha1.update(chunk)
+        return sha1.hexdigest() == digest
+
+    def __evict(self, keep):
+        size = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM media').fetchone()[0]
+        rows = self.connection.execute('SELECT key, size FROM media WHERE key != ? ORDER BY accessed', (keep,))
+        for key, file_size in rows.fetchall():
+            if size <= self.max_bytes:
+                break
+            self.__remove(key)
+            size -= file_size
+            self.evictions += 1
+
+    def __remove(self, key):
+        with self.connection:
+            self.connection.execute('DELETE FROM media WHERE key = ?', (key,))
+        try:
+            os.remove(self.path(key))
+        except OSError:
+            pass
+
+    def stats(self):
+        """
+        :return: count of hits, misses, evicted and damaged files, count and size of cached files
+        """
+        with self.lock:
+            connection = self.__open(create=False)
+            entries, size = (0, 0) if connection is None else connection.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM media').fetchone()
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'corrupted': self.corrupted, 'entries': entries, 'bytes': size}
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
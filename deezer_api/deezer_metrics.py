@@ -0,0 +1,273 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+from urllib.parse import urlsplit
+
+from deezer_api.deezer_objects import DeezerUrl
+
+
+class DeezerEvent:
+    REQUEST_START = 'request_start'
+    REQUEST_END = 'request_end'
+    CACHE_HIT = 'cache_hit'
+    CACHE_MISS = 'cache_miss'
+    RETRY = 'retry'
+    PARSE = 'parse'
+
+
+class Histogram:
+    """
+    Count of observed values per bucket with their sum
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """
+        :return: list of (upper bound, count of values <= bound), last bound is inf
+        """
+        result, total = [], 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def as_dict(self):
+        return {'count': self.count, 'sum': self.sum, 'buckets': {bound: count for bound, count in self.cumulative()}}
+
+
+class DeezerMetrics:
+    """
+    Counters and latency histograms of Deezer requests per DeezerUrl endpoint template, cache hits, retries and
+    parse time, with hooks called on every event. Clients without metrics are not instrumented at all.
+
+        metrics = DeezerMetrics(hooks=[lambda event, data: print(event, data)])
+        client = DeezerApi(token=<TOKEN>, access=Access.MANAGE, metrics=metrics)
+        client.generate_tracks(50)
+        metrics.prometheus()
+    """
+    Buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, hooks=None, buckets=Buckets):
+        """
+        :param hooks: functions (event, data dict) called on every DeezerEvent
+        :param buckets: upper bounds in seconds of histogram buckets
+        """
+        self.hooks = list(hooks or ())
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.errors = {}
+        self.latency = {}
+        self.cache = {}
+        self.retries = {}
+        self.parsing = {}
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def emit(self, event, **data):
+        for hook in self.hooks:
+            hook(event, data)
+
+    @staticmethod
+    def endpoint(url):
+        """
+        :return: host and path of DeezerUrl template of url, host for other urls
+        """
+        parts = urlsplit(url)
+        path = parts.netloc + parts.path
+        for template, pattern in _endpoints:
+            if pattern.fullmatch(path):
+                return template
+        return parts.netloc
+
+    def request_started(self, method, url):
+        if self.hooks:
+            self.emit(DeezerEvent.REQUEST_START, method=method, url=url, endpoint=self.endpoint(url))
+
+    def request_finished(self, method, url, status, seconds, error=None):
+        endpoint = self.endpoint(url)
+        with self.lock:
+            key = (endpoint, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            if error is not None:
+                self.errors[(endpoint, method)] = self.errors.get((endpoint, method), 0) + 1
+            self.__observe(self.latency, endpoint, seconds)
+        if self.hooks:
+            self.emit(DeezerEvent.REQUEST_END, method=method, url=url, endpoint=endpoint, status=status,
+                      seconds=seconds, error=error)
+
+    def cache_used(self, entity, hit):
+        with self.lock:
+            key = (entity, 'hit' if hit else 'miss')
+            self.cache[key] = self.cache.get(key, 0) + 1
+        if self.hooks:
+            self.emit(DeezerEvent.CACHE_HIT if hit else DeezerEvent.CACHE_MISS, entity=entity)
+
+    def retried(self, url, attempt, reason):
+        endpoint = self.endpoint(url)
+        with self.lock:
+            self.retries[(endpoint, reason)] = self.retries.get((endpoint, reason), 0) + 1
+        if self.hooks:
+            self.emit(DeezerEvent.RETRY, url=url, endpoint=endpoint, attempt=attempt, reason=reason)
+
+    def parsed(self, name, seconds):
+        with self.lock:
+            self.__observe(self.parsing, name, seconds)
+        if self.hooks:
+            self.emit(DeezerEvent.PARSE, name=name, seconds=seconds)
+
+    def __observe(self, histograms, key, seconds):
+        histogram = histograms.get(key, None)
+        if histogram is None:
+            histogram = histograms[key] = Histogram(self.buckets)
+        histogram.observe(seconds)
+
+    def as_dict(self):
+        """
+        :return: {'requests': {endpoint: {'count', 'errors', 'statuses', 'seconds'}}, 'cache': {entity: {hit, miss}},
+        'retries': {endpoint: {reason: count}}, 'parse': {name: seconds histogram}}
+        """
+        with self.lock:
+            requests = {}
+            for (endpoint, method, status), count in self.requests.items():
+                data = requests.setdefault(endpoint, {'count': 0, 'errors': 0, 'statuses': {}})
+                data['count'] += count
+                data['statuses'][status] = data['statuses'].get(status, 0) + count
+            for (endpoint, method), count in self.errors.items():
+                requests[endpoint]['errors'] += count
+            for endpoint, histogram in self.latency.items():
+                requests[endpoint]['seconds'] = histogram.as_dict()
+            cache, retries = {}, {}
+            for (entity, result), count in self.cache.items():
+                cache.setdefault(entity, {'hit': 0, 'miss': 0})[result] = count
+            for (endpoint, reason), count in self.retries.items():
+                retries.setdefault(endpoint, {})[reason] = count
+            return {'requests': requests, 'cache': cache, 'retries': retries,
+                    'parse': {name: histogram.as_dict() for name, histogram in self.parsing.items()}}
+
+    def prometheus(self):
+        """
+        :return: metrics in Prometheus text exposition format
+        """
+        lines = []
+        with self.lock:
+            _counter(lines, 'deezer_requests_total', 'Requests to Deezer by endpoint, method and status',
+                     ('endpoint', 'method', 'status'), self.requests)
+            _counter(lines, 'deezer_request_errors_total', 'Requests failed without response',
+                     ('endpoint', 'method'), self.errors)
+            _histogram(lines, 'deezer_request_seconds', 'Seconds of Deezer requests', 'endpoint', self.latency)
+            _counter(lines, 'deezer_cache_total', 'Cache lookups by entity and result', ('entity', 'result'),
+                     self.cache)
+            _counter(lines, 'deezer_retries_total', 'Retried requests by endpoint and reason', ('endpoint', 'reason'),
+                     self.retries)
+            _histogram(lines, 'deezer_parse_seconds', 'Seconds of parsing responses', 'name', self.parsing)
+        return '\n'.join(lines) + '\n'
+
+
+class MeteredTransport:
+    """
+    Transport recording requests of another transport in DeezerMetrics
+    """
+
+    def __init__(self, transport, metrics):
+        self.transport = transport
+        self.metrics = metrics
+
+    def _send(self, method, send, url, **kwargs):
+        self.metrics.request_started(method, url)
+        start = time.perf_counter()
+        try:
+            response = send(url, **kwargs)
+        except Exception as e:
+            self.metrics.request_finished(method, url, 'error', time.perf_counter() - start, e)
+            raise
+        self.metrics.request_finished(method, url, response.status_code, time.perf_counter() - start)
+        return response
+
+    def get(self, url, **kwargs):
+        return self._send('GET', self.transport.get, url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self._send('POST', self.transport.post, url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self._send('DELETE', self.transport.delete, url, **kwargs)
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncMeteredTransport(MeteredTransport):
+    """
+    MeteredTransport of AsyncDeezerTransport
+    """
+
+    async def _send(self, method, send, url, **kwargs):
+        self.metrics.request_started(method, url)
+        start = time.perf_counter()
+        try:
+            response = await send(url, **kwargs)
+        except Exception as e:
+            self.metrics.request_finished(method, url, 'error', time.perf_counter() - start, e)
+            raise
+        self.metrics.request_finished(method, url, response.status_code, time.perf_counter() - start)
+        return response
+
+    async def close(self):
+        await self.transport.close()
+
+
+def _endpoint_patterns():
+    templates = set()
+    for name, url in vars(DeezerUrl).items():
+        if isinstance(url, str) and url.startswith('https://'):
+            parts = urlsplit(url)
+            templates.add(parts.netloc + parts.path)
+    patterns = []
+    # templates with more fixed text first: artist/{}/top is checked before artist/{}
+    for template in sorted(templates, key=lambda t: (-len(t.replace('{}', '')), t)):
+        pieces = template.split('{}')
+        pattern = re.escape(pieces[0])
+        for previous, piece in zip(pieces, pieces[1:]):
+            pattern += ('[^/]+' if previous.endswith('/') else '.*') + re.escape(piece)
+        patterns.append((template, re.compile(pattern)))
+    return patterns
+
+
+_endpoints = _endpoint_patterns()
+
+
+def _labels(names, values):
+    return ','.join('{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                    for name, value in zip(names, values))
+
+
+def _counter(lines, name, description, label_names, values):
+    lines.append('# HELP {} {}'.format(name, description))
+    lines.append('# TYPE {} counter'.format(name))
+    for labels, count in sorted(values.items()):
+        lines.append('{}{{{}}} {}'.format(name, _labels(label_names, labels), count))
+
+
+def _histogram(lines, name, description, label_name, histograms):
+    lines.append('# HELP {} {}'.format(name, description))
+    lines.append('# TYPE {} histogram'.format(name))
+    for key, histogram in sorted(histograms.items()):
+        label = _labels((label_name,), (key,))
+        for bound, count in histogram.cumulative():
+            lines.append('{}_bucket{{{},le="{}"}} {}'.format(name, label, '+Inf' if bound == float('inf') else bound,
+                                                             count))
+        lines.append('{}_sum{{{}}} {}'.format(name, label, histogram.sum))
+        lines.append('{}_count{{{}}} {}'.format(name, label, histogram.count))
@@ -1,10 +1,37 @@
 import json
 import re
+import threading
+from collections import OrderedDict
 
-playlist = {}
+
+class LazyObject:
+    """
+    Attribute built from raw data on first access and then memoized, raw data is released after that
+    """
+
+    def __init__(self, name, factory):
+        self.slot = '_{}'.format(name)
+        self.data_slot = '_{}_data'.format(name)
+        self.factory = factory
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        try:
+            return getattr(instance, self.slot)
+        except AttributeError:
+            value = self.factory(getattr(instance, self.data_slot))
+            setattr(instance, self.slot, value)
+            setattr(instance, self.data_slot, None)
+            return value
+
+    def __set__(self, instance, value):
+        setattr(instance, self.slot, value)
 
 
 class Artist:
+    __slots__ = ('id', 'name', 'picture', 'picture_small', 'picture_medium', 'picture_big', 'picture_xl', 'share',
+                 'number_album', 'number_fun', 'radio', 'role')
 
     def __init__(self, data):
         if data is None:
@@ -30,6 +57,13 @@ class Artist:
 
 
 class Album:
+    __slots__ = ('id', 'title', 'upc', 'share', 'cover', 'cover_small', 'cover_medium', 'cover_big', 'cover_xl',
+                 'genre_id', 'label', 'fans', 'release_date', 'nb_tracks', 'rating', 'duration', 'available',
+                 '_artist', '_artist_data', '_contributors', '_contributors_data')
+
+    artist = LazyObject('artist', Artist)
+    contributors = LazyObject('contributors', lambda data: DeezerParser.append_contributors(data))
+
     def __init__(self, album):
         self.id = album.get('id', None)
         self.title = album.get('title', None)
@@ -48,11 +82,20 @@ class Album:
         self.rating = album.get('rating', None)
         self.duration = album.get('duration', None)
         self.available = album.get('available', False)
-        self.artist = Artist(album.get('artist', None))
-        self.contributors = DeezerParser.append_contributors(album.get('contributors', None))
+        self._artist_data = album.get('artist', None)
+        self._contributors_data = album.get('contributors', None)
 
 
 class Track:
+    __slots__ = ('id', 'title', 'isrc', 'link', 'share', 'duration', 'track_position', 'disk_number', 'rank',
+                 'release_date', 'explicit_lyrics', 'explicit_content_lyrics', 'explicit_content_cover', 'bpm',
+                 'gain', 'preview', 'available_countries', '_artist', '_artist_data', '_album', '_album_data',
+                 '_contributors', '_contributors_data')
+
+    artist = LazyObject('artist', Artist)
+    album = LazyObject('album', Album)
+    contributors = LazyObject('contributors', lambda data: DeezerParser.append_contributors(data))
+
     def __init__(self, track):
         self.id = track.get('id', None)
         self.title = track.get('title', None)
@@ -69,15 +112,19 @@ class Track:
         self.explicit_content_cover = track.get('explicit_content_cover', 0)
         self.bpm = track.get('bpm', None)
         self.gain = track.get('gain', None)
-        self.artist = Artist(track.get('artist', None))
-        self.album = Album(track.get('album', None))
+        self._artist_data = track.get('artist', None)
+        self._album_data = track.get('album', None)
         self.preview = track.get('preview', None)
         self.available_countries = track.get('available_countries')
-        self.contributors = DeezerParser.append_contributors(track.get('contributors', None))
+        self._contributors_data = track.get('contributors', None)
 
 
 class PlayList:
-    def __init__(self, data):
+    __slots__ = ('id', 'title', 'description', 'duration', 'public', 'is_loved_track', 'collaborative', 'picture',
+                 'picture_small', 'picture_medium', 'picture_big', 'picture_xl', 'creation_date', 'nb_tracks', 'fans',
+                 'share', 'checksum', 'tracks')
+
+    def __init__(self, data, known_tracks=None):
         self.id = data.get('id', None)
         self.title = data.get('title', None)
         self.description = data.get('description', None)
@@ -95,10 +142,13 @@ class PlayList:
         self.fans = data.get('fans', None)
         self.share = data.get('share', None)
         self.checksum = data.get('checksum', None)
-        self.tracks = DeezerParser.parse_tracks(data.get('tracks', {}).get('data', []))
+        self.tracks = DeezerParser.parse_tracks(data.get('tracks', {}).get('data', []), known_tracks)
 
 
 class User:
+    __slots__ = ('id', 'name', 'picture', 'picture_small', 'picture_medium', 'picture_big', 'picture_xl', 'country',
+                 'tracklist')
+
     def __init__(self, data):
         self.id = data.get('id', None)
         self.name = data.get('name', None)
@@ -112,6 +162,12 @@ class User:
 
 
 class Search:
+    __slots__ = ('id', 'readable', 'title', 'duration', 'rank', 'explicit_lyrics', 'preview', '_artist',
+                 '_artist_data', '_album', '_album_data')
+
+    artist = LazyObject('artist', Artist)
+    album = LazyObject('album', Album)
+
     def __init__(self, data):
         self.id = data.get('id', None)
         self.readable = data.get('readable', None)
@@ -120,8 +176,54 @@ class Search:
         self.rank = data.get('rank', None)
         self.explicit_lyrics = data.get('explicit_lyrics', None)
         self.preview = data.get('preview', None)
-        self.artist = Artist(data.get('artist', None))
-        self.album = Album(data.get('album', None))
+        self._artist_data = data.get('artist', None)
+        self._album_data = data.get('album', None)
+
+
+class KnownTracks:
+    """
+    Tracks already present in user playlists, artist id -> set of track ids. Used to exclude them from
+    recommendations. Thread-safe, bounded by count of artists with least recently updated evicted first.
+    """
+
+    def __init__(self, max_artists=None):
+        self.max_artists = max_artists
+        self.artists = OrderedDict()
+        self.lock = threading.Lock()
+
+    def add(self, artist_id, track_id):
+        key = str(artist_id)
+        with self.lock:
+            tracks = self.artists.get(key)
+            if tracks is None:
+                tracks = self.artists[key] = set()
+                if self.max_artists is not None and len(self.artists) > self.max_artists:
+                    self.artists.popitem(last=False)
+            else:
+                self.artists.move_to_end(key)
+            tracks.add(track_id)
+
+    def contains(self, artist_id, track_id):
+        tracks = self.artists.get(str(artist_id))
+        return tracks is not None and track_id in tracks
+
+    def tracks(self, artist_id):
+        with self.lock:
+            return frozenset(self.artists.get(str(artist_id), ()))
+
+    def clear(self):
+        with self.lock:
+            self.artists.clear()
+
+    def export(self):
+        """
+        :return: {artist id: sorted track ids}
+        """
+        with self.lock:
+            return {artist_id: sorted(tracks) for artist_id, tracks in self.artists.items()}
+
+    def __len__(self):
+        return len(self.artists)
 
 
 class DeezerUrl:
@@ -130,15 +232,18 @@ class DeezerUrl:
     AlbumUrl = 'https://api.deezer.com/album/{}'
     TopArtist = 'https://api.deezer.com/artist/{}/top?limit={}'
     PlayListUrl = 'https://api.deezer.com/playlist/{}'
+    PlayListTracksUrl = 'https://api.deezer.com/playlist/{}/tracks?index={}'
     RelatedArtistUrl = 'https://www.deezer.com/ru/artist/{}/related_artist'
     UserUrl = 'https://api.deezer.com/user/{}'
     SearchUrl = 'https://api.deezer.com/search{}?q={}'
     UserPlaylistUrl = 'https://www.deezer.com/ru/profile/{}/playlists'
     ProfilePlaylistUrl = 'https://www.deezer.com/ru/profile/{}/playlists'
     RestrictedPlayListUrl = 'https://api.deezer.com/playlist/{}?access_token={}'
+    RestrictedPlayListTracksUrl = 'https://api.deezer.com/playlist/{}/tracks?access_token={}&index={}'
     RestrictedAddPlayListUrl = 'https://api.deezer.com/user/{}/playlists?access_token={}&title={}'
     RestrictedTrackUrl = 'https://api.deezer.com/playlist/{}/tracks?access_token={}&songs={}'
     RestrictedUserUrl = 'https://api.deezer.com/user/me?access_token={}'
+    RestrictedUserPlayListsUrl = 'https://api.deezer.com/user/{}/playlists?access_token={}&limit=100'
     TokenUrl = 'https://connect.deezer.com/oauth/access_token.php?app_id={}&secret={}&code={}'
     CodeGenerationUrl = 'https://connect.deezer.com/oauth/auth.php?app_id={}&redirect_uri={}&perms={}'
 
@@ -156,9 +261,12 @@ class DeezerErrorMessage:
     PlaylistNotCreated = 'Playlist {} was not created. Please try again.'
     TrackNotAddedToPlaylist = 'Track with id {} was not added to playlist with id {}. Please, make sure that ' \
                               'elements with provided id exists. '
+    TracksNotAddedToPlaylist = 'Tracks with ids {} were not added to playlist with id {}: {}'
     DeletePlaylist = 'Playlist with id {} was not deleted. Please, make sure that playlist with provided id exist.'
     DeleteTrack = 'Track with {} was not deleted from playlist with id {}. Please, make sure that elements with ' \
                   'provided id exists. '
+    DeleteTracks = 'Tracks with ids {} were not deleted from playlist with id {}: {}'
+    FileNotDownloaded = 'File {} was not downloaded: {}. Please try again.'
     EmptySong = 'Please, define songs for player. Song list could not be empty or undefined.'
     WrongTokenAuthParameters = 'Parameter: token = {} is required for access = {}'
     WrongTokenAppAuthParameters = 'Parameters: app_id = {}, secret = {}, code = {} are required for access = {}'
@@ -166,32 +274,118 @@ class DeezerErrorMessage:
     Unauthorized = 'Unauthorized. Check authentication parameters and that access code was not used before'
     TokenExpired = 'Token was expired. Generate again'
     PermissionDenied = 'With permission: {} you can not {}'
+    PageNotLoaded = 'Can not load page {}. Please try again.'
+    CircuitOpen = 'Requests to {} are paused for {:.0f} seconds after repeated failures. Please try again later.'
+    AsyncUnavailable = 'Async client requires aiohttp. Please, install deezer-playlist-generator[async].'
+    NumpyUnavailable = 'Vectorized scoring requires numpy. Please, install deezer-playlist-generator[numpy].'
+    GraphNotLoaded = 'Artist graph {} is damaged. Please, delete it to load related artists again.'
+    UnknownWeights = 'Unknown score weights: {}. Supported: rank, affinity, distance, recency, bpm, gain.'
+    UnknownLane = 'Unknown lane: {}. Please, use one of this {}.'
+
+
+_app_state_begin = b'<script>window.__DZR_APP_STATE__ ='
+_app_state_end = b'</script>'
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(rb'[ \t\n\r]*')
+_quoted = re.compile(rb'"[^"]*"')
+_not_structure = bytes(c for c in range(256) if c not in b'"{}[]')
+
+
+def _nesting(content, start, end):
+    """
+    Brackets of the json between start and end, both outside of strings, that are not matched in between
+    :return: count of closed and count of opened brackets
+    """
+    segment = content[start:end]
+    if b'\\' in segment:
+        segment = segment.replace(b'\\\\', b'').replace(b'\\"', b'')
+    structure = segment.translate(None, _not_structure).replace(b'""', b'')
+    if b'"' in structure:
+        structure = _quoted.sub(b'', structure)
+    while True:
+        matched = structure.replace(b'{}', b'').replace(b'[]', b'')
+        if len(matched) == len(structure):
+            break
+        structure = matched
+    closed = structure.count(b'}') + structure.count(b']')
+    return closed, len(structure) - closed
+
+
+def _member(content, start, end, key):
+    """
+    :param start: position of '{' of a json object
+    :return: position of the value of key in this object, None when the object has no such key
+    """
+    pattern = re.compile(b'"' + re.escape(key.encode('utf-8')) + rb'"[ \t\n\r]*:')
+    depth, position = 1, start + 1
+    match = pattern.search(content, position, end)
+    while match is not None:
+        if content[match.start() - 1] != ord('\\'):
+            closed, opened = _nesting(content, position, match.start())
+            if closed >= depth:
+                return None
+            depth += opened - closed
+            if depth == 1:
+                return _whitespace.match(content, match.end()).end()
+            position = match.end()
+        match = pattern.search(content, match.end(), end)
+    return None
 
 
 class DeezerParser:
 
     @staticmethod
     def parse_html(response):
+        return DeezerParser.parse_app_state(response.content)
+
+    @staticmethod
+    def parse_app_state(content, *keys):
+        """
+        Value by path of keys from window.__DZR_APP_STATE__ of a deezer html page.
+        Keys are looked up on their own level of the state and only the value of the last key is decoded,
+        the whole state is decoded only when the keys are not found by the scan.
+        """
         try:
-            return json.loads(re.search('<script>window.__DZR_APP_STATE__ =(.+?)</script>',
-                                        response.content.decode("utf-8")).group(1))
+            start = content.index(_app_state_begin) + len(_app_state_begin)
+            end = content.index(_app_state_end, start)
+            value = DeezerParser.__scan_app_state(content, start, end, keys) if keys else None
+            if value is None:
+                value = json.loads(content[start:end].decode('utf-8'))
+                for key in keys:
+                    value = value[key]
+            return value
         except Exception as e:
             raise DeezerError('Html content was change: {}'.format(e))
 
     @staticmethod
-    def parse_tracks(tracks_data):
-        tracks = []
+    def __scan_app_state(content, start, end, keys):
+        """
+        Keys are found with a regex search and accepted on their own nesting level only
+        :return: value of the last key, None when a key is not found on its level
+        """
+        try:
+            position = _whitespace.match(content, start).end()
+            for key in keys:
+                if content[position] != ord('{'):
+                    return None
+                position = _member(content, position, end, key)
+                if position is None:
+                    return None
+            value, _ = _decoder.raw_decode(content[position:end].decode('utf-8'))
+        except (ValueError, IndexError):
+            return None
+        return value if isinstance(value, (dict, list)) else None
+
+    @staticmethod
+    def parse_tracks(tracks_data, known_tracks=None):
+        return list(DeezerParser.iter_tracks(tracks_data, known_tracks))
+
+    @staticmethod
+    def iter_tracks(tracks_data, known_tracks=None):
         for t in tracks_data:
-            track = Track(t)
-            tracks.append(track)
-            key = track.artist.id
-            value = playlist.get(key)
-            if value is None:
-                playlist[key] = [track.id]
-            else:
-                value.append(track.id)
-                playlist[key] = value
-        return tracks
+            if known_tracks is not None:
+                known_tracks.add((t.get('artist') or {}).get('id', None), t.get('id', None))
+            yield Track(t)
 
     @staticmethod
     def append_contributors(contributors_data):
@@ -219,3 +413,13 @@ class DeezerParser:
 
 class DeezerError(Exception):
     pass
+
+
+class DeezerBatchError(DeezerError):
+    """
+    Some chunks of a batch request failed, failed is a list of (track ids, reason) per chunk
+    """
+
+    def __init__(self, message, failed):
+        super().__init__(message)
+        self.failed = failed
@@ -0,0 +1,103 @@
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DeezerPaginator:
+    """
+    Items of a paginated Deezer response. Follows 'next' links and requests the next page in background
+    while the current one is consumed. Stops requesting pages when limit is reached.
+    """
+
+    def __init__(self, load_page, url, limit=None):
+        """
+        :param load_page: function url -> page payload {'data': [...], 'next': url}
+        :param url: first page url
+        :param limit: max count of items
+        """
+        self.load_page = load_page
+        self.url = url
+        self.limit = limit
+
+    def __iter__(self):
+        if self.limit is not None and self.limit <= 0:
+            return
+        count = 0
+        executor = ThreadPoolExecutor(max_workers=1)
+        future = executor.submit(self.load_page, self.url)
+        try:
+            while future is not None:
+                page = future.result()
+                items = page.get('data', [])
+                next_url = page.get('next', None)
+                future = None
+                if next_url and items and (self.limit is None or count + len(items) < self.limit):
+                    future = executor.submit(self.load_page, next_url)
+                for item in items:
+                    yield item
+                    count += 1
+                    if self.limit is not None and count >= self.limit:
+                        return
+        finally:
+            if future is not None:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+
+class AsyncDeezerPaginator:
+    """
+    Asyncio version of DeezerPaginator: use with 'async for'
+    """
+
+    def __init__(self, load_page, url, limit=None):
+        """
+        :param load_page: coroutine function url -> page payload {'data': [...], 'next': url}
+        :param url: first page url
+        :param limit: max count of items
+        """
+        self.load_page = load_page
+        self.url = url
+        self.limit = limit
+        self.items = deque()
+        self.count = 0
+        self.task = None
+        self.started = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.started:
+            self.started = True
+            if self.limit is None or self.limit > 0:
+                self.task = asyncio.ensure_future(self.load_page(self.url))
+        while not self.items:
+            if self.task is None:
+                raise StopAsyncIteration
+            page = await self.task
+            items = page.get('data', [])
+            next_url = page.get('next', None)
+            self.task = None
+            if next_url and items and (self.limit is None or self.count + len(items) < self.limit):
+                self.task = asyncio.ensure_future(self.load_page(next_url))
+            self.items.extend(items)
+        item = self.items.popleft()
+        self.count += 1
+        if self.limit is not None and self.count >= self.limit:
+            self.close()
+        return item
+
+    def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        self.items.clear()
+
+    async def collect(self):
+        """
+        :return: list of all items
+        """
+        result = []
+        async for item in self:
+            result.append(item)
+        return result
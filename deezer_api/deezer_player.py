@@ -1,35 +1,166 @@
+import threading
 import time
 import tkinter as tkr
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import pygame
-import requests
 import tqdm
 from PIL import ImageTk, Image
 
 from deezer_api import DeezerError
+from deezer_api.deezer_media import MediaCache
 from deezer_api.deezer_objects import DeezerErrorMessage
+from deezer_api.deezer_transport import DeezerTransport
 
 
 class Downloader:
+    """
+    Downloads previews and album covers of tracks concurrently into MediaCache. Previews are kept by track id and
+    covers by url, so files of previous sessions and covers shared by tracks of one album are not downloaded again.
+    """
+    ChunkSize = 64 * 1024
+
+    def __init__(self, transport=None, max_workers=8, media=None):
+        """
+        :param transport: DeezerTransport object, pass transport of the client to share its connections and limiter
+        :param max_workers: max count of concurrent downloads
+        :param media: MediaCache object
+        """
+        self.transport = DeezerTransport() if transport is None else transport
+        self.max_workers = max_workers
+        self.media = MediaCache() if media is None else media
+        self.lock = threading.Lock()
+        self.downloaded = 0
+        self.skipped = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def preview(self, track):
+        """
+        :return: path of the track preview, downloaded when missed in cache
+        """
+        return self.download_file(track.preview, MediaCache.preview_key(track))
+
+    def cover(self, track):
+        """
+        :return: path of the album cover of the track, downloaded when missed in cache
+        """
+        url = track.album.cover_medium
+        return self.download_file(url, MediaCache.cover_key(url) if url else None)
 
     def download(self, soundtracks):
-        index = 0
-        music_list = {}
-        for i in tqdm.tqdm(range(len(soundtracks)), desc='Download deezer playlist'):
-            track = soundtracks[i]
-            music_list[index] = '{} - {}'.format(track.artist.name, track.title)
-            self.__download_file(track.preview, 'music/{}.mp3'.format(index))
-            self.__download_file(track.album.cover_medium, 'album/{}.png'.format(index))
-            index += 1
-            time.sleep(0.1)
-        return music_list
+        """
+        :param soundtracks: list Track object
+        :return: dict index -> 'artist - title'
+        """
+        files = {}
+        for track in soundtracks:
+            files[MediaCache.preview_key(track)] = track.preview
+            if track.album.cover_medium:
+                files[MediaCache.cover_key(track.album.cover_medium)] = track.album.cover_medium
 
-    @staticmethod
-    def __download_file(file, music_format):
-        response = requests.get(file)
-        file = open(music_format, 'wb')
-        file.write(response.content)
-        file.close()
+        start = time.perf_counter()
+        with tqdm.tqdm(total=len(files), desc='Download deezer playlist', unit='file') as progress, \
+                ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self.download_file, url, key) for key, url in files.items()]
+            for future in as_completed(futures):
+                future.result()
+                progress.update()
+            with self.lock:
+                self.seconds += time.perf_counter() - start
+            progress.set_postfix_str('{:.1f} KB/s'.format(self.stats()['throughput'] / 1024))
+        return {index: '{} - {}'.format(track.artist.name, track.title) for index, track in enumerate(soundtracks)}
+
+    def download_file(self, url, key):
+        """
+        Stream url into media cache by key, cached file is not downloaded again
+        :return: path of the file, None when url is empty
+        """
+        path = self.media.get(key) if url else None
+        if path is not None or not url:
+            with self.lock:
+                self.skipped += 1
+            return path
+
+        def chunks():
+            response = self.transport.get(url, stream=True)
+            try:
+                if response.status_code != 200:
+                    raise DeezerError(DeezerErrorMessage.FileNotDownloaded.format(url, response.reason))
+                for chunk in response.iter_content(self.ChunkSize):
+                    with self.lock:
+                        self.bytes += len(chunk)
+                    yield chunk
+            finally:
+                response.close()
+            with self.lock:
+                self.downloaded += 1
+
+        return self.media.fetch(key, chunks)
+
+    def stats(self):
+        """
+        :return: count of downloaded and skipped files, downloaded bytes and throughput in bytes per second
+        """
+        with self.lock:
+            return {'downloaded': self.downloaded, 'skipped': self.skipped, 'bytes': self.bytes,
+                    'seconds': self.seconds, 'throughput': self.bytes / self.seconds if self.seconds else 0.0}
+
+
+class Prefetcher:
+    """
+    Downloads the playing track and look_ahead next tracks in background threads
+    """
+
+    def __init__(self, downloader, soundtracks, look_ahead=3):
+        """
+        :param downloader: Downloader object
+        :param soundtracks: list Track object
+        :param look_ahead: count of next tracks downloaded while current one is playing
+        """
+        self.downloader = downloader
+        self.soundtracks = soundtracks
+        self.look_ahead = look_ahead
+        self.executor = ThreadPoolExecutor(max_workers=max(1, min(look_ahead, downloader.max_workers)))
+        self.futures = {}
+        self.lock = threading.Lock()
+
+    def prefetch(self, index):
+        """
+        Start downloads of track by index and look_ahead next tracks
+        """
+        for i in range(index, min(index + self.look_ahead + 1, len(self.soundtracks))):
+            self.__submit(i)
+
+    def paths(self, index):
+        """
+        :return: paths of preview and cover of track by index, waits only when they are not downloaded yet
+        """
+        future = self.__submit(index)
+        self.prefetch(index)
+        try:
+            return future.result()
+        except Exception:
+            with self.lock:
+                if self.futures.get(index, None) is future:
+                    del self.futures[index]
+            raise
+
+    def __submit(self, index):
+        with self.lock:
+            future = self.futures.get(index, None)
+            if future is None:
+                future = self.futures[index] = self.executor.submit(self.__download, self.soundtracks[index])
+            return future
+
+    def __download(self, track):
+        return self.downloader.preview(track), self.downloader.cover(track)
+
+    def close(self):
+        with self.lock:
+            for future in self.futures.values():
+                future.cancel()
+        self.executor.shutdown(wait=False)
 
 
 class PlayerControl:
@@ -38,7 +169,7 @@ class PlayerControl:
     def play(player_ui):
         pygame.init()
         pygame.mixer.init()
-        pygame.mixer.music.load('music/{}.mp3'.format(player_ui.current_song_number))
+        pygame.mixer.music.load(player_ui.music_path(player_ui.current_song_number))
         pygame.mixer.music.play()
 
     @staticmethod
@@ -75,7 +206,7 @@ class PlayerControl:
     def __init_sound_track(player_ui):
         song = player_ui.music_list.get(player_ui.current_song_number)
         player_ui.music_label.configure(text=PlayerControl.modify_song_name(song))
-        image = ImageTk.PhotoImage(Image.open('album/{}.png'.format(player_ui.current_song_number)))
+        image = ImageTk.PhotoImage(Image.open(player_ui.album_path(player_ui.current_song_number)))
         player_ui.panel.configure(image=image)
         player_ui.panel.image = image
         player_ui.player.update_idletasks()
@@ -85,12 +216,28 @@ class PlayerControl:
 
 class DeezerPlayer:
 
-    def __init__(self, deezer_soundtracks=None):
+    def __init__(self, deezer_soundtracks=None, downloader=None, look_ahead=3, transport=None):
+        """
+        :param deezer_soundtracks: list Track object
+        :param downloader: Downloader object
+        :param transport: DeezerTransport object of the default downloader, e.g. transport of the client
+        :param look_ahead: count of next tracks downloaded while current one is playing,
+        None to download all tracks before the player is opened
+        """
         if deezer_soundtracks is None or len(deezer_soundtracks) == 0:
             raise DeezerError(DeezerErrorMessage.EmptySong)
         self.max_size = len(deezer_soundtracks)
         self.current_song_number = 0
-        self.music_list = Downloader().download(deezer_soundtracks)
+        self.soundtracks = deezer_soundtracks
+        self.downloader = Downloader(transport) if downloader is None else downloader
+        self.prefetcher = None
+        if look_ahead is None:
+            self.music_list = self.downloader.download(deezer_soundtracks)
+        else:
+            self.music_list = {index: '{} - {}'.format(track.artist.name, track.title)
+                               for index, track in enumerate(deezer_soundtracks)}
+            self.prefetcher = Prefetcher(self.downloader, deezer_soundtracks, look_ahead)
+            self.prefetcher.prefetch(self.current_song_number)
 
         # Player initialization
         self.player = tkr.Tk()
@@ -116,7 +263,7 @@ class DeezerPlayer:
                                       command=lambda: PlayerControl.prev_song(self))
 
         # Label initialization
-        self.album_image = ImageTk.PhotoImage(Image.open('album/{}.png'.format(self.current_song_number)))
+        self.album_image = ImageTk.PhotoImage(Image.open(self.album_path(self.current_song_number)))
         self.panel = tkr.Label(self.player, image=self.album_image)
         self.music_label = tkr.Label(text=self.music_list.get(self.current_song_number))
         self.music_label.configure(font=("Comic Sans MS", 10), bg='black', foreground="white")
@@ -129,8 +276,22 @@ class DeezerPlayer:
         self.stop_button.grid(row=1, column=2, padx=(10, 10), pady=(80, 10))
         self.next_button.grid(row=1, column=3, padx=(10, 10), pady=(80, 10))
 
+    def music_path(self, index):
+        if self.prefetcher is not None:
+            return self.prefetcher.paths(index)[0]
+        return self.downloader.preview(self.soundtracks[index])
+
+    def album_path(self, index):
+        if self.prefetcher is not None:
+            return self.prefetcher.paths(index)[1]
+        return self.downloader.cover(self.soundtracks[index])
+
     def start(self):
         """
         Run generated recommendations from Deezer in player
         """
-        self.player.mainloop()
+        try:
+            self.player.mainloop()
+        finally:
+            if self.prefetcher is not None:
+                self.prefetcher.close()
@@ -0,0 +1,280 @@
+import heapq
+import math
+from array import array
+from collections import Counter
+
+from deezer_api.deezer_objects import DeezerError, DeezerErrorMessage
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+_missing = float('nan')
+
+
+class TrackFilter:
+    """
+    Filter of recommended tracks. Bounds set to None are not checked, tracks without the value pass the filter.
+
+        TrackFilter(min_duration=120, max_duration=420, explicit=False, min_year=2010)
+    """
+
+    def __init__(self, min_duration=None, max_duration=None, explicit=True, min_year=None, max_year=None):
+        """
+        :param min_duration: min duration of track in seconds
+        :param max_duration: max duration of track in seconds
+        :param explicit: False to skip tracks with explicit lyrics
+        :param min_year: min release year
+        :param max_year: max release year
+        """
+        self.min_duration = min_duration
+        self.max_duration = max_duration
+        self.explicit = explicit
+        self.min_year = min_year
+        self.max_year = max_year
+
+    def accepts(self, duration, explicit, year):
+        return not ((self.min_duration is not None and duration < self.min_duration) or
+                    (self.max_duration is not None and duration > self.max_duration) or
+                    (not self.explicit and explicit) or
+                    (self.min_year is not None and year < self.min_year) or
+                    (self.max_year is not None and year > self.max_year))
+
+    def mask(self, duration, explicit, year):
+        """
+        accepts() for numpy arrays of values
+        """
+        mask = numpy.ones(len(duration), dtype=bool)
+        with numpy.errstate(invalid='ignore'):
+            if self.min_duration is not None:
+                mask &= ~(duration < self.min_duration)
+            if self.max_duration is not None:
+                mask &= ~(duration > self.max_duration)
+            if not self.explicit:
+                mask &= explicit == 0
+            if self.min_year is not None:
+                mask &= ~(year < self.min_year)
+            if self.max_year is not None:
+                mask &= ~(year > self.max_year)
+        return mask
+
+
+class CandidatePool:
+    """
+    Candidate tracks for recommendations. Tracks are deduplicated by id and isrc and scored by
+    their rank, affinity of the artist (how often the artist is found in the user playlists) and distance
+    from the user artists (0 - artist from the user playlists, 1 - related artist, ...).
+    Features of the tracks are packed into columns, so scoring and filtering run on numpy arrays when numpy is
+    installed and fall back to plain python otherwise.
+
+        pool = CandidatePool(weights={'recency': 0.5}, track_filter=TrackFilter(explicit=False))
+        pool.add_playlists(user_playlists)
+        pool.add_tracks(artist.id, tracks, distance=1)
+        pool.top(50)
+    """
+    MaxRank = 1000000
+    DefaultWeights = {'rank': 1.0, 'affinity': 1.0, 'distance': 1.0, 'recency': 0.0, 'bpm': 0.0, 'gain': 0.0}
+    ScaledFeatures = (('recency', 'year'), ('bpm', 'bpm'), ('gain', 'gain'))
+
+    def __init__(self, weights=None, track_filter=None, vectorized=None):
+        """
+        :param weights: weights of score parts: rank, affinity, distance, recency, bpm, gain
+        :param track_filter: TrackFilter object
+        :param vectorized: score with numpy, by default when numpy is installed
+        """
+        unknown = set(weights or ()) - set(self.DefaultWeights)
+        if unknown:
+            raise DeezerError(DeezerErrorMessage.UnknownWeights.format(', '.join(sorted(unknown))))
+        if vectorized and numpy is None:
+            raise DeezerError(DeezerErrorMessage.NumpyUnavailable)
+        self.weights = dict(self.DefaultWeights, **(weights or {}))
+        self.track_filter = track_filter
+        self.vectorized = numpy is not None if vectorized is None else vectorized
+        self.affinity = Counter()
+        self.distance = {}
+        self.candidates = []
+        self.artists = {}
+        self.artist_index = array('q')
+        self.columns = {name: array('d') for name in ('rank', 'duration', 'bpm', 'gain', 'explicit', 'year')}
+        self.track_ids = set()
+        self.isrcs = set()
+        self.duplicates = 0
+
+    def __len__(self):
+        return len(self.candidates)
+
+    def add_playlists(self, playlists):
+        """
+        Count affinity of the artists of the user playlists
+        """
+        for playlist in playlists:
+            for track in playlist.tracks:
+                artist_id = getattr(track.artist, 'id', None)
+                if artist_id is not None:
+                    self.add_artist(artist_id)
+
+    def add_artist(self, artist_id, distance=0, affinity=1):
+        self.affinity[artist_id] += affinity
+        self.distance[artist_id] = min(distance, self.distance.get(artist_id, distance))
+
+    def add_tracks(self, artist_id, tracks, distance=1):
+        """
+        :param artist_id: artist of the tracks
+        :param tracks: list Track object
+        :param distance: distance of the artist, when it is not known yet
+        """
+        self.distance.setdefault(artist_id, distance)
+        artist_index = self.artists.setdefault(artist_id, len(self.artists))
+        columns = self.columns
+        for track in tracks:
+            if track.id in self.track_ids or (track.isrc is not None and track.isrc in self.isrcs):
+                self.duplicates += 1
+                continue
+            self.track_ids.add(track.id)
+            if track.isrc is not None:
+                self.isrcs.add(track.isrc)
+            self.candidates.append((artist_id, track))
+            self.artist_index.append(artist_index)
+            columns['rank'].append(min(track.rank or 0, self.MaxRank))
+            columns['duration'].append(_number(track.duration))
+            columns['bpm'].append(_number(track.bpm))
+            columns['gain'].append(_number(track.gain))
+            columns['explicit'].append(1 if track.explicit_lyrics else 0)
+            columns['year'].append(_number((track.release_date or '')[:4]))
+
+    def __artist_scores(self):
+        max_affinity = math.log1p(max(self.affinity.values(), default=0)) or 1.0
+        return {artist_id: self.weights['affinity'] * math.log1p(self.affinity[artist_id]) / max_affinity +
+                self.weights['distance'] / (1.0 + distance) for artist_id, distance in self.distance.items()}
+
+    def scores(self):
+        """
+        :return: list of score per candidate in order of adding, filtered tracks have score None
+        """
+        if self.vectorized:
+            scores, mask = self.__vector_scores()
+            return [score if accepted else None for score, accepted in zip(scores.tolist(), mask.tolist())]
+        return self.__scores()
+
+    def __scores(self):
+        artist_scores = self.__artist_scores()
+        rank_weight = self.weights['rank'] / self.MaxRank
+        scores = [artist_scores[artist_id] + rank_weight * rank
+                  for (artist_id, _), rank in zip(self.candidates, self.columns['rank'])]
+        for weight, name in self.ScaledFeatures:
+            weight = self.weights[weight]
+            values = [value for value in self.columns[name] if value == value]
+            if weight and values and max(values) > min(values):
+                low, scale = min(values), weight / (max(values) - min(values))
+                scores = [score + (scale * (value - low) if value == value else 0.0)
+                          for score, value in zip(scores, self.columns[name])]
+        if self.track_filter is not None:
+            accepts = self.track_filter.accepts
+            scores = [score if accepts(duration, explicit, year) else None for score, duration, explicit, year in
+                      zip(scores, self.columns['duration'], self.columns['explicit'], self.columns['year'])]
+        return scores
+
+    def __vector_scores(self):
+        columns = {name: numpy.frombuffer(column, dtype=float) for name, column in self.columns.items()}
+        artist_scores = self.__artist_scores()
+        artist_index = numpy.frombuffer(self.artist_index, dtype=numpy.int64)
+        by_artist = numpy.empty(len(self.artists))
+        for artist_id, index in self.artists.items():
+            by_artist[index] = artist_scores[artist_id]
+        scores = by_artist[artist_index]
+        scores += self.weights['rank'] / self.MaxRank * columns['rank']
+        for weight, name in self.ScaledFeatures:
+            weight = self.weights[weight]
+            values = columns[name]
+            if weight and not numpy.isnan(values).all():
+                low, high = numpy.nanmin(values), numpy.nanmax(values)
+                if high > low:
+                    scores += numpy.nan_to_num(weight / (high - low) * (values - low))
+        if self.track_filter is None:
+            mask = numpy.ones(len(scores), dtype=bool)
+        else:
+            mask = self.track_filter.mask(columns['duration'], columns['explicit'], columns['year'])
+        return scores, mask
+
+    def top(self, count, max_per_artist=None):
+        """
+        Best tracks, at most max_per_artist from one artist while other artists have candidates
+        :param count: count tracks
+        :param max_per_artist: limit of tracks of one artist, by default count split equally between artists
+        :return: list Track object ordered by score
+        """
+        if count <= 0 or not self.candidates:
+            return []
+        if self.vectorized:
+            chosen = self.__vector_top(count, max_per_artist)
+        else:
+            chosen = self.__top(count, max_per_artist)
+        return [self.candidates[index][1] for index in chosen]
+
+    def __top(self, count, max_per_artist):
+        scores = self.__scores()
+        if max_per_artist is None:
+            artists = {self.candidates[index][0] for index, score in enumerate(scores) if score is not None}
+            max_per_artist = -(-count // max(len(artists), 1))
+        by_artist = {}
+        overflow = []
+        for index, score in enumerate(scores):
+            if score is None:
+                continue
+            heap = by_artist.setdefault(self.candidates[index][0], [])
+            item = (score, -index)
+            if len(heap) < max_per_artist:
+                heapq.heappush(heap, item)
+            else:
+                overflow.append(heapq.heappushpop(heap, item))
+        chosen = heapq.nlargest(count, (item for heap in by_artist.values() for item in heap))
+        if len(chosen) < count:
+            chosen = sorted(chosen + heapq.nlargest(count - len(chosen), overflow), reverse=True)
+        return [-index for _, index in chosen]
+
+    def __vector_top(self, count, max_per_artist):
+        scores, mask = self.__vector_scores()
+        artist_index = numpy.frombuffer(self.artist_index, dtype=numpy.int64)
+        accepted = numpy.flatnonzero(mask)
+        if not len(accepted):
+            return []
+        if max_per_artist is None:
+            max_per_artist = -(-count // numpy.count_nonzero(numpy.bincount(artist_index[accepted])))
+        # per-artist positions among the best tracks are exact, so widen the best tracks until caps leave enough
+        size = count * 4
+        while True:
+            capped, overflow = _cap(_best(scores, accepted, size), artist_index, max_per_artist)
+            if len(capped) >= count or size >= len(accepted):
+                break
+            size *= 4
+        chosen = capped[:count]
+        if len(chosen) < count:
+            chosen = _best(scores, numpy.r_[chosen, overflow[:count - len(chosen)]], count)
+        return chosen.tolist()
+
+
+def _number(value):
+    try:
+        return float(value) if value is not None else _missing
+    except ValueError:
+        return _missing
+
+
+def _best(scores, indexes, count):
+    if len(indexes) > count:
+        indexes = indexes[scores[indexes] >= -numpy.partition(-scores[indexes], count - 1)[count - 1]]
+    return indexes[numpy.lexsort((indexes, -scores[indexes]))][:count]
+
+
+def _cap(order, artist_index, max_per_artist):
+    """
+    Split indexes ordered by score to the ones within max_per_artist of their artist and the others
+    """
+    artists = artist_index[order]
+    groups = numpy.argsort(artists, kind='stable')
+    artists = artists[groups]
+    starts = numpy.flatnonzero(numpy.r_[True, artists[1:] != artists[:-1]])
+    position = numpy.empty(len(order), dtype=numpy.int64)
+    position[groups] = numpy.arange(len(order)) - numpy.repeat(starts, numpy.diff(numpy.r_[starts, len(order)]))
+    return order[position < max_per_artist], order[position >= max_per_artist]
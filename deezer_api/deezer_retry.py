@@ -0,0 +1,322 @@
+import asyncio
+import email.utils
+import json
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+from deezer_api.deezer_objects import DeezerError, DeezerErrorMessage
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+ConnectionErrors = (requests.ConnectionError, requests.Timeout, ConnectionError, TimeoutError,
+                    asyncio.TimeoutError) + \
+                   ((aiohttp.ClientConnectionError, aiohttp.ClientPayloadError) if aiohttp is not None else ())
+
+
+class CircuitBreaker:
+    """
+    Stops requests to a host after consecutive failures. After reset seconds one trial request is let through:
+    success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, failures=5, reset=30.0):
+        """
+        :param failures: count of consecutive failures opening the breaker
+        :param reset: seconds before a trial request
+        """
+        self.failures = failures
+        self.reset = reset
+        self.lock = threading.Lock()
+        self.failed = 0
+        self.opened = None
+        self.trial = False
+        self.opens = 0
+
+    @property
+    def state(self):
+        with self.lock:
+            if self.opened is None:
+                return 'closed'
+            return 'half-open' if time.monotonic() >= self.opened + self.reset else 'open'
+
+    def wait(self):
+        """
+        :return: seconds before a request may be sent, 0 when the breaker is closed or the caller takes the trial
+        """
+        with self.lock:
+            if self.opened is None:
+                return 0.0
+            remaining = self.opened + self.reset - time.monotonic()
+            if remaining > 0:
+                return remaining
+            if not self.trial:
+                self.trial = True
+                return 0.0
+            return self.reset / 10.0
+
+    def success(self):
+        with self.lock:
+            self.failed = 0
+            self.opened = None
+            self.trial = False
+
+    def failure(self):
+        with self.lock:
+            self.failed += 1
+            if self.trial or (self.opened is None and self.failed >= self.failures):
+                self.opened = time.monotonic()
+                self.opens += 1
+            self.trial = False
+
+
+class RetryPolicy:
+    """
+    Retries of transient Deezer failures: connection errors, 429 and 5xx responses and Deezer error codes
+    4 (quota limit exceeded) and 700 (service busy). Waits grow exponentially with jitter, Retry-After is honored,
+    every call is limited by deadline and hosts failing repeatedly are paused by a circuit breaker.
+    POST requests are retried only when they were throttled, so playlists are not created twice.
+
+        client = DeezerApi(token=<TOKEN>, access=Access.MANAGE, retry=RetryPolicy(attempts=8, deadline=300))
+    """
+    Statuses = (429, 500, 502, 503, 504)
+    ThrottledStatuses = (429,)
+    Codes = (4, 700)
+    ThrottledCodes = (4,)
+
+    def __init__(self, attempts=5, backoff=1.0, max_backoff=30.0, deadline=120.0, statuses=Statuses, codes=Codes,
+                 breaker_failures=10, breaker_reset=30.0, seed=None):
+        """
+        :param attempts: max count of attempts of one call, 1 disables retries
+        :param backoff: seconds before the first retry, doubled for every next one
+        :param max_backoff: max seconds of exponential backoff, a longer Retry-After of the server is waited in full
+        :param deadline: max seconds of one call with its retries, None for no limit
+        :param statuses: retried HTTP statuses
+        :param codes: retried Deezer error codes
+        :param breaker_failures: count of consecutive failures of a host opening its circuit breaker
+        :param breaker_reset: seconds before a trial request to a host with open circuit breaker
+        :param seed: seed of jitter
+        """
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.deadline = deadline
+        self.statuses = statuses
+        self.codes = codes
+        self.breaker_failures = breaker_failures
+        self.breaker_reset = breaker_reset
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.breakers = {}
+        self.retries = 0
+        self.gave_up = 0
+
+    def breaker(self, url):
+        host = urlsplit(url).netloc
+        breaker = self.breakers.get(host, None)
+        if breaker is None:
+            with self.lock:
+                breaker = self.breakers.setdefault(host, CircuitBreaker(self.breaker_failures, self.breaker_reset))
+        return breaker
+
+    def failure(self, method, response=None, error=None, stream=False):
+        """
+        :return: reason to retry the request, None when response should be returned
+        """
+        if error is not None:
+            return 'connection' if isinstance(error, ConnectionErrors) and method != 'POST' else None
+        status = response.status_code
+        if status in self.statuses:
+            return 'status {}'.format(status) if method != 'POST' or status in self.ThrottledStatuses else None
+        if status != 200 or stream:
+            return None
+        code = _error_code(response)
+        if code in self.codes and (method != 'POST' or code in self.ThrottledCodes):
+            return 'code {}'.format(code)
+        return None
+
+    def host_failed(self, response=None, error=None):
+        """
+        :return: True when the host did not answer or answered with a retried status, retried or not
+        """
+        if error is not None:
+            return isinstance(error, ConnectionErrors)
+        return response.status_code in self.statuses
+
+    def delay(self, attempt, response=None):
+        """
+        :param attempt: number of the failed attempt, from 1
+        :return: seconds before the next attempt
+        """
+        backoff = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        with self.lock:
+            backoff = backoff / 2 + self.random.uniform(0, backoff / 2)
+        retry_after = _retry_after(response) if response is not None else None
+        return backoff if retry_after is None else max(backoff, retry_after)
+
+    def stats(self):
+        """
+        :return: count of retries and calls failed after all attempts, state of circuit breakers per host
+        """
+        with self.lock:
+            breakers = dict(self.breakers)
+            retries, gave_up = self.retries, self.gave_up
+        return {'retries': retries, 'gave_up': gave_up,
+                'breakers': {host: {'state': b.state, 'opens': b.opens} for host, b in breakers.items()}}
+
+    def _count(self, retried):
+        with self.lock:
+            if retried:
+                self.retries += 1
+            else:
+                self.gave_up += 1
+
+
+class RetryTransport:
+    """
+    Transport retrying requests of another transport by RetryPolicy
+    """
+
+    def __init__(self, transport, policy, metrics=None):
+        self.transport = transport
+        self.policy = policy
+        self.metrics = metrics
+
+    def _send(self, method, send, url, deadline=None, **kwargs):
+        policy = self.policy
+        breaker = policy.breaker(url)
+        deadline = _deadline(policy, deadline)
+        attempt = 0
+        while True:
+            self._wait_breaker(breaker, url, deadline)
+            attempt += 1
+            response, error = None, None
+            try:
+                response = send(url, **kwargs)
+            except Exception as e:
+                error = e
+            reason = policy.failure(method, response, error, kwargs.get('stream', False))
+            wait = self._next(breaker, url, attempt, reason, response, deadline, error)
+            if wait is None:
+                if error is not None:
+                    raise error
+                return response
+            _close(response)
+            time.sleep(wait)
+
+    @staticmethod
+    def _wait_breaker(breaker, url, deadline):
+        wait = breaker.wait()
+        while wait > 0:
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise DeezerError(DeezerErrorMessage.CircuitOpen.format(urlsplit(url).netloc, wait))
+            time.sleep(wait)
+            wait = breaker.wait()
+
+    def _next(self, breaker, url, attempt, reason, response, deadline, error=None):
+        """
+        :return: seconds before the next attempt, None when the response or error should be returned
+        """
+        if reason is None:
+            # failures which are not retried, as 5xx of POST, still count for the breaker
+            if self.policy.host_failed(response, error):
+                breaker.failure()
+            elif error is None:
+                breaker.success()
+            return None
+        breaker.failure()
+        wait = self.policy.delay(attempt, response)
+        if attempt >= self.policy.attempts or (deadline is not None and time.monotonic() + wait > deadline):
+            self.policy._count(False)
+            return None
+        self.policy._count(True)
+        if self.metrics is not None:
+            self.metrics.retried(url, attempt, reason)
+        return wait
+
+    def get(self, url, **kwargs):
+        return self._send('GET', self.transport.get, url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self._send('POST', self.transport.post, url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self._send('DELETE', self.transport.delete, url, **kwargs)
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncRetryTransport(RetryTransport):
+    """
+    RetryTransport of AsyncDeezerTransport
+    """
+
+    async def _send(self, method, send, url, deadline=None, **kwargs):
+        policy = self.policy
+        breaker = policy.breaker(url)
+        deadline = _deadline(policy, deadline)
+        attempt = 0
+        while True:
+            wait = breaker.wait()
+            while wait > 0:
+                if deadline is not None and time.monotonic() + wait > deadline:
+                    raise DeezerError(DeezerErrorMessage.CircuitOpen.format(urlsplit(url).netloc, wait))
+                await asyncio.sleep(wait)
+                wait = breaker.wait()
+            attempt += 1
+            response, error = None, None
+            try:
+                response = await send(url, **kwargs)
+            except Exception as e:
+                error = e
+            reason = policy.failure(method, response, error, kwargs.get('stream', False))
+            wait = self._next(breaker, url, attempt, reason, response, deadline, error)
+            if wait is None:
+                if error is not None:
+                    raise error
+                return response
+            await asyncio.sleep(wait)
+
+    async def close(self):
+        await self.transport.close()
+
+
+def _deadline(policy, deadline):
+    deadline = policy.deadline if deadline is None else deadline
+    return None if deadline is None else time.monotonic() + deadline
+
+
+def _error_code(response):
+    content = response.content
+    if b'"error"' not in content:
+        return None
+    try:
+        return json.loads(content.decode('utf-8'))['error'].get('code', None)
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+
+def _retry_after(response):
+    value = (response.headers or {}).get('Retry-After', None)
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _close(response):
+    if response is not None and hasattr(response, 'close'):
+        response.close()
@@ -0,0 +1,437 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from deezer_api.deezer_api import DeezerApi, Access
+from deezer_api.deezer_async import AsyncDeezerApi, AsyncDeezerTransport
+from deezer_api.deezer_cache import MemoryCache
+from deezer_api.deezer_flight import SingleFlight, AsyncSingleFlight
+from deezer_api.deezer_graph import ArtistGraph
+from deezer_api.deezer_job import JobStore
+from deezer_api.deezer_objects import DeezerError, DeezerErrorMessage
+from deezer_api.deezer_retry import RetryPolicy
+from deezer_api.deezer_transport import DeezerTransport
+
+
+class Lane:
+    HIGH = 'high'
+    NORMAL = 'normal'
+    LOW = 'low'
+
+
+Lanes = (Lane.HIGH, Lane.NORMAL, Lane.LOW)
+
+
+class FairQueue:
+    """
+    Items queued per lane and user: pop() takes an item of the first lane with queued items,
+    users of that lane take turns, so a user with many items does not delay the others
+    """
+
+    def __init__(self, lanes=Lanes):
+        """
+        :param lanes: names of lanes from the highest priority
+        """
+        self.lanes = OrderedDict((lane, OrderedDict()) for lane in lanes)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def push(self, lane, user, item):
+        if lane not in self.lanes:
+            raise DeezerError(DeezerErrorMessage.UnknownLane.format(lane, ', '.join(self.lanes)))
+        users = self.lanes[lane]
+        if user not in users:
+            users[user] = deque()
+        users[user].append(item)
+        self.size += 1
+
+    def pop(self):
+        """
+        :return: next item, None when queue is empty
+        """
+        for users in self.lanes.values():
+            if users:
+                user, items = next(iter(users.items()))
+                item = items.popleft()
+                if items:
+                    users.move_to_end(user)
+                else:
+                    del users[user]
+                self.size -= 1
+                return item
+        return None
+
+
+class FairGate:
+    """
+    Bounds count of requests in flight shared by threads and coroutines.
+    Waiting requests get a freed slot in order of FairQueue: by lane, users in turns.
+    """
+
+    def __init__(self, capacity=8, lanes=Lanes):
+        """
+        :param capacity: max count of requests in flight
+        :param lanes: names of lanes from the highest priority
+        """
+        self.capacity = capacity
+        self.queue = FairQueue(lanes)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.granted = {}
+        self.waited = 0
+
+    def reserve(self, lane, user, grant):
+        """
+        Take a free slot or queue grant function called when a slot is passed to the caller
+        :return: True when slot was taken
+        """
+        with self.lock:
+            if self.active < self.capacity and not self.queue:
+                self.active += 1
+                self.granted[user] = self.granted.get(user, 0) + 1
+                return True
+            self.queue.push(lane, user, (user, grant))
+            self.waited += 1
+            return False
+
+    def acquire(self, lane, user):
+        event = threading.Event()
+        if not self.reserve(lane, user, event.set):
+            event.wait()
+
+    async def acquire_async(self, lane, user):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def grant():
+            loop.call_soon_threadsafe(self.__resolve, future)
+
+        if not self.reserve(lane, user, grant):
+            await future
+
+    def __resolve(self, future):
+        # slot of a cancelled waiter is passed on
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+    def release(self):
+        with self.lock:
+            waiter = self.queue.pop()
+            if waiter is None:
+                self.active -= 1
+                return
+            user, grant = waiter
+            self.granted[user] = self.granted.get(user, 0) + 1
+        grant()
+
+    def stats(self):
+        """
+        :return: requests in flight, queued requests, requests which waited for a slot, granted slots per user
+        """
+        with self.lock:
+            return {'active': self.active, 'queued': len(self.queue), 'waited': self.waited,
+                    'granted': dict(self.granted)}
+
+
+class FairTransport:
+    """
+    Transport of one user sending requests of a shared transport through FairGate. A response with stream=True
+    holds its connection until it is read, so it keeps the slot until response.close() is called.
+    """
+
+    def __init__(self, transport, gate, user, lane=Lane.NORMAL):
+        self.transport = transport
+        self.gate = gate
+        self.user = user
+        self.lane = lane
+
+    def _send(self, send, url, **kwargs):
+        self.gate.acquire(self.lane, self.user)
+        try:
+            response = send(url, **kwargs)
+        except BaseException:
+            self.gate.release()
+            raise
+        if not kwargs.get('stream'):
+            self.gate.release()
+            return response
+        return self._hold(response)
+
+    def _hold(self, response):
+        close, once = response.close, threading.Lock()
+
+        def release():
+            try:
+                close()
+            finally:
+                if once.acquire(blocking=False):
+                    self.gate.release()
+
+        response.close = release
+        return response
+
+    def get(self, url, **kwargs):
+        return self._send(self.transport.get, url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self._send(self.transport.post, url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self._send(self.transport.delete, url, **kwargs)
+
+    def close(self):
+        """
+        Shared transport is closed by its scheduler
+        """
+        pass
+
+
+class AsyncFairTransport(FairTransport):
+    """
+    FairTransport of AsyncDeezerTransport, its responses are read in full, so the slot is released when send returns
+    """
+
+    async def _send(self, send, url, **kwargs):
+        await self.gate.acquire_async(self.lane, self.user)
+        try:
+            return await send(url, **kwargs)
+        finally:
+            self.gate.release()
+
+    async def close(self):
+        pass
+
+
+class BatchJob:
+    """
+    Generation job of one user in BatchScheduler
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    def __init__(self, user, token, lane, job_id, title, count_tracks, track_filter, weights):
+        self.user = user
+        self.token = token
+        self.lane = lane
+        self.job_id = job_id
+        self.title = title
+        self.count_tracks = count_tracks
+        self.track_filter = track_filter
+        self.weights = weights
+        self.state = self.QUEUED
+        self.generation = None
+        self.tracks = None
+        self.error = None
+
+    @property
+    def progress(self):
+        """
+        :return: {'user', 'lane', 'state', 'stage', 'done', 'total', 'error'}
+        """
+        progress = {'user': self.user, 'lane': self.lane, 'state': self.state, 'stage': None, 'done': 0, 'total': 0,
+                    'error': None if self.error is None else str(self.error)}
+        if self.generation is not None:
+            progress.update(self.generation.progress)
+        return progress
+
+
+class BatchScheduler:
+    """
+    Runs create_recommendation_playlist of many users together. Clients of all users share one transport with its
+    connection pool and rate limiter, cache, single flight, artist graph and retry policy. Requests of all users pass
+    FairGate: at most max_requests are in flight, freed slots go to the highest priority lane and to its users in
+    turns. Jobs are GenerationJob objects saved in store, so a failed batch run again continues every job.
+
+        scheduler = BatchScheduler(max_jobs=64, max_requests=16)
+        for user, token in tokens.items():
+            scheduler.submit(user, token, lane=Lane.HIGH if user in premium else Lane.NORMAL, count_tracks=50)
+        jobs = scheduler.run()
+    """
+
+    def __init__(self, transport=None, cache=None, graph=None, retry=None, metrics=None, store=None, max_jobs=16,
+                 max_requests=8, max_workers=4, lanes=Lanes, run_id=None):
+        """
+        :param transport: transport shared by all users, DeezerTransport with Deezer quota by default
+        :param cache: cache shared by all users
+        :param graph: ArtistGraph shared by all users
+        :param retry: RetryPolicy shared by all users
+        :param metrics: DeezerMetrics of all requests
+        :param store: JobStore of jobs, in memory by default
+        :param max_jobs: max count of jobs running at once
+        :param max_requests: max count of requests in flight of all jobs
+        :param max_workers: max count of concurrent loads of one job
+        :param lanes: names of lanes from the highest priority
+        :param run_id: prefix of default job ids, today's date by default: a batch run again the same day continues
+        its jobs, a batch of the next day runs new ones
+        """
+        self.__own_transport = transport is None
+        self.transport = self._create_transport() if transport is None else transport
+        self.cache = MemoryCache() if cache is None else cache
+        self.flight = self._create_flight()
+        self.graph = ArtistGraph() if graph is None else graph
+        self.retry = RetryPolicy() if retry is None else retry
+        self.metrics = metrics
+        self.store = JobStore() if store is None else store
+        self.max_jobs = max_jobs
+        self.max_workers = max_workers
+        self.lanes = lanes
+        self.run_id = time.strftime('%Y-%m-%d') if run_id is None else run_id
+        self.gate = FairGate(max_requests, lanes)
+        self.jobs = []
+        self.pending = FairQueue(lanes)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _create_transport():
+        return DeezerTransport()
+
+    @staticmethod
+    def _create_flight():
+        return SingleFlight()
+
+    @property
+    def _owns_transport(self):
+        return self.__own_transport
+
+    @staticmethod
+    def _api_class():
+        return DeezerApi
+
+    @staticmethod
+    def _transport_class():
+        return FairTransport
+
+    def submit(self, user, token, lane=Lane.NORMAL, title='Deezer Recommendation', count_tracks=50, track_filter=None,
+               weights=None, job_id=None):
+        """
+        Queue generation job of a user
+        :param user: key of the user, jobs of one user take turns with jobs of others
+        :param token: access token of the user with manage_library permission
+        :param lane: name of lane
+        :param title: name of playlist
+        :param count_tracks: count tracks
+        :param track_filter: TrackFilter object: duration range, explicit lyrics, release years
+        :param weights: weights of score parts: rank, affinity, distance, recency, bpm, gain
+        :param job_id: id of the job in store, '<run_id>:<user>' by default. Jobs done in store are not run again
+        :return: BatchJob object
+        """
+        job_id = '{}:{}'.format(self.run_id, user) if job_id is None else job_id
+        job = BatchJob(user, token, lane, job_id, title, count_tracks, track_filter, weights)
+        with self.lock:
+            self.pending.push(lane, user, job)
+            self.jobs.append(job)
+        return job
+
+    def run(self):
+        """
+        Run queued jobs, errors of a job are kept in the job and do not stop the others
+        :return: list BatchJob objects
+        """
+        with ThreadPoolExecutor(max_workers=self.max_jobs) as executor:
+            for future in [executor.submit(self._work) for _ in range(self.max_jobs)]:
+                future.result()
+        return list(self.jobs)
+
+    def _next_job(self):
+        with self.lock:
+            job = self.pending.pop()
+            if job is not None:
+                job.state = BatchJob.RUNNING
+            return job
+
+    def _work(self):
+        job = self._next_job()
+        while job is not None:
+            try:
+                job.tracks = self._generation(job).run()
+                job.state = BatchJob.DONE
+            except Exception as e:
+                job.error = e
+                job.state = BatchJob.FAILED
+            job = self._next_job()
+
+    def _generation(self, job):
+        client = self._api_class()(token=job.token, access=Access.MANAGE,
+                                   transport=self._transport_class()(self.transport, self.gate, job.user, job.lane),
+                                   max_workers=self.max_workers, cache=self.cache, flight=self.flight,
+                                   graph=self.graph, metrics=self.metrics, retry=self.retry)
+        job.generation = client.generation_job(job.job_id, self.store, job.title, job.count_tracks, job.track_filter,
+                                               job.weights)
+        return job.generation
+
+    def progress(self):
+        """
+        :return: {job_id: progress of BatchJob}
+        """
+        return {job.job_id: job.progress for job in list(self.jobs)}
+
+    def stats(self):
+        """
+        :return: count of jobs per state and FairGate stats
+        """
+        states = {}
+        for job in list(self.jobs):
+            states[job.state] = states.get(job.state, 0) + 1
+        return {'jobs': states, 'requests': self.gate.stats()}
+
+    def close(self):
+        """
+        Release pooled connections, when transport was created by this scheduler
+        """
+        if self.__own_transport:
+            self.transport.close()
+
+
+class AsyncBatchScheduler(BatchScheduler):
+    """
+    BatchScheduler of AsyncDeezerApi clients: jobs are coroutines of one event loop, run() returns a coroutine
+    """
+
+    @staticmethod
+    def _create_transport():
+        return AsyncDeezerTransport()
+
+    @staticmethod
+    def _create_flight():
+        return AsyncSingleFlight()
+
+    @staticmethod
+    def _api_class():
+        return AsyncDeezerApi
+
+    @staticmethod
+    def _transport_class():
+        return AsyncFairTransport
+
+    async def run(self):
+        await asyncio.gather(*[self._work() for _ in range(self.max_jobs)])
+        return list(self.jobs)
+
+    async def _work(self):
+        job = self._next_job()
+        while job is not None:
+            try:
+                job.tracks = await self._generation(job).run()
+                job.state = BatchJob.DONE
+            except Exception as e:
+                job.error = e
+                job.state = BatchJob.FAILED
+            job = self._next_job()
+
+    async def close(self):
+        if self._owns_transport:
+            await self.transport.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
@@ -0,0 +1,104 @@
+import codecs
+import json
+import re
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r'[ \t\n\r]*')
+_delimiters = frozenset(' \t\n\r,:]}')
+
+
+class JsonStream:
+    """
+    Incremental parser of a json object read by chunks. Elements of the array found by path of keys are yielded
+    one by one as soon as they are read, other values are collected into meta. Only one element is kept in memory.
+
+        stream = JsonStream(response.iter_content(65536), ('tracks', 'data'))
+        for track in stream:
+            ...
+        stream.meta  # {'id': .., 'title': .., 'tracks': {'checksum': ..}}
+    """
+
+    def __init__(self, chunks, path):
+        self.chunks = iter(chunks)
+        self.path = tuple(path)
+        self.meta = {}
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.position = 0
+        self.finished = False
+
+    def __iter__(self):
+        return self.__object(self.path, self.meta)
+
+    def __fill(self):
+        if self.finished:
+            return False
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.finished = True
+            text = self.decoder.decode(b'', final=True)
+        else:
+            text = self.decoder.decode(chunk)
+        self.buffer = self.buffer[self.position:] + text
+        self.position = 0
+        return True
+
+    def __peek(self):
+        while True:
+            self.position = _whitespace.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.__fill():
+                return ''
+
+    def __expect(self, char):
+        if self.__peek() != char:
+            raise ValueError('Expected {!r} in json stream, got {!r}'.format(char, self.__peek()))
+        self.position += 1
+
+    def __value(self):
+        self.__peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.position)
+                if self.finished or (end < len(self.buffer) and self.buffer[end] in _delimiters):
+                    self.position = end
+                    return value
+            except ValueError:
+                if self.finished:
+                    raise
+            self.__fill()
+
+    def __object(self, path, meta):
+        self.__expect('{')
+        while True:
+            char = self.__peek()
+            if char == '}':
+                self.position += 1
+                return
+            if char == ',':
+                self.position += 1
+                continue
+            key = self.__value()
+            self.__expect(':')
+            if path and key == path[0]:
+                if len(path) == 1 and self.__peek() == '[':
+                    yield from self.__array()
+                    continue
+                if len(path) > 1 and self.__peek() == '{':
+                    meta[key] = {}
+                    yield from self.__object(path[1:], meta[key])
+                    continue
+            meta[key] = self.__value()
+
+    def __array(self):
+        self.__expect('[')
+        while True:
+            char = self.__peek()
+            if char == ']':
+                self.position += 1
+                return
+            if char == ',':
+                self.position += 1
+                continue
+            yield self.__value()
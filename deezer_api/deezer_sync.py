@@ -0,0 +1,84 @@
+import json
+import sqlite3
+import threading
+
+
+class PlaylistStore:
+    """
+    Local copy of users playlists with their checksums. Only playlists with changed checksum are downloaded again.
+
+        store = PlaylistStore('playlists.db')
+        client = DeezerApi(token=<TOKEN>, access=Access.MANAGE, playlist_store=store)
+        client.get_my_playlist()
+    """
+
+    def __init__(self, path=':memory:'):
+        """
+        :param path: sqlite database file, in memory by default
+        """
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.fetched = 0
+        self.unchanged = 0
+        with self.connection:
+            self.connection.execute('CREATE TABLE IF NOT EXISTS playlists (user_id TEXT, playlist_id TEXT, '
+                                    'position INTEGER, checksum TEXT, value TEXT, '
+                                    'PRIMARY KEY (user_id, playlist_id))')
+
+    def checksums(self, user_id):
+        """
+        :return: dict playlist id -> checksum of stored playlists
+        """
+        with self.lock:
+            rows = self.connection.execute('SELECT playlist_id, checksum FROM playlists WHERE user_id = ?',
+                                           (str(user_id),)).fetchall()
+        return {playlist_id: checksum for playlist_id, checksum in rows}
+
+    def changed(self, user_id, summaries):
+        """
+        :param summaries: playlists of the user without tracks [{'id': .., 'checksum': ..}]
+        :return: ids of playlists missed in the store or stored with other checksum
+        """
+        checksums = self.checksums(user_id)
+        return [s['id'] for s in summaries if s.get('checksum', None) is None or
+                checksums.get(str(s['id']), None) != s['checksum']]
+
+    def update(self, user_id, summaries, playlists):
+        """
+        Store downloaded playlists and forget playlists missed in summaries
+        :param summaries: all playlists of the user in their order, without tracks
+        :param playlists: downloaded playlists data
+        """
+        user_id = str(user_id)
+        with self.lock, self.connection:
+            for data in playlists:
+                self.connection.execute('INSERT OR REPLACE INTO playlists VALUES (?, ?, 0, ?, ?)',
+                                        (user_id, str(data['id']), data.get('checksum', None), json.dumps(data)))
+            ids = [str(s['id']) for s in summaries]
+            self.connection.execute('DELETE FROM playlists WHERE user_id = ? AND playlist_id NOT IN ({})'
+                                    .format(', '.join('?' * len(ids))), [user_id] + ids)
+            self.connection.executemany('UPDATE playlists SET position = ? WHERE user_id = ? AND playlist_id = ?',
+                                        [(position, user_id, playlist_id)
+                                         for position, playlist_id in enumerate(ids)])
+        with self.lock:
+            self.fetched += len(playlists)
+            self.unchanged += len(summaries) - len(playlists)
+
+    def playlists(self, user_id):
+        """
+        :return: list of stored playlists data in order of the user playlists
+        """
+        with self.lock:
+            rows = self.connection.execute('SELECT value FROM playlists WHERE user_id = ? ORDER BY position',
+                                           (str(user_id),)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def stats(self):
+        """
+        :return: count of downloaded and not changed playlists
+        """
+        with self.lock:
+            return {'fetched': self.fetched, 'unchanged': self.unchanged}
+
+    def close(self):
+        self.connection.close()
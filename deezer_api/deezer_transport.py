@@ -0,0 +1,73 @@
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from deezer_api.deezer_limiter import DeezerRateLimiter
+
+
+class DeezerTransport:
+    """
+    Shared HTTP transport with a keep-alive connection pool per Deezer host
+    """
+
+    Hosts = ('api.deezer.com', 'www.deezer.com', 'connect.deezer.com')
+
+    def __init__(self, pool_size=10, pool_sizes=None, pool_block=False, connect_timeout=5, read_timeout=30,
+                 limiter=None, hosts=None):
+        """
+        :param pool_size: keep-alive connections kept per host
+        :param pool_sizes: optional per host override {host: pool size}
+        :param pool_block: block when pool is exhausted instead of opening extra connections
+        :param connect_timeout: seconds to wait for connection
+        :param read_timeout: seconds to wait for response data
+        :param limiter: rate limiter of all requests, DeezerRateLimiter.shared() by default
+        :param hosts: requests to these hosts are sent to other servers {host: base url}, e.g. a local stand-in
+        """
+        self.timeout = (connect_timeout, read_timeout)
+        self.hosts = hosts
+        self.limiter = DeezerRateLimiter.shared() if limiter is None else limiter
+        self.session = requests.Session()
+        pool_sizes = pool_sizes or {}
+        default_adapter = HTTPAdapter(pool_connections=len(self.Hosts), pool_maxsize=pool_size, pool_block=pool_block)
+        self.session.mount('https://', default_adapter)
+        self.session.mount('http://', default_adapter)
+        for host in self.Hosts:
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_sizes.get(host, pool_size),
+                                  pool_block=pool_block)
+            self.session.mount('https://{}/'.format(host), adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        self.limiter.acquire(url)
+        return self.session.request(method, self.rewrite(url, self.hosts), **kwargs)
+
+    @staticmethod
+    def rewrite(url, hosts):
+        """
+        :return: url with scheme and host replaced by base url of its host in hosts
+        """
+        if hosts:
+            parts = urlsplit(url)
+            base = hosts.get(parts.netloc, None)
+            if base is not None:
+                return base.rstrip('/') + url[len(parts.scheme) + len(parts.netloc) + 3:]
+        return url
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -27,6 +27,10 @@ setup(
     license="MIT",
     packages=["deezer_api"],
     install_requires=requirements(),
+    extras_require={
+        'async': ['aiohttp>=3.6.2'],
+        'numpy': ['numpy>=1.16'],
+    },
     python_requires=">=3.5",
     classifiers=[
         "Programming Language :: Python",
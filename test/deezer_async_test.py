@@ -0,0 +1,107 @@
+import asyncio
+import json
+import unittest
+
+from deezer_api import AsyncDeezerApi, Access, DeezerError, PlaylistStore
+from deezer_api.deezer_async import DeezerResponse
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class FakeAsyncTransport:
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.calls = []
+
+    async def get(self, url, **kwargs):
+        self.calls.append(url)
+        await asyncio.sleep(0)
+        return DeezerResponse(200, 'OK', {}, json.dumps(self.routes[url]).encode('utf-8'))
+
+    async def close(self):
+        pass
+
+
+class AsyncDeezerBasicAccess(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = FakeAsyncTransport({
+            'https://api.deezer.com/artist/27': {'id': 27, 'name': 'Daft Punk'},
+            'https://api.deezer.com/artist/13': {'id': 13, 'name': 'Eminem'},
+            'https://api.deezer.com/search/artist?q=eminem': {'data': [{'id': 13, 'name': 'Eminem'}]},
+        })
+        self.client = AsyncDeezerApi(transport=self.transport)
+
+    def test_concurrent_get_artist(self):
+        async def gather():
+            return await asyncio.gather(self.client.get_artist(27), self.client.get_artist(13))
+
+        artists = run(gather())
+        self.assertEqual(['Daft Punk', 'Eminem'], [artist.name for artist in artists])
+
+    def test_identical_requests_are_coalesced(self):
+        async def gather():
+            return await asyncio.gather(*[self.client.get_artist(27) for _ in range(5)])
+
+        artists = run(gather())
+        self.assertEqual({27}, {artist.id for artist in artists})
+        self.assertEqual(1, self.transport.calls.count('https://api.deezer.com/artist/27'))
+        self.assertEqual(4, self.client.flight.stats()['coalesced'])
+
+    def test_search_query(self):
+        searches = run(self.client.search_query('eminem', 'artist'))
+        self.assertEqual(13, searches[0].id)
+
+    def test_iter_search_and_playlist_tracks(self):
+        track = {'id': 1, 'artist': {'id': 27}}
+        self.transport.routes.update({
+            'https://api.deezer.com/search/track?q=daft': {'data': [track], 'next': 'next page'},
+            'https://api.deezer.com/playlist/5': {'id': 5, 'nb_tracks': 2, 'tracks': {'data': [track]}},
+            'https://api.deezer.com/playlist/5/tracks?index=1': {'data': [{'id': 2, 'artist': {'id': 13}}]},
+            'https://api.deezer.com/playlist/6': {'error': {'code': 800}},
+        })
+
+        async def collect(items):
+            ids = []
+            async for item in items:
+                ids.append(item.id)
+            return ids
+
+        self.assertEqual([1], run(collect(self.client.iter_search('daft', 'track'))))
+        self.assertEqual([1, 2], run(collect(self.client.iter_playlist_tracks(5))))
+        self.assertTrue(self.client.known_tracks.contains(13, 2))
+        with self.assertRaises(DeezerError):
+            run(collect(self.client.iter_playlist_tracks(6)))
+
+    def test_for_permission_denied_for_get_my_playlist(self):
+        with self.assertRaises(DeezerError):
+            AsyncDeezerApi(access=Access.BASIC, transport=self.transport).get_my_playlist()
+
+    def test_sync_my_playlist(self):
+        self.transport.routes.update({
+            'https://api.deezer.com/user/me?access_token=token': {'id': 1},
+            'https://api.deezer.com/user/1/playlists?access_token=token&limit=100': {
+                'data': [{'id': 2, 'checksum': 'b'}, {'id': 1, 'checksum': 'a'}]},
+            'https://api.deezer.com/playlist/1?access_token=token': {'id': 1, 'checksum': 'a',
+                                                                     'tracks': {'data': []}},
+            'https://api.deezer.com/playlist/2?access_token=token': {'id': 2, 'checksum': 'b', 'public': False,
+                                                                     'tracks': {'data': []}},
+        })
+        store = PlaylistStore()
+        for _ in range(2):
+            client = AsyncDeezerApi(token='token', access=Access.MANAGE, transport=self.transport,
+                                    playlist_store=store)
+            self.assertEqual([2, 1], [p.id for p in run(client.get_my_playlist())])
+        self.assertEqual(1, self.transport.calls.count('https://api.deezer.com/playlist/1?access_token=token'))
+        self.assertEqual({'fetched': 2, 'unchanged': 2}, store.stats())
+
+
+if __name__ == '__main__':
+    unittest.main()
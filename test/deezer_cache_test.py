@@ -0,0 +1,59 @@
+import os
+import tempfile
+import time
+import unittest
+
+from deezer_api.deezer_cache import MemoryCache, SqliteCache
+
+
+class DeezerCache(unittest.TestCase):
+
+    def test_hit_and_miss(self):
+        cache = MemoryCache()
+        self.assertIsNone(cache.get('artist', 'artist:27'))
+        cache.set('artist', 'artist:27', {'id': 27})
+        self.assertEqual({'id': 27}, cache.get('artist', 'artist:27'))
+        stats = cache.stats()
+        self.assertEqual((1, 1), (stats['hits'], stats['misses']))
+
+    def test_ttl_per_entity(self):
+        cache = MemoryCache(ttl={'artist': 0.05, 'track': 0})
+        cache.set('artist', 'artist:27', {'id': 27})
+        cache.set('track', 'track:1', {'id': 1})
+        self.assertIsNone(cache.get('track', 'track:1'))
+        time.sleep(0.1)
+        self.assertIsNone(cache.get('artist', 'artist:27'))
+
+    def test_lru_eviction_by_entries(self):
+        cache = MemoryCache(max_entries=2)
+        cache.set('artist', 'artist:1', {'id': 1})
+        cache.set('artist', 'artist:2', {'id': 2})
+        cache.get('artist', 'artist:1')
+        cache.set('artist', 'artist:3', {'id': 3})
+        self.assertIsNone(cache.get('artist', 'artist:2'))
+        self.assertIsNotNone(cache.get('artist', 'artist:1'))
+        self.assertEqual(1, cache.stats()['evictions'])
+
+    def test_lru_eviction_by_bytes(self):
+        cache = MemoryCache(max_bytes=40)
+        cache.set('artist', 'artist:1', {'name': 'a' * 10})
+        cache.set('artist', 'artist:2', {'name': 'b' * 10})
+        self.assertEqual(1, cache.stats()['entries'])
+        self.assertLessEqual(cache.stats()['bytes'], 40)
+
+    def test_sqlite_cache_survives_restart(self):
+        path = os.path.join(tempfile.mkdtemp(), 'cache.db')
+        cache = SqliteCache(path, max_entries=2)
+        for i in range(3):
+            cache.set('artist', 'artist:{}'.format(i), {'id': i})
+        cache.close()
+
+        cache = SqliteCache(path)
+        self.assertIsNone(cache.get('artist', 'artist:0'))
+        self.assertEqual({'id': 2}, cache.get('artist', 'artist:2'))
+        self.assertEqual(2, cache.stats()['entries'])
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
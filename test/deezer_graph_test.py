@@ -0,0 +1,96 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from deezer_api import ArtistGraph, DeezerError
+
+RELATED = {1: [2, 3], 2: [1, 4], 3: [5], 4: [6], 5: [], 6: [1], 7: [1]}
+
+
+class DeezerGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.loaded = []
+
+    def load_related(self, artist_id):
+        self.loaded.append(artist_id)
+        if artist_id not in RELATED:
+            raise DeezerError('not found')
+        return [str(i) for i in RELATED[artist_id]]
+
+    def test_expand_by_depth(self):
+        graph = ArtistGraph(depth=2)
+        self.assertEqual({1: 0, 2: 1, 3: 1, 4: 2, 5: 2}, graph.expand(['1'], self.load_related))
+        self.assertEqual([1, 2, 3], sorted(self.loaded))
+        self.assertEqual({1: 0, 2: 1, 3: 1, 4: 2, 5: 2, 6: 3}, graph.expand([1], self.load_related, depth=3))
+        self.assertEqual([1, 2, 3, 4, 5], sorted(self.loaded))
+        self.assertEqual([2, 3], graph.related(1))
+
+    def test_expand_is_bounded(self):
+        graph = ArtistGraph(depth=5, max_artists=4)
+        self.assertEqual(4, len(graph.expand([7, 1], self.load_related)))
+        self.assertEqual({1: 0, 8: 0}, graph.expand([1, 8], self.load_related, depth=0))
+        graph.expand([8], self.load_related)
+        self.assertNotIn(8, graph)
+
+    def test_expand_async(self):
+        async def load_related(artist_id):
+            await asyncio.sleep(0)
+            return self.load_related(artist_id)
+
+        graph = ArtistGraph(depth=2)
+        loop = asyncio.new_event_loop()
+        distances = loop.run_until_complete(graph.expand_async([1], load_related))
+        loop.close()
+        self.assertEqual({1: 0, 2: 1, 3: 1, 4: 2, 5: 2}, distances)
+
+    def test_personalized_rank(self):
+        graph = ArtistGraph()
+        for artist_id, related in RELATED.items():
+            graph.add(artist_id, related)
+        ranks = graph.rank({1: 3, 5: 1})
+        self.assertAlmostEqual(1.0, sum(ranks.values()))
+        self.assertEqual(1, max(ranks, key=ranks.get))
+        self.assertEqual(0.0, ranks[7])
+        self.assertGreater(ranks[2], ranks[4])
+        self.assertEqual({1, 2, 3}, set(graph.rank({1: 1}, [1, 2, 3])))
+
+    def test_save_and_load(self):
+        path = os.path.join(tempfile.mkdtemp(), 'artists.graph')
+        graph = ArtistGraph(path)
+        for artist_id, related in RELATED.items():
+            graph.add(artist_id, related)
+        graph.save()
+        loaded = ArtistGraph(path)
+        self.assertEqual(len(RELATED), loaded.loaded)
+        self.assertEqual(RELATED, {k: loaded.related(k) for k in RELATED})
+        self.assertEqual(graph.edges(), loaded.edges())
+        with open(path, 'r+b') as file:
+            file.truncate(30)
+        with self.assertRaises(DeezerError):
+            ArtistGraph(path)
+
+    def test_expand_saves_graph_with_path(self):
+        path = os.path.join(tempfile.mkdtemp(), 'artists.graph')
+        ArtistGraph(path, depth=2).expand([1], self.load_related)
+        self.assertEqual([1, 2, 3], sorted(self.loaded))
+
+        del self.loaded[:]
+        graph = ArtistGraph(path, depth=2)
+        os.remove(path)
+        self.assertEqual({1: 0, 2: 1, 3: 1, 4: 2, 5: 2}, graph.expand([1], self.load_related))
+        self.assertEqual([], self.loaded)
+        self.assertFalse(os.path.exists(path))
+
+        async def load_related(artist_id):
+            return self.load_related(artist_id)
+
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(graph.expand_async([4], load_related, depth=1))
+        loop.close()
+        self.assertEqual([6], ArtistGraph(path).related(4))
+
+
+if __name__ == '__main__':
+    unittest.main()
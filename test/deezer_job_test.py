@@ -0,0 +1,170 @@
+import asyncio
+import json
+import unittest
+
+from deezer_api import DeezerApi, Access, AsyncDeezerApi, DeezerError, DeezerBatchError, JobStore, RetryPolicy
+from deezer_api.deezer_async import DeezerResponse
+from deezer_api.deezer_job import GenerationJob
+
+
+def app_state_page(state):
+    return '<script>window.__DZR_APP_STATE__ = {}</script>'.format(json.dumps(state)).encode('utf-8')
+
+
+def track(track_id, artist_id):
+    return {'id': track_id, 'title': 'track {}'.format(track_id), 'rank': track_id, 'duration': 200,
+            'artist': {'id': artist_id, 'name': 'artist {}'.format(artist_id)},
+            'album': {'id': track_id, 'cover_big': 'cover {}'.format(track_id)}}
+
+
+class DeezerServer:
+    """
+    Fake Deezer keeping created playlists and their tracks, failures are injected by url part.
+    Created playlists are private: they are read only with the access token
+    """
+    Summaries = 'https://api.deezer.com/user/1/playlists?access_token=token&limit=100'
+
+    def __init__(self):
+        self.calls = []
+        self.playlists = {11: [track(1, 27), track(2, 27), track(3, 13)]}
+        self.titles = {11: 'Favourites'}
+        self.routes = {
+            'https://api.deezer.com/user/me?access_token=token': {'id': 1, 'name': 'user'},
+            'https://www.deezer.com/ru/profile/1/playlists': app_state_page(
+                {'TAB': {'playlists': {'data': [{'PLAYLIST_ID': 11}]}}}),
+            'https://www.deezer.com/ru/artist/27/related_artist': app_state_page(
+                {'RELATED_ARTISTS': {'data': [{'ART_ID': 13, 'ART_NAME': 'artist 13'}]}}),
+            'https://www.deezer.com/ru/artist/13/related_artist': app_state_page(
+                {'RELATED_ARTISTS': {'data': [{'ART_ID': 27, 'ART_NAME': 'artist 27'}]}}),
+            'https://api.deezer.com/artist/27/top?limit=4': {'data': [track(i, 27) for i in (1, 270, 271, 272)]},
+            'https://api.deezer.com/artist/13/top?limit=4': {'data': [track(i, 13) for i in (3, 130, 131, 132)]},
+        }
+        self.fail = {}
+        self.inserted = []
+
+    def get(self, url, **kwargs):
+        self.calls.append(url)
+        payload = self.answer(url)
+        for part, error in list(self.fail.items()):
+            if part in url:
+                raise error
+        content = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+        return DeezerResponse(200, 'OK', {}, content)
+
+    def answer(self, url):
+        if url in self.routes:
+            return self.routes[url]
+        if url == self.Summaries:
+            return {'data': [{'id': i, 'title': title} for i, title in self.titles.items()]}
+        if '/user/1/playlists?access_token=token&title=' in url:
+            playlist_id = max(self.playlists) + 1
+            self.playlists[playlist_id] = []
+            self.titles[playlist_id] = url.split('&title=')[1]
+            return {'id': playlist_id}
+        if '&songs=' in url:
+            playlist_id = int(url.split('/playlist/')[1].split('/')[0])
+            songs = [int(i) for i in url.split('&songs=')[1].split(',')]
+            self.inserted.extend(songs)
+            self.playlists[playlist_id].extend(track(i, 0) for i in songs)
+            return True
+        playlist_id = int(url.split('/playlist/')[1].split('?')[0])
+        if playlist_id != 11 and 'access_token=token' not in url:
+            return {'error': {'type': 'PermissionException', 'message': 'Private playlist', 'code': 200}}
+        return {'id': playlist_id, 'title': self.titles[playlist_id], 'tracks': {'data': self.playlists[playlist_id]}}
+
+    post = get
+    delete = get
+
+    def close(self):
+        pass
+
+
+class AsyncDeezerServer(DeezerServer):
+
+    async def get(self, url, **kwargs):
+        return super().get(url, **kwargs)
+
+    post = get
+    delete = get
+
+
+class DeezerGenerationJob(unittest.TestCase):
+
+    def setUp(self):
+        self.server = DeezerServer()
+        self.store = JobStore()
+
+    def job(self, job_id='job'):
+        client = DeezerApi(token='token', access=Access.MANAGE, transport=self.server,
+                           retry=RetryPolicy(attempts=1))
+        return client.generation_job(job_id, self.store, title='Mix', count_tracks=4)
+
+    def test_job_runs_all_stages(self):
+        job = self.job()
+        tracks = job.run()
+        self.assertEqual(list(GenerationJob.Stages), job.completed)
+        self.assertTrue(job.done)
+        self.assertEqual(4, len(tracks))
+        self.assertFalse({1, 3} & {t.id for t in tracks})
+        self.assertEqual([t.id for t in tracks], self.server.inserted)
+        self.assertEqual('Mix', self.server.titles[12])
+        self.assertEqual(int, type(tracks[0].artist.id))
+
+        job = self.job()
+        del self.server.calls[:]
+        self.assertEqual([t.id for t in tracks], [t.id for t in job.run()])
+        self.assertEqual([], self.server.calls)
+
+    def test_interrupted_job_resumes_from_last_stage(self):
+        expected = [t.id for t in self.job('fresh').run()]
+        self.server = DeezerServer()
+        self.server.fail['/artist/13/top'] = KeyError('connection lost')
+        with self.assertRaises(KeyError):
+            self.job().run()
+        self.assertEqual(['seeds', 'artists'], self.job().completed)
+
+        del self.server.fail['/artist/13/top']
+        del self.server.calls[:]
+        self.assertEqual(expected, [t.id for t in self.job().run()])
+        self.assertFalse([url for url in self.server.calls if 'related_artist' in url or 'profile' in url])
+        self.assertEqual(['https://api.deezer.com/artist/13/top?limit=4'],
+                         [url for url in self.server.calls if '/top' in url])
+
+    def test_playlist_is_created_once(self):
+        self.server.fail['&title='] = RuntimeError('connection lost')
+        with self.assertRaises(DeezerError):
+            self.job().run()
+        del self.server.fail['&title=']
+        del self.server.calls[:]
+        self.job().run()
+        self.assertEqual(['Favourites', 'Mix'], sorted(self.server.titles.values()))
+        self.assertEqual(1, self.server.calls.count(DeezerServer.Summaries))
+
+    def test_tracks_are_inserted_once(self):
+        self.server.fail['&songs='] = RuntimeError('connection lost')
+        with self.assertRaises(DeezerBatchError):
+            self.job().run()
+        self.assertEqual(4, len(self.server.inserted))
+        del self.server.fail['&songs=']
+        del self.server.calls[:]
+        tracks = self.job().run()
+        self.assertEqual(sorted(t.id for t in tracks), sorted(self.server.inserted))
+        self.assertFalse([url for url in self.server.calls if '&songs=' in url])
+        self.assertIn('https://api.deezer.com/playlist/12?access_token=token', self.server.calls)
+
+    def test_async_job(self):
+        expected = [t.id for t in self.job('sync').run()]
+        server = AsyncDeezerServer()
+
+        async def run():
+            client = AsyncDeezerApi(token='token', access=Access.MANAGE, transport=server)
+            return await client.generation_job('async', self.store, title='Mix', count_tracks=4).run()
+
+        loop = asyncio.new_event_loop()
+        self.assertEqual(expected, [t.id for t in loop.run_until_complete(run())])
+        loop.close()
+        self.assertEqual(expected, server.inserted)
+
+
+if __name__ == '__main__':
+    unittest.main()
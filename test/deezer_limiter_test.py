@@ -0,0 +1,46 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from deezer_api.deezer_limiter import TokenBucket, DeezerRateLimiter
+
+
+class DeezerLimiter(unittest.TestCase):
+
+    def test_burst_then_wait(self):
+        bucket = TokenBucket(10, 0.5)
+        start = time.monotonic()
+        for _ in range(15):
+            bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+        self.assertEqual(15, bucket.stats()['acquired'])
+        self.assertEqual(5, bucket.stats()['waited'])
+
+    def test_threads_and_coroutines_share_bucket(self):
+        bucket = TokenBucket(5, 0.25)
+        threads = [threading.Thread(target=bucket.acquire) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+
+        async def acquire():
+            await asyncio.gather(*[bucket.acquire_async() for _ in range(5)])
+
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(acquire())
+        loop.close()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(10, bucket.stats()['acquired'])
+        self.assertEqual(5, bucket.stats()['waited'])
+
+    def test_limit_per_host(self):
+        limiter = DeezerRateLimiter(limits={'www.deezer.com': (1, 60)}, default=None)
+        limiter.acquire('https://api.deezer.com/artist/27')
+        limiter.acquire('https://www.deezer.com/ru/artist/27/related_artist')
+        self.assertEqual(['www.deezer.com'], list(limiter.stats()))
+        self.assertEqual(0, limiter.stats()['www.deezer.com']['waited'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,188 @@
+import json
+import threading
+import time
+import unittest
+
+from deezer_api import DeezerApi, Access, DeezerBatchError, ArtistGraph, PlaylistStore
+from deezer_api.deezer_async import DeezerResponse
+
+
+class FakeTransport:
+
+    def __init__(self, routes, delay=0.0):
+        self.routes = routes
+        self.delay = delay
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        with self.lock:
+            self.calls.append(url)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        payload = self.routes[url]
+        content = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+        return DeezerResponse(200, 'OK', {}, content)
+
+    post = get
+    delete = get
+
+    def close(self):
+        pass
+
+
+class BatchTransport(FakeTransport):
+
+    def __init__(self, routes, failed_id):
+        super().__init__(routes)
+        self.failed_id = failed_id
+
+    def get(self, url, **kwargs):
+        if '&songs=' not in url:
+            return super().get(url, **kwargs)
+        with self.lock:
+            self.calls.append(url)
+        songs = url.split('&songs=')[1].split(',')
+        error = {'error': {'type': 'DataException', 'message': 'no data', 'code': 800}}
+        return DeezerResponse(200, 'OK', {}, json.dumps(error if self.failed_id in songs else True).encode('utf-8'))
+
+    post = get
+    delete = get
+
+
+def app_state_page(state):
+    return '<script>window.__DZR_APP_STATE__ = {}</script>'.format(json.dumps(state)).encode('utf-8')
+
+
+def profile_page(playlist_ids):
+    return app_state_page({'TAB': {'playlists': {'data': [{'PLAYLIST_ID': i} for i in playlist_ids]}}})
+
+
+class DeezerManageAccess(unittest.TestCase):
+
+    def setUp(self):
+        self.playlist_ids = [11, 12, 13, 14, 15]
+        routes = {
+            'https://api.deezer.com/user/me?access_token=token': {'id': 1, 'name': 'user'},
+            'https://www.deezer.com/ru/profile/1/playlists': profile_page(self.playlist_ids),
+            'https://www.deezer.com/ru/artist/27/related_artist': app_state_page(
+                {'RELATED_ARTISTS': {'data': [{'ART_ID': 13, 'ART_NAME': 'Eminem'}]}}),
+        }
+        for playlist_id in self.playlist_ids:
+            routes['https://api.deezer.com/playlist/{}'.format(playlist_id)] = {
+                'id': playlist_id, 'title': 'playlist {}'.format(playlist_id), 'tracks': {'data': []}}
+        self.transport = FakeTransport(routes, delay=0.05)
+        self.client = DeezerApi(token='token', access=Access.MANAGE, transport=self.transport)
+
+    def test_get_my_playlist_keeps_order(self):
+        playlists = self.client.get_my_playlist()
+        self.assertEqual(self.playlist_ids, [p.id for p in playlists])
+
+    def test_get_my_playlist_fetches_concurrently(self):
+        self.transport.delay = 0.3
+        self.client.get_my_playlist()
+        self.assertGreater(self.transport.peak, 1)
+
+    def test_related_artists_are_cached(self):
+        for _ in range(3):
+            self.assertEqual(13, self.client.get_related_artists(27)[0].id)
+        self.assertEqual(1, self.transport.calls.count('https://www.deezer.com/ru/artist/27/related_artist'))
+
+    def test_concurrent_related_artists_are_coalesced(self):
+        self.transport.delay = 0.2
+        threads = [threading.Thread(target=self.client.get_related_artists, args=(27,)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(1, self.transport.calls.count('https://www.deezer.com/ru/artist/27/related_artist'))
+        self.assertEqual(4, self.client.flight.stats()['coalesced'])
+
+    def test_related_artists_graph_is_shared(self):
+        routes = self.transport.routes
+        routes['https://api.deezer.com/playlist/11'] = {
+            'id': 11, 'tracks': {'data': [{'id': 1, 'artist': {'id': 27}}, {'id': 2, 'artist': {'id': 27}},
+                                          {'id': 3, 'artist': {'id': 13}}]}}
+        routes['https://www.deezer.com/ru/artist/13/related_artist'] = app_state_page(
+            {'RELATED_ARTISTS': {'data': [{'ART_ID': '27', 'ART_NAME': 'Daft Punk'}]}})
+        graph = ArtistGraph()
+        for _ in range(2):
+            client = DeezerApi(token='token', access=Access.MANAGE, transport=self.transport, graph=graph)
+            artists = client.get_favourites_artists_by_playlist_id([client.get_playlist(11)], 10)
+            self.assertEqual([27, 13], [int(artist.id) for artist in artists])
+        self.assertEqual(1, self.transport.calls.count('https://www.deezer.com/ru/artist/13/related_artist'))
+        self.assertEqual([27], graph.related(13))
+
+    def test_sync_downloads_changed_playlists(self):
+        routes = self.transport.routes
+        summaries_url = 'https://api.deezer.com/user/1/playlists?access_token=token&limit=100'
+        for playlist_id in self.playlist_ids:
+            routes['https://api.deezer.com/playlist/{}?access_token=token'.format(playlist_id)] = dict(
+                routes['https://api.deezer.com/playlist/{}'.format(playlist_id)], checksum='a')
+        routes[summaries_url] = {'data': [{'id': i, 'checksum': 'a'} for i in self.playlist_ids[:3]],
+                                 'next': 'https://api.deezer.com/user/1/playlists?index=3'}
+        routes['https://api.deezer.com/user/1/playlists?index=3'] = {
+            'data': [{'id': i, 'checksum': 'a'} for i in self.playlist_ids[3:]]}
+        store = PlaylistStore()
+        client = DeezerApi(token='token', access=Access.MANAGE, transport=self.transport, playlist_store=store)
+        self.assertEqual(self.playlist_ids, [p.id for p in client.get_my_playlist()])
+
+        routes['https://api.deezer.com/playlist/12?access_token=token']['checksum'] = 'b'
+        routes['https://api.deezer.com/playlist/12?access_token=token']['title'] = 'changed'
+        routes[summaries_url] = {'data': [{'id': 12, 'checksum': 'b'}, {'id': 11, 'checksum': 'a'},
+                                          {'id': 15, 'checksum': 'a'}]}
+        del self.transport.calls[:]
+        client = DeezerApi(token='token', access=Access.MANAGE, transport=self.transport, playlist_store=store)
+        playlists = client.get_my_playlist()
+        self.assertEqual([12, 11, 15], [p.id for p in playlists])
+        self.assertEqual('changed', playlists[0].title)
+        self.assertEqual(['https://api.deezer.com/playlist/12?access_token=token'],
+                         [url for url in self.transport.calls if url.startswith('https://api.deezer.com/playlist/')])
+        self.assertEqual({'fetched': 6, 'unchanged': 2}, store.stats())
+
+    def test_sync_downloads_private_playlists(self):
+        routes = self.transport.routes
+        routes['https://api.deezer.com/user/1/playlists?access_token=token&limit=100'] = {
+            'data': [{'id': 11, 'checksum': 'a'}, {'id': 16, 'checksum': 'p'}]}
+        routes['https://api.deezer.com/playlist/16'] = {
+            'error': {'type': 'OAuthException', 'message': 'Invalid OAuth access token.', 'code': 300}}
+        routes['https://api.deezer.com/playlist/16?access_token=token'] = {
+            'id': 16, 'title': 'private', 'public': False, 'checksum': 'p', 'tracks': {'data': []}}
+        store = PlaylistStore()
+        client = DeezerApi(token='token', access=Access.MANAGE, transport=self.transport, playlist_store=store)
+        with self.assertRaises(KeyError):
+            client.get_my_playlist()
+        self.assertEqual({'fetched': 0, 'unchanged': 0}, store.stats())
+
+        routes['https://api.deezer.com/playlist/11?access_token=token'] = dict(
+            routes['https://api.deezer.com/playlist/11'], checksum='a')
+        playlists = client.get_my_playlist()
+        self.assertEqual([11, 16], [p.id for p in playlists])
+        self.assertEqual('private', playlists[1].title)
+        self.assertEqual({'fetched': 2, 'unchanged': 0}, store.stats())
+        self.assertIsNone(client.cache.get('playlist', 'playlist:16'))
+
+    def test_add_tracks_by_chunks(self):
+        track_ids = list(range(1000000, 1000600))
+        transport = BatchTransport(self.transport.routes, '1000599')
+        client = DeezerApi(token='token', access=Access.DELETE, transport=transport)
+        with self.assertRaises(DeezerBatchError) as error:
+            client.add_tracks_to_playlist(11, track_ids)
+        chunks = [url.split('&songs=')[1].split(',') for url in transport.calls if '&songs=' in url]
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(len(url) <= 2000 for url in transport.calls))
+        self.assertEqual(sorted(map(str, track_ids)), sorted(i for chunk in chunks for i in chunk))
+        self.assertEqual(1, len(error.exception.failed))
+        self.assertIn(1000599, error.exception.failed[0][0])
+        self.assertEqual('no data', error.exception.failed[0][1])
+        client.delete_tracks(11, track_ids[:10])
+        self.assertIn('songs=' + ','.join(map(str, track_ids[:10])), transport.calls[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from deezer_api.deezer_media import MediaCache
+
+
+class DeezerMediaCache(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.media = MediaCache(self.folder, max_bytes=250)
+
+    def tearDown(self):
+        self.media.close()
+
+    def test_put_and_get(self):
+        path = self.media.put('preview/1.mp3', [b'a' * 50, b'b' * 50])
+        self.assertEqual(path, self.media.get('preview/1.mp3'))
+        with open(path, 'rb') as file:
+            self.assertEqual(b'a' * 50 + b'b' * 50, file.read())
+        self.assertIsNone(self.media.get('preview/2.mp3'))
+        self.assertEqual(os.listdir(os.path.dirname(path)), ['1.mp3'])
+        self.media.close()
+        self.media = MediaCache(self.folder)
+        self.assertEqual(path, self.media.get('preview/1.mp3'))
+
+    def test_folder_is_created_on_first_write(self):
+        folder = os.path.join(self.folder, 'lazy')
+        media = MediaCache(folder)
+        self.assertIsNone(media.get('preview/1.mp3'))
+        self.assertEqual(0, media.stats()['entries'])
+        self.assertFalse(os.path.exists(folder))
+        media.put('preview/1.mp3', [b'a'])
+        self.assertEqual(['index.db', 'preview'], sorted(os.listdir(folder)))
+        media.close()
+
+    def test_default_folder_is_user_cache(self):
+        cache = os.environ.get('XDG_CACHE_HOME')
+        os.environ['XDG_CACHE_HOME'] = self.folder
+        try:
+            media = MediaCache()
+        finally:
+            if cache is None:
+                del os.environ['XDG_CACHE_HOME']
+            else:
+                os.environ['XDG_CACHE_HOME'] = cache
+        self.assertEqual(os.path.join(self.folder, 'deezer-playlist-generator', 'media'), media.folder)
+        self.assertEqual([], os.listdir(self.folder))
+
+    def test_least_recently_used_are_evicted(self):
+        for i in range(3):
+            self.media.put('preview/{}.mp3'.format(i), [b'x' * 100])
+            time.sleep(0.01)
+            self.media.get('preview/0.mp3')
+        self.assertIsNotNone(self.media.get('preview/0.mp3'))
+        self.assertIsNone(self.media.get('preview/1.mp3'))
+        self.assertFalse(os.path.exists(self.media.path('preview/1.mp3')))
+        self.assertEqual({'entries': 2, 'bytes': 200, 'evictions': 1},
+                         {k: v for k, v in self.media.stats().items() if k in ('entries', 'bytes', 'evictions')})
+
+    def test_damaged_files_are_missed(self):
+        self.media.verify = True
+        for key in ('preview/1.mp3', 'preview/2.mp3'):
+            self.media.put(key, [b'a' * 100])
+        with open(self.media.path('preview/1.mp3'), 'ab') as file:
+            file.write(b'tail')
+        with open(self.media.path('preview/2.mp3'), 'r+b') as file:
+            file.write(b'b')
+        self.assertIsNone(self.media.get('preview/1.mp3'))
+        self.assertIsNone(self.media.get('preview/2.mp3'))
+        self.assertEqual(2, self.media.stats()['corrupted'])
+
+    def test_concurrent_fetch_writes_once(self):
+        loads = []
+
+        def load():
+            loads.append(1)
+            time.sleep(0.1)
+            return [b'cover']
+
+        key = MediaCache.cover_key('https://e-cdns-images.dzcdn.net/images/cover/1/250x250.jpg')
+        threads = [threading.Thread(target=self.media.fetch, args=(key, load)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(1, len(loads))
+        self.assertIsNotNone(self.media.get(key))
+
+
+if __name__ == '__main__':
+    unittest.main()
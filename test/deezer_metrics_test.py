@@ -0,0 +1,92 @@
+import asyncio
+import json
+import unittest
+
+from deezer_api import DeezerApi, DeezerMetrics
+from deezer_api.deezer_async import AsyncDeezerApi, DeezerResponse
+from deezer_api.deezer_cache import MemoryCache
+from deezer_api.deezer_metrics import DeezerEvent, MeteredTransport
+from deezer_api.deezer_objects import DeezerUrl
+
+
+class FakeTransport:
+
+    def __init__(self, routes):
+        self.routes = routes
+
+    def get(self, url, **kwargs):
+        if url not in self.routes:
+            raise KeyError(url)
+        return DeezerResponse(200, 'OK', {}, json.dumps(self.routes[url]).encode('utf-8'))
+
+    def close(self):
+        pass
+
+
+class AsyncFakeTransport(FakeTransport):
+
+    async def get(self, url, **kwargs):
+        return super().get(url, **kwargs)
+
+
+class DeezerMetricsTest(unittest.TestCase):
+
+    def test_endpoint_templates(self):
+        self.assertEqual('api.deezer.com/artist/{}', DeezerMetrics.endpoint(DeezerUrl.ArtistUrl.format(27)))
+        self.assertEqual('api.deezer.com/artist/{}/top', DeezerMetrics.endpoint(DeezerUrl.TopArtist.format(27, 10)))
+        self.assertEqual('api.deezer.com/user/me', DeezerMetrics.endpoint(DeezerUrl.RestrictedUserUrl.format('t')))
+        self.assertEqual('api.deezer.com/search{}', DeezerMetrics.endpoint(DeezerUrl.SearchUrl.format('', 'a')))
+        self.assertEqual('api.deezer.com/search{}', DeezerMetrics.endpoint(DeezerUrl.SearchUrl.format('/track', 'a')))
+        self.assertEqual('www.deezer.com/ru/artist/{}/related_artist',
+                         DeezerMetrics.endpoint(DeezerUrl.RelatedArtistUrl.format(27)))
+        self.assertEqual('cdns-preview-d.dzcdn.net',
+                         DeezerMetrics.endpoint('https://cdns-preview-d.dzcdn.net/stream/c-1-3.mp3'))
+
+    def test_requests_cache_and_hooks(self):
+        events = []
+        metrics = DeezerMetrics(hooks=[lambda event, data: events.append(event)])
+        transport = FakeTransport({DeezerUrl.ArtistUrl.format(27): {'id': 27, 'name': 'Daft Punk'}})
+        client = DeezerApi(transport=transport, cache=MemoryCache(), metrics=metrics)
+        client.get_artist(27)
+        client.get_artist(27)
+        with self.assertRaises(Exception):
+            client.get_track(3135556)
+
+        data = metrics.as_dict()
+        artist = data['requests']['api.deezer.com/artist/{}']
+        self.assertEqual(1, artist['count'])
+        self.assertEqual({'200': 1}, artist['statuses'])
+        self.assertEqual(1, artist['seconds']['count'])
+        self.assertEqual(1, data['requests']['api.deezer.com/track/{}']['errors'])
+        self.assertEqual({'hit': 1, 'miss': 1}, data['cache']['artist'])
+        self.assertEqual(1, data['parse']['artist']['count'])
+        self.assertEqual([DeezerEvent.CACHE_MISS, DeezerEvent.REQUEST_START, DeezerEvent.REQUEST_END,
+                          DeezerEvent.PARSE, DeezerEvent.CACHE_HIT], events[:5])
+
+        text = metrics.prometheus()
+        self.assertIn('# TYPE deezer_request_seconds histogram', text)
+        self.assertIn('deezer_requests_total{endpoint="api.deezer.com/artist/{}",method="GET",status="200"} 1', text)
+        self.assertIn('deezer_request_seconds_bucket{endpoint="api.deezer.com/artist/{}",le="+Inf"} 1', text)
+        self.assertIn('deezer_cache_total{entity="artist",result="hit"} 1', text)
+
+    def test_client_without_metrics_is_not_instrumented(self):
+        transport = FakeTransport({})
+        client = DeezerApi(transport=transport)
+        self.assertNotIsInstance(client._DeezerApi__client.transport, MeteredTransport)
+
+    def test_async_requests(self):
+        metrics = DeezerMetrics()
+        transport = AsyncFakeTransport({DeezerUrl.ArtistUrl.format(27): {'id': 27, 'name': 'Daft Punk'}})
+
+        async def load():
+            client = AsyncDeezerApi(transport=transport, metrics=metrics)
+            return await client.get_artist(27)
+
+        loop = asyncio.new_event_loop()
+        self.assertEqual(27, loop.run_until_complete(load()).id)
+        loop.close()
+        self.assertEqual(1, metrics.as_dict()['requests']['api.deezer.com/artist/{}']['count'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import json
+import unittest
+
+from deezer_api import KnownTracks, PlayList, Track, Artist, Album, User, Search, DeezerError
+from deezer_api.deezer_objects import DeezerParser
+
+
+def track_data(track_id, artist_id):
+    return {'id': track_id, 'title': 'track {}'.format(track_id), 'rank': track_id,
+            'artist': {'id': artist_id, 'name': 'artist {}'.format(artist_id)},
+            'album': {'id': track_id, 'title': 'album {}'.format(track_id)}}
+
+
+class DeezerObjects(unittest.TestCase):
+
+    def test_playlist_registers_known_tracks(self):
+        known_tracks = KnownTracks()
+        PlayList({'id': 1, 'tracks': {'data': [track_data(1, 27), track_data(2, 27), track_data(3, 13)]}},
+                 known_tracks)
+        self.assertTrue(known_tracks.contains(27, 2))
+        self.assertTrue(known_tracks.contains('27', 1))
+        self.assertFalse(known_tracks.contains(13, 1))
+        self.assertEqual({'27': [1, 2], '13': [3]}, known_tracks.export())
+
+    def test_objects_have_no_instance_dict(self):
+        track = Track(track_data(1, 27))
+        objects = [track, track.artist, track.album, PlayList({}), User({}), Search(track_data(1, 27)), Artist({})]
+        for deezer_object in objects:
+            self.assertFalse(hasattr(deezer_object, '__dict__'), type(deezer_object).__name__)
+        self.assertEqual('artist 27', track.artist.name)
+        self.assertIsInstance(track.album, Album)
+
+    def test_nested_objects_are_built_on_first_access(self):
+        track = Track(track_data(1, 27))
+        self.assertFalse(hasattr(track, '_artist'))
+        artist = track.artist
+        self.assertIs(artist, track.artist)
+        self.assertIsNone(track._artist_data)
+        self.assertEqual([], track.contributors)
+        track.album = Album({'id': 5})
+        self.assertEqual(5, track.album.id)
+
+    def test_known_tracks_are_bounded(self):
+        known_tracks = KnownTracks(max_artists=2)
+        known_tracks.add(1, 10)
+        known_tracks.add(2, 20)
+        known_tracks.add(1, 11)
+        known_tracks.add(3, 30)
+        self.assertEqual(2, len(known_tracks))
+        self.assertFalse(known_tracks.contains(2, 20))
+        self.assertEqual(frozenset([10, 11]), known_tracks.tracks(1))
+        known_tracks.clear()
+        self.assertEqual(0, len(known_tracks))
+
+    def test_parse_app_state(self):
+        state = {'DATA': {'data': 'x', 'TAB': 1},
+                 'TAB': {'loved': {'data': [1]}, 'playlists': {'data': [{'PLAYLIST_ID': 'Ünï'}], 'total': 1}}}
+        for separators in ((',', ':'), (', ', ': ')):
+            app_state = json.dumps(state, separators=separators)
+            content = '<script>window.__DZR_CHUNK__ = {{"TAB": {{}}}}</script>' \
+                      '<script>window.__DZR_APP_STATE__ = {}</script>'.format(app_state)
+            content = content.encode('utf-8')
+            playlists = DeezerParser.parse_app_state(content, 'TAB', 'playlists', 'data')
+            self.assertEqual([{'PLAYLIST_ID': 'Ünï'}], playlists)
+            self.assertEqual(state, DeezerParser.parse_app_state(content))
+            self.assertEqual('x', DeezerParser.parse_app_state(content, 'DATA', 'data'))
+            with self.assertRaises(DeezerError):
+                DeezerParser.parse_app_state(content, 'RELATED_ARTISTS', 'data')
+        with self.assertRaises(DeezerError):
+            DeezerParser.parse_app_state(b'<html></html>', 'TAB')
+
+    def test_parse_app_state_keys_on_their_level(self):
+        state = {'DATA': {'TAB': {'playlists': {'data': ['nested']}}, 'note': '"TAB": {"data": [0]} \\"'},
+                 'RELATED_ARTISTS': {'total': 0, 'extra': {'data': ['nested']}},
+                 'TAB': {'loved': {'playlists': {'data': ['loved']}}, 'playlists': {'x': [{'data': []}],
+                                                                                    'data': ['real']}},
+                 'NEXT': {'data': ['sibling']}}
+        content = '<script>window.__DZR_APP_STATE__ = {}</script>'.format(json.dumps(state)).encode('utf-8')
+        self.assertEqual(['real'], DeezerParser.parse_app_state(content, 'TAB', 'playlists', 'data'))
+        self.assertEqual({'data': ['sibling']}, DeezerParser.parse_app_state(content, 'NEXT'))
+        with self.assertRaises(DeezerError):
+            DeezerParser.parse_app_state(content, 'RELATED_ARTISTS', 'data')
+        with self.assertRaises(DeezerError):
+            DeezerParser.parse_app_state(content, 'TAB', 'missing', 'data')
+
+    def test_parse_app_state_brackets_in_strings(self):
+        state = {'DATA': {'TITLE': 'Live [2020 {', 'PATH': 'a\\"b\\\\', 'NAME': '}] \\'},
+                 'TAB': {'playlists': {'data': [{'TITLE': ']}'}]}}}
+        content = '<script>window.__DZR_APP_STATE__ = {}</script>'.format(json.dumps(state)).encode('utf-8')
+        self.assertEqual([{'TITLE': ']}'}], DeezerParser.parse_app_state(content, 'TAB', 'playlists', 'data'))
+        with self.assertRaises(DeezerError):
+            DeezerParser.parse_app_state(content, 'DATA', 'playlists')
+
+
+if __name__ == '__main__':
+    unittest.main()
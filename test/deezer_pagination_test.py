@@ -0,0 +1,58 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from deezer_api.deezer_pagination import DeezerPaginator, AsyncDeezerPaginator
+
+
+def pages(count_pages, page_size):
+    return {'page/{}'.format(i): {'data': list(range(i * page_size, (i + 1) * page_size)),
+                                  'next': 'page/{}'.format(i + 1) if i + 1 < count_pages else None}
+            for i in range(count_pages)}
+
+
+class DeezerPagination(unittest.TestCase):
+
+    def setUp(self):
+        self.pages = pages(4, 5)
+        self.loaded = []
+        self.lock = threading.Lock()
+
+    def load_page(self, url):
+        with self.lock:
+            self.loaded.append(url)
+        return self.pages[url]
+
+    def test_follow_next_links(self):
+        self.assertEqual(list(range(20)), list(DeezerPaginator(self.load_page, 'page/0')))
+        self.assertEqual(['page/0', 'page/1', 'page/2', 'page/3'], self.loaded)
+
+    def test_prefetch_next_page(self):
+        items = iter(DeezerPaginator(self.load_page, 'page/0'))
+        self.assertEqual(0, next(items))
+        for _ in range(100):
+            if 'page/1' in self.loaded:
+                break
+            time.sleep(0.01)
+        self.assertIn('page/1', self.loaded)
+
+    def test_stop_at_limit(self):
+        self.assertEqual(list(range(7)), list(DeezerPaginator(self.load_page, 'page/0', limit=7)))
+        self.assertEqual(['page/0', 'page/1'], self.loaded)
+
+    def test_async_stop_at_limit(self):
+        async def load_page(url):
+            self.loaded.append(url)
+            await asyncio.sleep(0)
+            return self.pages[url]
+
+        loop = asyncio.new_event_loop()
+        items = loop.run_until_complete(AsyncDeezerPaginator(load_page, 'page/0', limit=12).collect())
+        loop.close()
+        self.assertEqual(list(range(12)), items)
+        self.assertEqual(['page/0', 'page/1', 'page/2'], self.loaded)
+
+
+if __name__ == '__main__':
+    unittest.main()
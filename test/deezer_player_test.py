@@ -0,0 +1,136 @@
+import os
+import re
+import tempfile
+import threading
+import unittest
+
+from deezer_api import DeezerApi, Track, DeezerError
+from deezer_api.deezer_async import DeezerResponse
+from deezer_api.deezer_media import MediaCache
+from deezer_api.deezer_player import Downloader, Prefetcher
+
+
+class FileTransport:
+    """
+    Requests of urls matched by hold wait for resume, the first request waits for a second one in flight
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.overlap = threading.Event()
+        self.resume = threading.Event()
+        self.hold = lambda url: False
+
+    def get(self, url, **kwargs):
+        with self.lock:
+            self.calls.append(url)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            if self.active > 1:
+                self.overlap.set()
+        try:
+            if not self.overlap.wait(5):
+                self.overlap.set()
+            if self.hold(url):
+                self.resume.wait(5)
+        finally:
+            with self.lock:
+                self.active -= 1
+        if url.endswith('missing'):
+            return DeezerResponse(404, 'Not Found', {}, b'')
+        return DeezerResponse(200, 'OK', {}, url.encode('utf-8') * 1000)
+
+
+def track(track_id, album_id=None):
+    album_id = track_id if album_id is None else album_id
+    return Track({'id': track_id, 'title': 'track {}'.format(track_id), 'artist': {'name': 'artist'},
+                  'preview': 'https://cdns-preview.dzcdn.net/{}.mp3'.format(track_id),
+                  'album': {'cover_medium': 'https://e-cdns-images.dzcdn.net/{}.jpg'.format(album_id)}})
+
+
+class DeezerDownloader(unittest.TestCase):
+
+    def setUp(self):
+        self.media = MediaCache(tempfile.mkdtemp())
+        self.transport = FileTransport()
+        self.downloader = Downloader(self.transport, max_workers=8, media=self.media)
+
+    def tearDown(self):
+        self.media.close()
+
+    def test_download_concurrently_by_track_id(self):
+        tracks = [track(i) for i in range(10, 30)]
+        music_list = self.downloader.download(tracks)
+        self.assertGreater(self.transport.peak, 1)
+        self.assertEqual('artist - track 12', music_list[2])
+        with open(self.downloader.preview(tracks[2]), 'rb') as file:
+            self.assertEqual(tracks[2].preview.encode('utf-8') * 1000, file.read())
+        self.assertTrue(self.downloader.preview(tracks[2]).endswith('12.mp3'))
+        self.assertEqual(40, self.downloader.stats()['downloaded'])
+
+        self.downloader.download(tracks[5:] + [track(30)])
+        self.assertEqual(42, len(self.transport.calls))
+        self.assertEqual(32, self.downloader.stats()['skipped'])
+
+    def test_default_transport_shares_client_limiter(self):
+        client = DeezerApi()
+        downloader = Downloader(media=self.media)
+        self.assertIs(client.transport.limiter, downloader.transport.limiter)
+        client.close()
+        downloader.transport.close()
+
+    def test_album_cover_is_shared(self):
+        tracks = [track(i, album_id=7) for i in range(5)]
+        self.downloader.download(tracks)
+        self.assertEqual(6, len(self.transport.calls))
+        self.assertEqual(1, len({self.downloader.cover(t) for t in tracks}))
+
+    def test_failed_download_leaves_no_file(self):
+        missing = track(1)
+        missing.preview = missing.preview + 'missing'
+        with self.assertRaises(DeezerError):
+            self.downloader.download([missing])
+        self.assertEqual([], os.listdir(os.path.dirname(self.media.path(MediaCache.preview_key(missing)))))
+        self.assertEqual(1, self.media.stats()['entries'])
+
+
+class DeezerPrefetcher(unittest.TestCase):
+
+    def setUp(self):
+        self.media = MediaCache(tempfile.mkdtemp())
+        self.transport = FileTransport()
+        self.tracks = [track(i) for i in range(50)]
+        self.prefetcher = Prefetcher(Downloader(self.transport, media=self.media), self.tracks, look_ahead=2)
+
+    def tearDown(self):
+        self.prefetcher.close()
+        self.media.close()
+
+    def test_first_track_does_not_wait_for_playlist(self):
+        self.transport.hold = lambda url: not re.search(r'/0\.(mp3|jpg)$', url)
+        preview, cover = self.prefetcher.paths(0)
+        self.assertTrue(os.path.exists(preview) and os.path.exists(cover))
+        self.assertFalse(self.prefetcher.futures[1].done())
+        self.transport.resume.set()
+        for i in (1, 2):
+            self.prefetcher.futures[i].result()
+        self.assertEqual(6, len(self.transport.calls))
+
+        self.prefetcher.paths(1)
+        self.prefetcher.futures[3].result()
+        self.assertEqual(8, len(self.transport.calls))
+        self.assertEqual([0, 1, 2, 3], sorted(self.prefetcher.futures))
+
+    def test_failed_track_is_downloaded_again(self):
+        self.tracks[0].preview += 'missing'
+        with self.assertRaises(DeezerError):
+            self.prefetcher.paths(0)
+        self.tracks[0].preview = self.tracks[0].preview[:-len('missing')]
+        self.assertTrue(os.path.exists(self.prefetcher.paths(0)[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
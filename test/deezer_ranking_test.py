@@ -0,0 +1,85 @@
+import unittest
+
+from deezer_api import PlayList, Track, TrackFilter, DeezerError
+from deezer_api.deezer_ranking import CandidatePool, numpy
+
+
+def track(track_id, artist_id, rank, isrc=None, **fields):
+    return Track(dict(fields, id=track_id, rank=rank, isrc=isrc, artist={'id': artist_id}))
+
+
+class DeezerRanking(unittest.TestCase):
+
+    def test_deduplicate_by_id_and_isrc(self):
+        pool = CandidatePool()
+        pool.add_tracks(1, [track(1, 1, 10, 'A'), track(2, 1, 10, 'B')])
+        pool.add_tracks(2, [track(1, 2, 10), track(3, 2, 10, 'A'), track(4, 2, 10)])
+        self.assertEqual(3, len(pool))
+        self.assertEqual(2, pool.duplicates)
+
+    def test_top_by_rank_with_artist_cap(self):
+        pool = CandidatePool()
+        pool.add_tracks(1, [track(i, 1, 1000 - i) for i in range(1, 10)])
+        pool.add_tracks(2, [track(i, 2, 100 - i) for i in range(10, 20)])
+        self.assertEqual([1, 2, 3, 10, 11, 12], [t.id for t in pool.top(6)])
+        self.assertEqual([1, 2, 3, 4, 5, 6], [t.id for t in pool.top(6, max_per_artist=6)])
+
+    def test_fill_from_overflow_when_artists_have_few_tracks(self):
+        pool = CandidatePool()
+        pool.add_tracks(1, [track(i, 1, 100 - i) for i in range(1, 10)])
+        pool.add_tracks(2, [track(10, 2, 50)])
+        top = pool.top(5)
+        self.assertEqual(5, len(top))
+        self.assertIn(10, [t.id for t in top])
+        self.assertEqual(10, len(pool.top(50)))
+        self.assertEqual([], CandidatePool().top(5))
+
+    def test_affinity_and_distance(self):
+        pool = CandidatePool(weights={'rank': 0.0})
+        pool.add_playlists([PlayList({'id': 1, 'tracks': {'data': [
+            {'id': 100, 'artist': {'id': 1}}, {'id': 101, 'artist': {'id': 1}}, {'id': 102, 'artist': {'id': 2}}]}})])
+        pool.add_tracks(3, [track(30, 3, 999999)])
+        pool.add_tracks(2, [track(20, 2, 1)])
+        pool.add_tracks(1, [track(10, 1, 1)])
+        self.assertEqual([10, 20, 30], [t.id for t in pool.top(3)])
+
+    def test_filter_and_weights(self):
+        for vectorized in (False, True) if numpy is not None else (False,):
+            pool = CandidatePool({'rank': 0.0, 'recency': 1.0}, TrackFilter(max_duration=300, explicit=False),
+                                 vectorized=vectorized)
+            pool.add_tracks(1, [track(1, 1, 10, duration=200, release_date='2001-01-01'),
+                                track(2, 1, 10, duration=400, release_date='2019-01-01'),
+                                track(3, 1, 10, duration=250, explicit_lyrics=True, release_date='2019-01-01'),
+                                track(4, 1, 10, release_date='2015-05-05'),
+                                track(5, 1, 10, duration=100)])
+            self.assertEqual([4, 1, 5], [t.id for t in pool.top(5)])
+            self.assertEqual([None, None], pool.scores()[1:3])
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_vectorized_scores_match(self):
+        pools = [CandidatePool({'bpm': 0.5, 'gain': 0.1}, TrackFilter(min_duration=150), vectorized=vectorized)
+                 for vectorized in (False, True)]
+        for pool in pools:
+            pool.add_artist(3, affinity=4)
+            for artist_id in range(10):
+                pool.add_tracks(artist_id, [track(artist_id * 100 + i, artist_id, (i * 7919) % 1000,
+                                                  duration=100 + i * 13, bpm=90 + i, gain=-i)
+                                            for i in range(20)], distance=artist_id % 3)
+        # dicts of python 3.5 are not ordered by insertion: artist indexes must not depend on iteration order
+        pools[1].artists = dict(reversed(list(pools[1].artists.items())))
+        for expected, score in zip(pools[0].scores(), pools[1].scores()):
+            if expected is None:
+                self.assertIsNone(score)
+            else:
+                self.assertAlmostEqual(expected, score)
+        for count, max_per_artist in ((25, None), (150, None), (60, 2)):
+            self.assertEqual([t.id for t in pools[0].top(count, max_per_artist)],
+                             [t.id for t in pools[1].top(count, max_per_artist)])
+
+    def test_unknown_weights(self):
+        with self.assertRaises(DeezerError):
+            CandidatePool({'popularity': 1.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+import asyncio
+import json
+import time
+import unittest
+
+from deezer_api import DeezerApi, DeezerError, DeezerMetrics
+from deezer_api.deezer_async import DeezerResponse
+from deezer_api.deezer_objects import DeezerUrl
+from deezer_api.deezer_retry import RetryPolicy, RetryTransport, AsyncRetryTransport, CircuitBreaker
+
+Artist = {'id': 27, 'name': 'Daft Punk'}
+Quota = {'error': {'type': 'Exception', 'message': 'Quota limit exceeded', 'code': 4}}
+NoData = {'error': {'type': 'DataException', 'message': 'no data', 'code': 800}}
+
+
+def response(payload, status=200, headers=None):
+    content = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+    return DeezerResponse(status, 'OK', headers or {}, content)
+
+
+class ScriptedTransport:
+    """
+    Answers every request with the next scripted response or raises the next scripted exception
+    """
+
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.calls = []
+
+    def get(self, url, **kwargs):
+        self.calls.append(url)
+        answer = self.answers.pop(0) if len(self.answers) > 1 else self.answers[0]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    post = get
+    delete = get
+
+    def close(self):
+        pass
+
+
+class AsyncScriptedTransport(ScriptedTransport):
+
+    async def get(self, url, **kwargs):
+        return super().get(url, **kwargs)
+
+
+def policy(**kwargs):
+    kwargs.setdefault('backoff', 0.01)
+    return RetryPolicy(seed=1, **kwargs)
+
+
+class DeezerRetry(unittest.TestCase):
+
+    def test_transient_failures_are_retried(self):
+        metrics = DeezerMetrics()
+        transport = ScriptedTransport([response(Quota, 429, {'Retry-After': '0'}), response(Quota),
+                                       ConnectionError('reset'), response(b'', 503), response(Artist)])
+        retry = policy()
+        result = RetryTransport(transport, retry, metrics).get(DeezerUrl.ArtistUrl.format(27))
+        self.assertEqual(Artist, result.json())
+        self.assertEqual(5, len(transport.calls))
+        self.assertEqual({'retries': 4, 'gave_up': 0}, {k: retry.stats()[k] for k in ('retries', 'gave_up')})
+        self.assertEqual({'status 429': 1, 'code 4': 1, 'connection': 1, 'status 503': 1},
+                         metrics.as_dict()['retries']['api.deezer.com/artist/{}'])
+
+    def test_fatal_errors_are_not_retried(self):
+        transport = ScriptedTransport([response(NoData)])
+        self.assertEqual(NoData, RetryTransport(transport, policy()).get(DeezerUrl.ArtistUrl.format(0)).json())
+        transport = ScriptedTransport([KeyError('url')])
+        with self.assertRaises(KeyError):
+            RetryTransport(transport, policy()).get(DeezerUrl.ArtistUrl.format(0))
+        self.assertEqual(1, len(transport.calls))
+
+    def test_post_is_retried_only_when_throttled(self):
+        transport = ScriptedTransport([response(b'', 500), response({'id': 1})])
+        self.assertEqual(500, RetryTransport(transport, policy()).post(DeezerUrl.PlayListUrl.format(1)).status_code)
+        transport = ScriptedTransport([response(Quota), response(b'', 429), response({'id': 1})])
+        self.assertEqual({'id': 1}, RetryTransport(transport, policy()).post(DeezerUrl.PlayListUrl.format(1)).json())
+
+    def test_attempts_and_deadline(self):
+        transport = ScriptedTransport([response(b'', 502)])
+        self.assertEqual(502, RetryTransport(transport, policy(attempts=3)).get(DeezerUrl.TrackUrl.format(1))
+                         .status_code)
+        self.assertEqual(3, len(transport.calls))
+
+        transport = ScriptedTransport([response(b'', 502)])
+        start = time.monotonic()
+        RetryTransport(transport, policy(backoff=0.2, deadline=0.5)).get(DeezerUrl.TrackUrl.format(1))
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertLess(len(transport.calls), 5)
+
+    def test_retry_after_is_honored(self):
+        retry = policy()
+        self.assertGreaterEqual(retry.delay(1, response(Quota, 429, {'Retry-After': '2'})), 2)
+        self.assertLess(retry.delay(1, response(Quota, 429)), 0.02)
+        self.assertEqual(120, retry.delay(1, response(Quota, 429, {'Retry-After': '120'})))
+
+    def test_long_retry_after_gives_up_by_deadline(self):
+        transport = ScriptedTransport([response(Quota, 429, {'Retry-After': '120'}), response(Artist)])
+        retry = policy(deadline=60)
+        self.assertEqual(429, RetryTransport(transport, retry).get(DeezerUrl.ArtistUrl.format(27)).status_code)
+        self.assertEqual(1, len(transport.calls))
+        self.assertEqual(1, retry.stats()['gave_up'])
+
+    def test_error_code_in_any_layout(self):
+        for body in (b'{\n  "error": {"type": "Exception", "message": "Quota limit exceeded", "code": 4}\n}',
+                     b'{"data": [], "error": {"code": 700, "message": "busy"}}', b' {"error" : {"code": 4}}'):
+            transport = ScriptedTransport([response(body), response(Artist)])
+            self.assertEqual(Artist, RetryTransport(transport, policy()).get(DeezerUrl.ArtistUrl.format(27)).json())
+            self.assertEqual(2, len(transport.calls))
+        transport = ScriptedTransport([response({'title': '"error"', 'error': 'none'})])
+        RetryTransport(transport, policy()).get(DeezerUrl.PlayListUrl.format(1))
+        self.assertEqual(1, len(transport.calls))
+
+    def test_circuit_breaker(self):
+        breaker = CircuitBreaker(failures=2, reset=0.2)
+        breaker.failure()
+        self.assertEqual('closed', breaker.state)
+        breaker.failure()
+        self.assertEqual('open', breaker.state)
+        self.assertGreater(breaker.wait(), 0)
+        time.sleep(0.2)
+        self.assertEqual(0, breaker.wait())
+        self.assertGreater(breaker.wait(), 0)
+        breaker.failure()
+        self.assertEqual('open', breaker.state)
+        time.sleep(0.2)
+        self.assertEqual(0, breaker.wait())
+        breaker.success()
+        self.assertEqual('closed', breaker.state)
+
+    def test_open_breaker_pauses_host(self):
+        retry = policy(attempts=2, breaker_failures=2, breaker_reset=0.3)
+        transport = ScriptedTransport([response(b'', 503), response(b'', 503), response(Artist)])
+        RetryTransport(transport, retry).get(DeezerUrl.ArtistUrl.format(27))
+        self.assertEqual('open', retry.stats()['breakers']['api.deezer.com']['state'])
+
+        with self.assertRaises(DeezerError):
+            RetryTransport(transport, retry).get(DeezerUrl.ArtistUrl.format(27), deadline=0.1)
+        self.assertEqual(2, len(transport.calls))
+
+        self.assertEqual(Artist, RetryTransport(transport, retry).get(DeezerUrl.ArtistUrl.format(27)).json())
+        self.assertEqual('closed', retry.stats()['breakers']['api.deezer.com']['state'])
+
+    def test_failures_of_post_open_breaker(self):
+        retry = policy(breaker_failures=2)
+        transport = ScriptedTransport([response(b'', 503), ConnectionError('reset'), response({'id': 1})])
+        url = DeezerUrl.RestrictedAddPlayListUrl.format(1, 'token', 'mix')
+        self.assertEqual(503, RetryTransport(transport, retry).post(url).status_code)
+        self.assertEqual('closed', retry.stats()['breakers']['api.deezer.com']['state'])
+        with self.assertRaises(ConnectionError):
+            RetryTransport(transport, retry).post(url)
+        self.assertEqual('open', retry.stats()['breakers']['api.deezer.com']['state'])
+        self.assertEqual(2, len(transport.calls))
+
+    def test_async_retry(self):
+        transport = AsyncScriptedTransport([response(Quota), response(b'', 500), response(Artist)])
+
+        async def load():
+            return await AsyncRetryTransport(transport, policy()).get(DeezerUrl.ArtistUrl.format(27))
+
+        loop = asyncio.new_event_loop()
+        self.assertEqual(Artist, loop.run_until_complete(load()).json())
+        loop.close()
+        self.assertEqual(3, len(transport.calls))
+
+    def test_client_survives_throttling(self):
+        transport = ScriptedTransport([response(Quota), response(Quota), response(Artist)])
+        client = DeezerApi(transport=transport, retry=policy())
+        self.assertEqual('Daft Punk', client.get_artist(27).name)
+
+    def test_broken_page_raises_deezer_error(self):
+        transport = ScriptedTransport([response(b'<html>')])
+        client = DeezerApi(transport=transport, retry=policy())
+        with self.assertRaises(DeezerError):
+            client.get_artist_tracks(27)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,237 @@
+import asyncio
+import json
+import re
+import threading
+import time
+import unittest
+
+from deezer_api import BatchScheduler, AsyncBatchScheduler, Lane, RetryPolicy, DeezerError
+from deezer_api.deezer_async import DeezerResponse
+from deezer_api.deezer_scheduler import FairQueue, FairGate, FairTransport, BatchJob
+
+
+def app_state_page(state):
+    return '<script>window.__DZR_APP_STATE__ = {}</script>'.format(json.dumps(state)).encode('utf-8')
+
+
+def track(track_id, artist_id):
+    return {'id': track_id, 'title': 'track {}'.format(track_id), 'rank': track_id, 'duration': 200,
+            'artist': {'id': artist_id, 'name': 'artist {}'.format(artist_id)},
+            'album': {'id': track_id, 'cover_big': 'cover {}'.format(track_id)}}
+
+
+class UsersServer:
+    """
+    Fake Deezer of users 1, 2, 3... with token<N>: every user has one playlist of artists N and N + 1
+    """
+
+    def __init__(self, delay=0.002):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self.created = {}
+        self.inserted = {}
+
+    def get(self, url, **kwargs):
+        with self.lock:
+            self.calls.append(url)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            payload = self.answer(url)
+        finally:
+            with self.lock:
+                self.active -= 1
+        content = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+        return DeezerResponse(200, 'OK', {}, content)
+
+    def answer(self, url):
+        match = re.search(r'user/me\?access_token=token(\d+)$', url)
+        if match:
+            return {'id': int(match.group(1)), 'name': 'user'}
+        if 'user/me' in url:
+            raise KeyError('invalid token')
+        match = re.search(r'profile/(\d+)/playlists', url)
+        if match:
+            return app_state_page({'TAB': {'playlists': {'data': [{'PLAYLIST_ID': 100 + int(match.group(1))}]}}})
+        match = re.search(r'artist/(\d+)/related_artist', url)
+        if match:
+            related = int(match.group(1)) + 10
+            return app_state_page({'RELATED_ARTISTS': {'data': [{'ART_ID': related, 'ART_NAME': str(related)}]}})
+        match = re.search(r'artist/(\d+)/top\?limit=(\d+)', url)
+        if match:
+            artist_id = int(match.group(1))
+            return {'data': [track(artist_id * 100 + i, artist_id) for i in range(int(match.group(2)))]}
+        match = re.search(r'user/(\d+)/playlists\?access_token=token\d+&title=(.*)', url)
+        if match:
+            with self.lock:
+                self.created[int(match.group(1))] = match.group(2)
+            return {'id': 1000 + int(match.group(1))}
+        match = re.search(r'user/(\d+)/playlists\?access_token=token\d+&limit=100', url)
+        if match:
+            return {'data': [{'id': 100 + int(match.group(1)), 'title': 'Favourites'}]}
+        match = re.search(r'playlist/(\d+)/tracks\?access_token=token\d+&songs=(.*)', url)
+        if match:
+            with self.lock:
+                self.inserted.setdefault(int(match.group(1)), []).extend(int(i) for i in match.group(2).split(','))
+            return True
+        user_id = int(re.search(r'playlist/(\d+)', url).group(1)) - 100
+        return {'id': 100 + user_id, 'title': 'Favourites',
+                'tracks': {'data': [track(user_id * 100, user_id), track((user_id + 1) * 100, user_id + 1)]}}
+
+    post = get
+    delete = get
+
+    def close(self):
+        pass
+
+
+class AsyncUsersServer(UsersServer):
+
+    async def get(self, url, **kwargs):
+        with self.lock:
+            self.calls.append(url)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            payload = self.answer(url)
+        finally:
+            with self.lock:
+                self.active -= 1
+        content = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+        return DeezerResponse(200, 'OK', {}, content)
+
+    post = get
+    delete = get
+
+    async def close(self):
+        pass
+
+
+class DeezerFairQueue(unittest.TestCase):
+
+    def test_lanes_and_turns_of_users(self):
+        queue = FairQueue()
+        queue.push(Lane.NORMAL, 'a', 'a1')
+        queue.push(Lane.NORMAL, 'a', 'a2')
+        queue.push(Lane.NORMAL, 'a', 'a3')
+        queue.push(Lane.NORMAL, 'b', 'b1')
+        queue.push(Lane.LOW, 'c', 'c1')
+        queue.push(Lane.HIGH, 'd', 'd1')
+        self.assertEqual(6, len(queue))
+        self.assertEqual(['d1', 'a1', 'b1', 'a2', 'a3', 'c1', None], [queue.pop() for _ in range(7)])
+        with self.assertRaises(DeezerError):
+            queue.push('urgent', 'a', 'a4')
+
+    def test_gate_passes_slots_fairly(self):
+        gate, granted = FairGate(capacity=1), []
+        self.assertTrue(gate.reserve(Lane.NORMAL, 'a', None))
+        for lane, user, name in ((Lane.NORMAL, 'a', 'a1'), (Lane.NORMAL, 'a', 'a2'), (Lane.NORMAL, 'b', 'b1'),
+                                 (Lane.HIGH, 'c', 'c1')):
+            self.assertFalse(gate.reserve(lane, user, lambda name=name: granted.append(name)))
+        for _ in range(5):
+            gate.release()
+        self.assertEqual(['c1', 'a1', 'b1', 'a2'], granted)
+        self.assertEqual({'active': 0, 'queued': 0, 'waited': 4, 'granted': {'a': 3, 'b': 1, 'c': 1}}, gate.stats())
+
+    def test_cancelled_waiter_passes_slot(self):
+        gate = FairGate(capacity=1)
+
+        async def run():
+            await gate.acquire_async(Lane.NORMAL, 'a')
+            waiter = asyncio.ensure_future(gate.acquire_async(Lane.NORMAL, 'b'))
+            other = asyncio.ensure_future(gate.acquire_async(Lane.NORMAL, 'c'))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            gate.release()
+            await asyncio.wait_for(other, 1)
+            gate.release()
+
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(run())
+        loop.close()
+        self.assertEqual(0, gate.stats()['active'])
+
+    def test_streamed_response_holds_slot_until_closed(self):
+        class Response:
+            closed = 0
+
+            def close(self):
+                Response.closed += 1
+
+        class Transport:
+            def get(self, url, **kwargs):
+                return Response()
+
+        gate = FairGate(capacity=1)
+        transport = FairTransport(Transport(), gate, 'a')
+        transport.get('preview')
+        self.assertEqual(0, gate.stats()['active'])
+        response = transport.get('preview', stream=True)
+        self.assertEqual(1, gate.stats()['active'])
+        response.close()
+        response.close()
+        self.assertEqual({'active': 0, 'waited': 0}, {k: gate.stats()[k] for k in ('active', 'waited')})
+        self.assertEqual(2, Response.closed)
+
+
+class DeezerBatchScheduler(unittest.TestCase):
+
+    def test_jobs_of_users_share_requests(self):
+        server = UsersServer()
+        scheduler = BatchScheduler(transport=server, retry=RetryPolicy(attempts=1), max_jobs=4, max_requests=2,
+                                   run_id='monday')
+        for user in range(1, 6):
+            scheduler.submit(user, 'token{}'.format(user), count_tracks=4)
+        scheduler.submit('broken', 'expired', lane=Lane.HIGH)
+        jobs = scheduler.run()
+
+        self.assertEqual([BatchJob.DONE] * 5 + [BatchJob.FAILED], [job.state for job in jobs])
+        self.assertLessEqual(server.max_active, 2)
+        self.assertEqual({user: 'Deezer Recommendation' for user in range(1, 6)}, server.created)
+        for job in jobs[:5]:
+            self.assertEqual(4, len(job.tracks))
+            self.assertEqual([t.id for t in job.tracks], server.inserted[1000 + job.user])
+            self.assertEqual('done', scheduler.progress()[job.job_id]['stage'])
+        self.assertIsNotNone(scheduler.progress()['monday:broken']['error'])
+        # artist 2 is in playlists of users 1 and 2: related artists are loaded once for the batch
+        self.assertEqual(1, len([url for url in server.calls if url.endswith('artist/2/related_artist')]))
+        self.assertEqual({BatchJob.DONE: 5, BatchJob.FAILED: 1}, scheduler.stats()['jobs'])
+
+        calls, store = len(server.calls), scheduler.store
+        scheduler = BatchScheduler(transport=server, store=store, max_jobs=4, max_requests=2, run_id='monday')
+        scheduler.submit(1, 'token1', count_tracks=4)
+        self.assertEqual(BatchJob.DONE, scheduler.run()[0].state)
+        self.assertEqual(['https://api.deezer.com/user/me?access_token=token1'], server.calls[calls:])
+
+        del server.created[1]
+        scheduler = BatchScheduler(transport=server, store=store, max_jobs=4, max_requests=2, run_id='tuesday')
+        scheduler.submit(1, 'token1', count_tracks=4)
+        self.assertEqual('tuesday:1', scheduler.run()[0].job_id)
+        self.assertEqual('Deezer Recommendation', server.created[1])
+
+    def test_async_jobs(self):
+        server = AsyncUsersServer()
+
+        async def run():
+            async with AsyncBatchScheduler(transport=server, max_jobs=3, max_requests=2) as scheduler:
+                for user in range(1, 4):
+                    scheduler.submit(user, 'token{}'.format(user), lane=Lane.LOW if user == 3 else Lane.NORMAL,
+                                     count_tracks=4)
+                return await scheduler.run()
+
+        loop = asyncio.new_event_loop()
+        jobs = loop.run_until_complete(run())
+        loop.close()
+        self.assertEqual([BatchJob.DONE] * 3, [job.state for job in jobs])
+        self.assertLessEqual(server.max_active, 2)
+        for job in jobs:
+            self.assertEqual([t.id for t in job.tracks], server.inserted[1000 + job.user])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import json
+import unittest
+
+from deezer_api import DeezerApi, DeezerError
+from deezer_api.deezer_async import DeezerResponse
+from deezer_api.deezer_stream import JsonStream
+
+
+def chunked(data, size):
+    raw = json.dumps(data, ensure_ascii=False).encode('utf-8')
+    return [raw[i:i + size] for i in range(0, len(raw), size)]
+
+
+class FakeStreamTransport:
+
+    def __init__(self, payload, chunk_size):
+        self.payload = payload
+        self.chunk_size = chunk_size
+
+    def get(self, url, **kwargs):
+        self.response = ChunkedResponse(self.payload, self.chunk_size)
+        return self.response
+
+
+class ChunkedResponse(DeezerResponse):
+
+    def __init__(self, payload, chunk_size):
+        super().__init__(200, 'OK', {}, json.dumps(payload).encode('utf-8'))
+        self.chunk_size = chunk_size
+        self.read = 0
+
+    def iter_content(self, chunk_size=1):
+        for chunk in super().iter_content(self.chunk_size):
+            self.read += 1
+            yield chunk
+
+
+class DeezerStream(unittest.TestCase):
+
+    def setUp(self):
+        self.payload = {
+            'id': 1, 'title': 'Ünïcødé "playlist"', 'duration': 12.5e2,
+            'tracks': {'data': [{'id': i, 'title': 'track {}'.format(i), 'artist': {'id': i % 3}} for i in range(50)],
+                       'checksum': 'abc'},
+            'creator': {'id': 7, 'tags': [1, [2, {'x': None}]]},
+        }
+
+    def test_stream_by_any_chunk_size(self):
+        for size in (1, 2, 3, 7, 64, 4096):
+            stream = JsonStream(chunked(self.payload, size), ('tracks', 'data'))
+            self.assertEqual(self.payload['tracks']['data'], list(stream))
+            self.assertEqual('abc', stream.meta['tracks']['checksum'])
+            self.assertEqual(self.payload['creator'], stream.meta['creator'])
+            self.assertEqual(1250.0, stream.meta['duration'])
+
+    def test_truncated_stream(self):
+        with self.assertRaises(ValueError):
+            list(JsonStream(chunked(self.payload, 10)[:-5], ('tracks', 'data')))
+
+    def test_tracks_are_yielded_before_download_finished(self):
+        transport = FakeStreamTransport(self.payload, 64)
+        client = DeezerApi(transport=transport)
+        tracks = client.iter_playlist_tracks(1)
+        self.assertEqual(0, next(tracks).id)
+        self.assertLess(transport.response.read, len(transport.response.content) // 64)
+        self.assertEqual(50, len(list(tracks)) + 1)
+        self.assertTrue(client.known_tracks.contains(1, 49))
+
+    def test_search_error(self):
+        client = DeezerApi(transport=FakeStreamTransport({'error': {'code': 800}}, 8))
+        with self.assertRaises(DeezerError):
+            client.search_query('eminem', 'wrong')
+
+
+if __name__ == '__main__':
+    unittest.main()
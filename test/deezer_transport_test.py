@@ -0,0 +1,94 @@
+import time
+import unittest
+
+import requests
+
+from benchmark.stub_server import StubHandler, StubServer
+from deezer_api import DeezerApi
+from deezer_api.deezer_limiter import DeezerRateLimiter
+from deezer_api.deezer_objects import DeezerUrl
+from deezer_api.deezer_transport import DeezerTransport
+
+
+class PortsHandler(StubHandler):
+    ports = set()
+
+    def do_GET(self):
+        self.ports.add(self.client_address[1])
+        super().do_GET()
+
+
+class SlowHandler(StubHandler):
+
+    def do_GET(self):
+        time.sleep(0.5)
+        self.close_connection = True
+
+
+class ClosingTransport:
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class DeezerTransportPool(unittest.TestCase):
+
+    def test_connection_is_reused(self):
+        PortsHandler.ports = set()
+        with StubServer(PortsHandler) as server, DeezerTransport() as transport:
+            for artist_id in range(5):
+                self.assertEqual(200, transport.get(server.url + '/artist/{}'.format(artist_id)).status_code)
+        self.assertEqual(1, len(PortsHandler.ports))
+
+    def test_pool_size_per_host(self):
+        with DeezerTransport(pool_size=4, pool_sizes={'www.deezer.com': 2}) as transport:
+            for url, size in (('https://api.deezer.com/artist/27', 4), ('https://www.deezer.com/ru/artist/27', 2),
+                              ('https://connect.deezer.com/oauth', 4)):
+                adapter = transport.session.get_adapter(url)
+                self.assertEqual(size, adapter.poolmanager.connection_pool_kw['maxsize'])
+            self.assertIsNot(transport.session.get_adapter('https://api.deezer.com/artist/27'),
+                             transport.session.get_adapter('https://www.deezer.com/ru/artist/27'))
+
+    def test_read_timeout(self):
+        with StubServer(SlowHandler) as server, DeezerTransport(read_timeout=0.1) as transport:
+            with self.assertRaises(requests.exceptions.ReadTimeout):
+                transport.get(server.url + '/artist/27')
+
+    def test_client_closes_own_transport_only(self):
+        transport = ClosingTransport()
+        client = DeezerApi(transport=transport)
+        self.assertIs(transport, client.transport)
+        client.close()
+        self.assertFalse(transport.closed)
+
+
+class DeezerTransportHosts(unittest.TestCase):
+
+    def test_rewrite_host(self):
+        hosts = {'api.deezer.com': 'http://127.0.0.1:8080/', 'www.deezer.com': 'http://127.0.0.1:8080'}
+        self.assertEqual('http://127.0.0.1:8080/artist/27',
+                         DeezerTransport.rewrite(DeezerUrl.ArtistUrl.format(27), hosts))
+        self.assertEqual('http://127.0.0.1:8080/search/track?q=eminem',
+                         DeezerTransport.rewrite(DeezerUrl.SearchUrl.format('/track', 'eminem'), hosts))
+        self.assertEqual('http://127.0.0.1:8080/ru/artist/27/related_artist',
+                         DeezerTransport.rewrite(DeezerUrl.RelatedArtistUrl.format(27), hosts))
+
+    def test_other_hosts_are_not_rewritten(self):
+        url = DeezerUrl.TokenUrl.format(1, 2, 3)
+        self.assertEqual(url, DeezerTransport.rewrite(url, {'api.deezer.com': 'http://127.0.0.1:8080'}))
+        self.assertEqual(url, DeezerTransport.rewrite(url, None))
+
+    def test_limiter_keeps_deezer_host(self):
+        limiter = DeezerRateLimiter(default=None, limits={'api.deezer.com': (50, 5)})
+        with DeezerTransport(limiter=limiter, hosts={'api.deezer.com': 'http://127.0.0.1:1'}, connect_timeout=0.1) \
+                as transport:
+            with self.assertRaises(Exception):
+                transport.get(DeezerUrl.ArtistUrl.format(27))
+        self.assertEqual(1, limiter.stats()['api.deezer.com']['acquired'])
+
+
+if __name__ == '__main__':
+    unittest.main()